@@ -1,14 +1,47 @@
 # File: backend/db/helpers/image_helpers.py
 # pylint: disable=R1710,W0718
 
+import threading
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func
+from backend.db import db
 from backend.db.helpers.base_crud import BaseCrudHelper
 from backend.models import Image
 from backend.utils.logger import CentralizedLogger
 from backend.utils.error_handling.error_handling import handle_database_error
+from image_processing.scripts.preprocessing.image_hash import (
+    DEFAULT_MAX_DISTANCE,
+    HashIndex,
+    hamming_distance,
+)
 
 logger = CentralizedLogger("image_helpers")
+_hash_index_lock = threading.Lock()
+
+
+def _hash_index() -> HashIndex:
+    """
+    The app's in-memory perceptual hash index, topped up with images stored
+    since the last lookup (also by other processes).
+    """
+    index = current_app.extensions.setdefault("image_hash_index", HashIndex())
+    max_id = db.session.query(func.max(Image.id)).scalar() or 0
+    last_id = int(index.ids.max()) if len(index) else 0
+    if max_id < last_id:  # The table was recreated; start over.
+        index.clear()
+        last_id = 0
+    if max_id > last_id:
+        rows = (
+            db.session.query(Image.id, Image.average_hash, Image.difference_hash)
+            .filter(Image.id > last_id, Image.difference_hash.isnot(None))
+            .all()
+        )
+        if rows:
+            ids, ahashes, dhashes = zip(*rows)
+            index.add(ids, ahashes, dhashes)
+    return index
 
 
 class ImageHelpers(BaseCrudHelper):
@@ -60,3 +93,57 @@ class ImageHelpers(BaseCrudHelper):
                     "end_date": str(end_date),
                 },
             )
+
+    @staticmethod
+    def find_analyzed_duplicate(
+        content_hash: str,
+        average_hash: Optional[str] = None,
+        difference_hash: Optional[str] = None,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ) -> Tuple[Optional[Image], Optional[str]]:
+        """
+        Find an earlier upload of the same picture that already has an
+        analysis: first by exact content hash, then by perceptual hashes
+        within max_distance bits.
+
+        Returns (image owning the analysis, "exact" or "near"), or
+        (None, None) when nothing analyzed matches.
+        """
+        try:
+            exact = (
+                Image.query.filter(Image.content_hash == content_hash)
+                .order_by(Image.id)
+                .all()
+            )
+            for candidate in exact:
+                analysis = candidate.effective_analysis
+                if analysis is not None:
+                    return analysis.image, "exact"
+
+            if average_hash is None or difference_hash is None:
+                return None, None
+            with _hash_index_lock:
+                ids, _ = _hash_index().near(average_hash, difference_hash, max_distance)
+            for image_id in ids.tolist():
+                candidate = db.session.get(Image, image_id)
+                # The index may be stale; confirm against the stored hashes.
+                if candidate is None or candidate.difference_hash is None:
+                    continue
+                distance = max(
+                    hamming_distance(
+                        int(candidate.average_hash, 16), int(average_hash, 16)
+                    ),
+                    hamming_distance(
+                        int(candidate.difference_hash, 16), int(difference_hash, 16)
+                    ),
+                )
+                analysis = candidate.effective_analysis
+                if distance <= max_distance and analysis is not None:
+                    return analysis.image, "near"
+            return None, None
+        except Exception as err:
+            handle_database_error(
+                err,
+                module="image_helpers",
+                meta_data={"content_hash": content_hash},
+            )
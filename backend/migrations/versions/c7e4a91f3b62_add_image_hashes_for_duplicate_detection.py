@@ -0,0 +1,50 @@
+"""Add image hashes for duplicate detection
+
+Revision ID: c7e4a91f3b62
+Revises: 5466c731bc58
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c7e4a91f3b62"
+down_revision = "5466c731bc58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("content_hash", sa.String(length=64), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("average_hash", sa.String(length=16), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("difference_hash", sa.String(length=16), nullable=True)
+        )
+        batch_op.add_column(sa.Column("duplicate_of_id", sa.Integer(), nullable=True))
+        batch_op.create_index(
+            batch_op.f("ix_images_content_hash"), ["content_hash"], unique=False
+        )
+        batch_op.create_foreign_key(
+            "fk_images_duplicate_of_id_images",
+            "images",
+            ["duplicate_of_id"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.drop_constraint("fk_images_duplicate_of_id_images", type_="foreignkey")
+        batch_op.drop_index(batch_op.f("ix_images_content_hash"))
+        batch_op.drop_column("duplicate_of_id")
+        batch_op.drop_column("difference_hash")
+        batch_op.drop_column("average_hash")
+        batch_op.drop_column("content_hash")
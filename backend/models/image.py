@@ -14,10 +14,16 @@ class Image(BaseModel):  # pylint: disable=too-few-public-methods
     upload "my_photo.png" once, but different users can also use "my_photo.png"
     without collisions.
 
+    content_hash (SHA-256 of the file) and the perceptual average_hash /
+    difference_hash identify exact and near-duplicate uploads; a duplicate of
+    an already analyzed image points at it through duplicate_of instead of
+    being analyzed again.
+
     Relationship:
         - user: Belongs to a single 'User' (images -> user).
         - analysis: One-to-one with 'ImageAnalysis' by default (uselist=False),
                     though you can allow multiple analyses if desired.
+        - duplicate_of: The analyzed image whose results this one reuses.
     """
 
     __tablename__ = "images"
@@ -32,12 +38,29 @@ class Image(BaseModel):  # pylint: disable=too-few-public-methods
     compression_method = db.Column(db.String(50), nullable=True)
     image_metadata = db.Column(db.JSON, nullable=True)
 
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    average_hash = db.Column(db.String(16), nullable=True)
+    difference_hash = db.Column(db.String(16), nullable=True)
+    duplicate_of_id = db.Column(
+        db.Integer, db.ForeignKey("images.id", ondelete="SET NULL"), nullable=True
+    )
+
     # Create a unique constraint on (user_id, filename)
     __table_args__ = (
         db.UniqueConstraint("user_id", "filename", name="_user_filename_uc"),
     )
 
     user = db.relationship("User", backref=db.backref("images", lazy=True))
+    duplicate_of = db.relationship("Image", remote_side="Image.id")
+
+    @property
+    def effective_analysis(self):
+        """
+        This image's own analysis, or that of the image it duplicates.
+        """
+        if self.analysis is not None:
+            return self.analysis
+        return self.duplicate_of.analysis if self.duplicate_of else None
 
     def __repr__(self) -> str:
         return f"<Image {self.filename} (User {self.user_id})>"
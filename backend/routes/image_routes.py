@@ -9,20 +9,94 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from backend.db import db
+from backend.db.helpers.image_helpers import ImageHelpers
 from backend.models import Image, Admin
 from backend.utils.logger import CentralizedLogger
 from backend.utils.file_handler import construct_file_path, write_file, delete_file
+from image_processing.scripts.preprocessing.extract_metadata import extract_metadata
+from image_processing.scripts.preprocessing.image_hash import (
+    content_hash,
+    image_hashes,
+)
 
 logger = CentralizedLogger("image_routes")
 image_bp = Blueprint("image_routes", __name__, url_prefix="/images")
 
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+# Largest image (after JPEG draft scaling) decoded on the request thread for
+# perceptual hashing; a 1 MP PNG decodes in about 20 ms. Larger PNG/GIF
+# uploads are still matched by content hash.
+MAX_HASH_PIXELS = 1 << 20
 
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def read_image_header(file_contents, filename):
+    """
+    Returns the Image column values parsed from the file's header only, so the
+    cost does not depend on image size. Unreadable headers leave them empty.
+    """
+    try:
+        header = extract_metadata(file_contents)
+    except ValueError as exc:
+        logger.log_to_console(
+            "WARNING", "Could not read image header.", filename=filename, error=str(exc)
+        )
+        return {}
+    return {
+        "width": header["width"],
+        "height": header["height"],
+        "bit_depth": header["bit_depth"],
+        "color_type": header["color_type"],
+        "compression_method": header["compression_method"],
+        "image_metadata": {"format": header["format"], **header["metadata"]},
+    }
+
+
+def read_image_hashes(file_contents, filename):
+    """
+    Returns the Image hash columns: the exact content hash, plus the
+    perceptual hashes when the image can be decoded within MAX_HASH_PIXELS.
+    """
+    try:
+        hashes = image_hashes(file_contents, max_pixels=MAX_HASH_PIXELS)
+    except Exception as exc:
+        logger.log_to_console(
+            "WARNING", "Could not hash image pixels.", filename=filename, error=str(exc)
+        )
+        return {"content_hash": content_hash(file_contents)}
+    if hashes["ahash"] is None:
+        logger.log_to_console(
+            "INFO", "Image too large for perceptual hashing.", filename=filename
+        )
+        return {"content_hash": hashes["sha256"]}
+    return {
+        "content_hash": hashes["sha256"],
+        "average_hash": hashes["ahash"],
+        "difference_hash": hashes["dhash"],
+    }
+
+
+def find_analyzed_duplicate(hash_columns, filename):
+    """
+    Returns (image, "exact" or "near") for an analyzed duplicate of an upload,
+    or (None, None). A failed lookup never blocks the upload.
+    """
+    try:
+        return ImageHelpers.find_analyzed_duplicate(
+            hash_columns["content_hash"],
+            hash_columns.get("average_hash"),
+            hash_columns.get("difference_hash"),
+        )
+    except Exception as exc:
+        logger.log_to_console(
+            "WARNING", "Duplicate lookup failed.", filename=filename, error=str(exc)
+        )
+        return None, None
+
+
 def is_admin_user(user_id: int) -> bool:
     """
     Checks if the given user_id belongs to an Admin record.
@@ -52,17 +126,37 @@ def upload_image():
 
             write_file(user_id, unique_filename, file_contents, mode="wb")
 
-            new_image = Image(filename=unique_filename, user_id=user_id)
+            hash_columns = read_image_hashes(file_contents, unique_filename)
+            duplicate, match = find_analyzed_duplicate(hash_columns, unique_filename)
+            new_image = Image(
+                filename=unique_filename,
+                user_id=user_id,
+                duplicate_of_id=duplicate.id if duplicate else None,
+                **read_image_header(file_contents, unique_filename),
+                **hash_columns,
+            )
             db.session.add(new_image)
             db.session.commit()
 
             logger.log_to_console(
                 "INFO", "Image uploaded.", user_id=user_id, filename=unique_filename
             )
-            return (
-                jsonify({"message": "Image uploaded.", "image_id": new_image.id}),
-                201,
-            )
+            payload = {"message": "Image uploaded.", "image_id": new_image.id}
+            if duplicate:
+                # Reuse the earlier analysis instead of analyzing again.
+                payload.update(
+                    duplicate_of=duplicate.id,
+                    match=match,
+                    analysis_id=duplicate.analysis.id,
+                )
+                logger.log_to_console(
+                    "INFO",
+                    "Linked upload to an existing analysis.",
+                    image_id=new_image.id,
+                    duplicate_of=duplicate.id,
+                    match=match,
+                )
+            return jsonify(payload), 201
 
         return jsonify({"error": "Unsupported file type."}), 400
     except Exception as exc:
@@ -82,6 +176,7 @@ def get_image(image_id):
             return jsonify({"error": "Image not found."}), 404
 
         file_path = construct_file_path(image_obj.user_id, image_obj.filename)
+        analysis = image_obj.effective_analysis
         return (
             jsonify(
                 {
@@ -89,6 +184,14 @@ def get_image(image_id):
                     "filename": image_obj.filename,
                     "path": file_path,
                     "uploaded_by": image_obj.user_id,
+                    "width": image_obj.width,
+                    "height": image_obj.height,
+                    "bit_depth": image_obj.bit_depth,
+                    "color_type": image_obj.color_type,
+                    "compression_method": image_obj.compression_method,
+                    "content_hash": image_obj.content_hash,
+                    "duplicate_of": image_obj.duplicate_of_id,
+                    "analysis_id": analysis.id if analysis else None,
                     "uploaded_at": image_obj.created_at.isoformat(),
                 }
             ),
@@ -118,6 +221,10 @@ def delete_image(image_id):
             return jsonify({"error": "Not authorized to delete this image."}), 403
 
         delete_file(image_obj.user_id, image_obj.filename)
+        # Uploads linked to this image's analysis lose the link with it.
+        Image.query.filter_by(duplicate_of_id=image_id).update(
+            {"duplicate_of_id": None}
+        )
         db.session.delete(image_obj)
         db.session.commit()
 
@@ -1 +1,86 @@
-# Placeholder file for alpha analysis
+"""
+Alpha analysis: transparency coverage and opacity-aware palettes.
+
+Reports how much of an image is transparent, its visible palette (transparent
+pixels skipped, partial pixels weighted by opacity), and the palette it shows
+when composited onto light and dark backgrounds.
+"""
+
+import argparse
+
+import numpy as np
+
+from image_processing.scripts.preprocessing.extract_alpha import (
+    DEFAULT_BACKGROUNDS,
+    alpha_coverage,
+    alpha_histogram,
+    composite_backgrounds,
+    count_colors_rgba,
+    load_rgba,
+)
+from image_processing.scripts.preprocessing.extract_pixels import count_colors
+
+
+def dominant_color(colors, counts):
+    """Most common (r, g, b) of a palette, or None if it is empty."""
+    if len(counts) == 0:
+        return None
+    return tuple(colors[int(np.argmax(counts))].tolist())
+
+
+def analyze_alpha(rgba_array, backgrounds=None):
+    """
+    Alpha report for an (H, W, 4) uint8 array.
+
+    Returns a dict with the alpha histogram, coverage fractions, the
+    opacity-weighted visible palette and, per background, the composited
+    palette.
+    """
+    histogram = alpha_histogram(rgba_array)
+    colors, weights = count_colors_rgba(rgba_array, mode="weighted")
+    composites = {}
+    for name, composited in composite_backgrounds(rgba_array, backgrounds).items():
+        bg_colors, bg_counts = count_colors(composited)
+        composites[name] = {
+            "colors": bg_colors,
+            "counts": bg_counts,
+            "dominant_color": dominant_color(bg_colors, bg_counts),
+        }
+    return {
+        "alpha_histogram": histogram,
+        "coverage": alpha_coverage(histogram),
+        "visible": {
+            "colors": colors,
+            "weights": weights,
+            "dominant_color": dominant_color(colors, weights),
+        },
+        "composites": composites,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report alpha coverage.")
+    parser.add_argument("image_path", help="Path to the image file.")
+    args = parser.parse_args()
+
+    report = analyze_alpha(load_rgba(args.image_path), DEFAULT_BACKGROUNDS)
+    coverage = report["coverage"]
+    print(
+        f"Transparent: {coverage['transparent']:.1%}, "
+        f"partial: {coverage['partial']:.1%}, opaque: {coverage['opaque']:.1%}, "
+        f"mean opacity: {coverage['opacity']:.3f}"
+    )
+    visible = report["visible"]
+    print(
+        f"Visible colors: {len(visible['colors'])}, "
+        f"dominant {visible['dominant_color']}"
+    )
+    for name, stats in report["composites"].items():
+        print(
+            f"On {name}: {len(stats['colors'])} colors, "
+            f"dominant {stats['dominant_color']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,200 @@
-# Placeholder file for layer analysis
+"""
+Connected-region analysis of cluster label maps.
+
+One raster pass splits every row into runs of equal labels and links each run
+to the runs above it that carry the same label. One connected-components
+traversal of the run graph merges linked runs into regions. Region statistics
+(area, bounding box, centroid) are then unsorted reductions over runs, so the
+whole analysis stays linear in the number of pixels.
+"""
+
+import argparse
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from image_processing.utils.array_io import load_array, save_array
+
+REGION_DTYPE = np.dtype(
+    [
+        ("label", np.int32),  # Cluster label of the region
+        ("area", np.int64),
+        ("row_min", np.int32),
+        ("row_max", np.int32),
+        ("col_min", np.int32),
+        ("col_max", np.int32),
+        ("centroid_row", np.float64),
+        ("centroid_col", np.float64),
+    ]
+)
+
+LAYER_DTYPE = np.dtype(
+    [
+        ("label", np.int32),
+        ("blobs", np.int64),  # Number of disjoint regions
+        ("area", np.int64),
+        ("largest_area", np.int64),
+    ]
+)
+
+
+def _find_runs(label_map):
+    """Split rows into runs; returns (run_of_pixel, row, start, stop, value)."""
+    height, width = label_map.shape
+    flat = label_map.reshape(-1)
+    starts = np.ones(flat.size, dtype=bool)
+    starts[1:] = flat[1:] != flat[:-1]
+    starts[::width] = True  # Runs never continue across rows
+    run_starts = np.flatnonzero(starts)
+    run_of_pixel = (np.cumsum(starts) - 1).astype(np.int32).reshape(height, width)
+    run_stops = np.r_[run_starts[1:], flat.size]
+    rows = run_starts // width
+    return (
+        run_of_pixel,
+        rows,
+        run_starts - rows * width,
+        run_stops - rows * width,
+        flat[run_starts],
+    )
+
+
+def _linked_runs(label_map, run_of_pixel, connectivity):
+    """Pairs of runs in consecutive rows that touch and share a label."""
+    offsets = [0] if connectivity == 4 else [-1, 0, 1]
+    pairs = []
+    below_labels, below_runs = label_map[1:], run_of_pixel[1:]
+    above_labels, above_runs = label_map[:-1], run_of_pixel[:-1]
+    width = label_map.shape[1]
+    for offset in offsets:
+        below = slice(max(-offset, 0), width - max(offset, 0))
+        above = slice(max(offset, 0), width - max(-offset, 0))
+        same = below_labels[:, below] == above_labels[:, above]
+        pairs.append(
+            np.stack([below_runs[:, below][same], above_runs[:, above][same]], axis=1)
+        )
+    pairs = np.concatenate(pairs)
+    # Neighbouring pixels of two runs repeat a pair back to back; drop those
+    # repeats in O(n). Any remaining duplicates are harmless to the traversal.
+    repeat = np.zeros(len(pairs), dtype=bool)
+    repeat[1:] = (pairs[1:] == pairs[:-1]).all(axis=1)
+    return pairs[~repeat]
+
+
+def _run_components(size, links):
+    """
+    Component of every run, numbered in raster order of each component's first
+    run. A single graph traversal, so linear in runs plus links.
+    """
+    graph = coo_matrix(
+        (np.ones(len(links), dtype=bool), (links[:, 0], links[:, 1])),
+        shape=(size, size),
+    )
+    return connected_components(graph, directed=False)[1]
+
+
+def label_regions(label_map, connectivity=4, ignore_label=-1):
+    """
+    Find the connected regions of every cluster in an (H, W) label map.
+
+    Returns (region_map, regions): an (H, W) int32 map of region ids (-1 for
+    ignored pixels) and a REGION_DTYPE table indexed by region id.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError("connectivity must be 4 or 8.")
+    label_map = np.asarray(label_map)
+    run_of_pixel, rows, starts, stops, values = _find_runs(label_map)
+    links = _linked_runs(label_map, run_of_pixel, connectivity)
+    components = _run_components(values.size, links)
+
+    # Linked runs share a label, so whole components are kept or ignored.
+    kept = values != ignore_label
+    kept_component = np.zeros(values.size, dtype=bool)
+    kept_component[components[kept]] = True
+    region_of_component = (np.cumsum(kept_component) - 1).astype(np.int32)
+    run_to_region = np.where(kept, region_of_component[components], -1)
+
+    # Per-region reductions over runs, each one pass in raster order.
+    run_region = run_to_region[kept]
+    rows, starts, stops = rows[kept], starts[kept], stops[kept]
+    lengths = stops - starts
+    count = int(kept_component.sum())
+    # Regions are numbered by first run, so a region starts where the running
+    # maximum of region ids grows.
+    first = np.ones(run_region.size, dtype=bool)
+    first[1:] = run_region[1:] > np.maximum.accumulate(run_region)[:-1]
+
+    # ufunc.at is only fast on contiguous arrays of the operands' dtype.
+    row_max = np.zeros(count, dtype=rows.dtype)
+    np.maximum.at(row_max, run_region, rows)
+    col_min = np.full(count, label_map.shape[1], dtype=starts.dtype)
+    np.minimum.at(col_min, run_region, starts)
+    col_max = np.zeros(count, dtype=stops.dtype)
+    np.maximum.at(col_max, run_region, stops)
+    area = np.bincount(run_region, weights=lengths, minlength=count)
+
+    regions = np.zeros(count, dtype=REGION_DTYPE)
+    regions["label"] = values[kept][first]
+    regions["area"] = area
+    regions["row_min"] = rows[first]
+    regions["row_max"] = row_max
+    regions["col_min"] = col_min
+    regions["col_max"] = col_max - 1
+    regions["centroid_row"] = (
+        np.bincount(run_region, weights=lengths * rows, minlength=count) / area
+    )
+    regions["centroid_col"] = (
+        np.bincount(run_region, weights=lengths * (starts + stops - 1), minlength=count)
+        / 2
+        / area
+    )
+    return run_to_region[run_of_pixel], regions
+
+
+def layer_summary(regions):
+    """One LAYER_DTYPE record per cluster label: blob count, area, largest blob."""
+    labels, inverse, blobs = np.unique(
+        regions["label"], return_inverse=True, return_counts=True
+    )
+    layers = np.zeros(labels.size, dtype=LAYER_DTYPE)
+    layers["label"] = labels
+    layers["blobs"] = blobs
+    layers["area"] = np.bincount(
+        inverse, weights=regions["area"], minlength=labels.size
+    )
+    np.maximum.at(layers["largest_area"], inverse, regions["area"])
+    return layers
+
+
+def analyze_layers(cluster_path, regions_path, region_map_path=None, connectivity=4):
+    """Label the regions of a saved cluster map and save the region table."""
+    region_map, regions = label_regions(load_array(cluster_path), connectivity)
+    save_array(regions_path, regions)
+    if region_map_path:
+        save_array(region_map_path, region_map)
+    return regions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the connected regions of each color cluster."
+    )
+    parser.add_argument("--input", default="../data/results/example_clusters.npy")
+    parser.add_argument("--output", default="../data/results/example_regions.npy")
+    parser.add_argument("--region-map", default=None, help="Also save region ids.")
+    parser.add_argument("--connectivity", type=int, choices=(4, 8), default=4)
+    args = parser.parse_args()
+
+    regions = analyze_layers(
+        args.input, args.output, args.region_map, args.connectivity
+    )
+    print(f"{len(regions)} regions saved to {args.output}")
+    for layer in layer_summary(regions)[:20]:
+        print(
+            f"Cluster {layer['label']}: {layer['blobs']} blobs, "
+            f"{layer['area']} px, largest {layer['largest_area']} px"
+        )
+
+
+if __name__ == "__main__":
+    main()
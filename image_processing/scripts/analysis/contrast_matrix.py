@@ -0,0 +1,129 @@
+"""
+All-pairs WCAG 2 contrast ratios for a color palette.
+
+Ratios are computed from relative luminance with broadcasting, one block of
+background rows at a time, so temporary memory stays bounded by
+``chunk_bytes`` even for palettes of several thousand colors. The top-k
+foreground search never materializes the full N x N matrix.
+"""
+
+import argparse
+
+import numpy as np
+
+from image_processing.scripts.conversion.srgb_to_lab import relative_luminance
+from image_processing.utils.color_histogram import histogram_colors, load_histogram
+
+# WCAG 2 minimum contrast ratios for normal and large text.
+AA_RATIO = 4.5
+AAA_RATIO = 7.0
+AA_LARGE_RATIO = 3.0
+AAA_LARGE_RATIO = 4.5
+
+DEFAULT_CHUNK_BYTES = 64 << 20
+
+
+def contrast_ratio(luminance_a, luminance_b):
+    """WCAG contrast ratio (1-21) between luminances, broadcast elementwise."""
+    lighter = np.maximum(luminance_a, luminance_b)
+    darker = np.minimum(luminance_a, luminance_b)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def _chunk_rows(size, chunk_bytes):
+    # Three float64 temporaries per block element.
+    return max(1, int(chunk_bytes) // (max(size, 1) * 8 * 3))
+
+
+def iter_contrast_blocks(colors, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield (row_start, block) of the contrast matrix, background by row."""
+    luminance = relative_luminance(np.asarray(colors).reshape(-1, 3))
+    rows = _chunk_rows(luminance.size, chunk_bytes)
+    for start in range(0, luminance.size, rows):
+        block = contrast_ratio(
+            luminance[start : start + rows, np.newaxis], luminance[np.newaxis, :]
+        )
+        yield start, block
+
+
+def contrast_matrix(colors, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """N x N float32 matrix of contrast ratios; [i, j] is j on background i."""
+    size = len(colors)
+    matrix = np.empty((size, size), dtype=np.float32)
+    for start, block in iter_contrast_blocks(colors, chunk_bytes):
+        matrix[start : start + block.shape[0]] = block
+    return matrix
+
+
+def _thresholds(large_text):
+    if large_text:
+        return AA_LARGE_RATIO, AAA_LARGE_RATIO
+    return AA_RATIO, AAA_RATIO
+
+
+def wcag_masks(matrix, large_text=False):
+    """Boolean AA and AAA pass masks for a contrast matrix."""
+    aa, aaa = _thresholds(large_text)
+    return {"AA": matrix >= aa, "AAA": matrix >= aaa}
+
+
+def best_foregrounds(colors, k=5, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    The k highest-contrast foregrounds for every background color.
+
+    Returns (indices, ratios), both (N, k) and sorted by descending ratio.
+    """
+    size = len(colors)
+    k = min(k, size)
+    indices = np.empty((size, k), dtype=np.int64)
+    ratios = np.empty((size, k), dtype=np.float32)
+    for start, block in iter_contrast_blocks(colors, chunk_bytes):
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_ratios = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_ratios, axis=1, kind="stable")
+        stop = start + block.shape[0]
+        indices[start:stop] = np.take_along_axis(top, order, axis=1)
+        ratios[start:stop] = np.take_along_axis(top_ratios, order, axis=1)
+    return indices, ratios
+
+
+def pass_counts(colors, large_text=False, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Number of AA and AAA passing foregrounds for every background."""
+    aa, aaa = _thresholds(large_text)
+    counts = {level: np.empty(len(colors), dtype=np.int64) for level in ("AA", "AAA")}
+    for start, block in iter_contrast_blocks(colors, chunk_bytes):
+        stop = start + block.shape[0]
+        counts["AA"][start:stop] = (block >= aa).sum(axis=1)
+        counts["AAA"][start:stop] = (block >= aaa).sum(axis=1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the best-contrast foregrounds for a palette."
+    )
+    parser.add_argument("palette", help="A .npz color histogram.")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=20, help="Backgrounds shown.")
+    parser.add_argument("--large-text", action="store_true")
+    args = parser.parse_args()
+
+    histogram = load_histogram(args.palette)
+    histogram = histogram[np.argsort(-histogram["count"].astype(np.float64))]
+    colors = histogram_colors(histogram)
+    indices, ratios = best_foregrounds(colors, k=args.top)
+    counts = pass_counts(colors, large_text=args.large_text)
+
+    for row in range(min(args.limit, len(colors))):
+        best = ", ".join(
+            f"{tuple(colors[j].tolist())} {ratio:.2f}:1"
+            for j, ratio in zip(indices[row], ratios[row])
+        )
+        print(
+            f"{tuple(colors[row].tolist())}: AA {counts['AA'][row]}, "
+            f"AAA {counts['AAA'][row]}; best {best}"
+        )
+
+
+if __name__ == "__main__":
+    main()
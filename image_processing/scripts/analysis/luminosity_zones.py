@@ -0,0 +1,108 @@
+"""
+Luminosity-zone classification over relative luminance.
+
+Colors are assigned to the hardware, background, card and action zones (the
+boundaries drawn by the legacy luminosity layer chart) with one searchsorted
+pass. Luminance ranges between two zones are reported as gaps. Summaries work
+on an image's (color, count) palette, so no pixel grid or plotting is needed.
+"""
+
+import argparse
+
+import numpy as np
+
+from image_processing.scripts.conversion.srgb_to_lab import relative_luminance
+from image_processing.scripts.preprocessing.extract_pixels import (
+    ALPHA_MODES,
+    process_image,
+)
+
+# Lower edges of every zone after the first, in relative luminance (0-1).
+ZONE_BOUNDARIES = np.array([0.006048833023, 0.0653794236, 0.1181464, 0.3, 0.458615284])
+ZONES = (
+    "hardware",
+    "background",
+    "background_card_gap",
+    "card",
+    "card_action_gap",
+    "action",
+)
+
+
+def classify_luminance(luminance):
+    """Zone index (into ZONES) of each relative luminance value."""
+    return np.searchsorted(ZONE_BOUNDARIES, luminance, side="right").astype(np.int8)
+
+
+def classify_colors(colors):
+    """Zone index of each color in an (..., 3) uint8 sRGB array."""
+    return classify_luminance(relative_luminance(colors))
+
+
+def zone_summary(colors, counts):
+    """
+    Coverage and dominant color of every zone for a (colors, counts) palette.
+
+    Returns {zone: {"pixels", "coverage", "dominant_color"}}; dominant_color is
+    the most common (r, g, b) in the zone, or None for an empty zone. pixels
+    is a float for float (opacity-weighted) counts.
+    """
+    colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    counts = np.asarray(counts)
+    to_pixels = float if counts.dtype.kind == "f" else int
+    counts = counts.astype(np.float64 if to_pixels is float else np.int64)
+    zones = classify_colors(colors)
+    pixels = np.bincount(zones, weights=counts, minlength=len(ZONES))
+    total = counts.sum()
+
+    # Sort by zone, then by descending count: each zone's first entry dominates.
+    order = np.lexsort((-counts, zones))
+    first = order[np.flatnonzero(np.r_[True, np.diff(zones[order]) != 0])]
+    dominant = {int(zones[index]): tuple(colors[index].tolist()) for index in first}
+
+    return {
+        zone: {
+            "pixels": to_pixels(pixels[index]),
+            "coverage": float(pixels[index] / total) if total else 0.0,
+            "dominant_color": dominant.get(index),
+        }
+        for index, zone in enumerate(ZONES)
+    }
+
+
+def zone_map(rgb_array):
+    """Per-pixel zone indices of an (H, W, 3) uint8 image."""
+    return classify_colors(rgb_array)
+
+
+def analyze_zones(image_path, strip_budget=None, alpha_mode="ignore"):
+    """Zone summary of an image file; alpha_mode is as in process_image()."""
+    return zone_summary(
+        *process_image(image_path, strip_budget=strip_budget, alpha_mode=alpha_mode)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report luminosity-zone coverage and dominant colors."
+    )
+    parser.add_argument("image_path", help="Path to the image file.")
+    parser.add_argument("--strip-budget", type=int, default=None)
+    parser.add_argument(
+        "--alpha-mode",
+        choices=ALPHA_MODES,
+        default="ignore",
+        help="Skip transparent pixels or weight pixels by opacity.",
+    )
+    args = parser.parse_args()
+
+    summary = analyze_zones(args.image_path, args.strip_budget, args.alpha_mode)
+    for zone, stats in summary.items():
+        print(
+            f"{zone:>20}: {stats['coverage']:7.2%} "
+            f"({stats['pixels']} px), dominant {stats['dominant_color']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,32 @@
-import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from image_processing.scripts.visualization.chart_renderer import ChartRenderer
+from image_processing.utils.array_io import load_array
+from image_processing.utils.result_cache import run_cached, source_version
 
-def visualize_clusters(cluster_path, output_path):
+STAGE = "visualize_clusters"
+VERSION = source_version(__file__)
+
+
+def render_clusters(cluster_labels):
+    """Render a cluster label map to PNG bytes."""
+    return ChartRenderer().cluster_chart(cluster_labels)
+
+
+def visualize_clusters(cluster_path, output_path, cache=None):
     """Visualize cluster labels as an image."""
-    # Load cluster labels
-    cluster_labels = np.load(cluster_path)
-
-    # Generate a plot
-    plt.figure(figsize=(8, 8))
-    plt.imshow(cluster_labels, cmap="tab20")  # Use a color map
-    plt.axis("off")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path, bbox_inches="tight")
-    print(f"Cluster visualization saved to {output_path}")
+
+    def compute():
+        # Load cluster labels (memory-mapped)
+        png_bytes = render_clusters(load_array(cluster_path))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as file:
+            file.write(png_bytes)
+
+    if run_cached(cache, STAGE, cluster_path, {}, output_path, compute, VERSION):
+        print(f"Cluster visualization restored from cache to {output_path}")
+    else:
+        print(f"Cluster visualization saved to {output_path}")
 
 
 if __name__ == "__main__":
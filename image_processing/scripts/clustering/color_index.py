@@ -0,0 +1,260 @@
+"""
+Nearest-color search over the cluster centroids of every stored image.
+
+Centroids (pixel-weighted mean LAB of each DBSCAN cluster in the palette store,
+as summarized by export_data.iter_clusters) are kept in a KD-tree, so radius
+and k-nearest queries cost a few tree descents instead of a scan over every
+image. Distances are CIE76 ΔE, i.e. Euclidean distance in LAB. Newly analyzed
+images are appended to a small buffer that is searched by brute force alongside
+the tree, and re-analyzed images have their old centroids masked out; either is
+folded into a rebuilt tree once it grows past a fraction of the indexed size.
+Passing the index to insert_data.insert_palette keeps it in step with the
+store.
+"""
+
+import argparse
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from image_processing.scripts.conversion.srgb_to_lab import rgb_to_lab
+from image_processing.scripts.storage.create_db import DEFAULT_DB_PATH, connect
+from image_processing.scripts.storage.export_data import iter_clusters
+
+# Rebuild the tree once the buffer (or the removed points) reaches this
+# fraction of the indexed points.
+REBUILD_FRACTION = 0.1
+# Buffers smaller than this are always searched by brute force.
+MIN_REBUILD_SIZE = 1024
+LEAF_SIZE = 40
+
+MATCH_DTYPE = np.dtype(
+    [
+        ("image_id", np.int64),
+        ("cluster", np.int32),
+        ("pixels", np.float64),  # Pixels in the cluster, opacity-weighted
+        ("lab", np.float64, (3,)),
+        ("delta_e", np.float64),
+    ]
+)
+
+
+def parse_color(color):
+    """LAB of a '#rrggbb' string, an (r, g, b) triple, or a LAB triple as-is."""
+    if isinstance(color, str):
+        value = color.lstrip("#")
+        if len(value) != 6:
+            raise ValueError(f"Expected a #rrggbb color, got {color!r}")
+        rgb = [int(value[i : i + 2], 16) for i in (0, 2, 4)]
+        return rgb_to_lab(np.array([rgb], dtype=np.uint8))[0].astype(np.float64)
+    return np.asarray(color, dtype=np.float64).reshape(3)
+
+
+def store_centroids(conn, image_id=None):
+    """
+    (image_ids, clusters, pixels, lab) of cluster centroids in the store, or
+    of one image's clusters. Palettes stored without LAB have no centroids.
+    """
+    # Summary rows: image_id, source, cluster, colors, pixels, hex, L, a, b.
+    rows = [
+        (row[0], row[2], row[4], *row[6:])
+        for chunk in iter_clusters(conn, image_id=image_id)
+        for row in chunk
+        if row[6] is not None
+    ]
+    if not rows:
+        return (
+            np.empty(0, np.int64),
+            np.empty(0, np.int32),
+            np.empty(0, np.float64),
+            np.empty((0, 3)),
+        )
+    image_ids, clusters, pixels, l_values, a_values, b_values = zip(*rows)
+    return (
+        np.array(image_ids, dtype=np.int64),
+        np.array(clusters, dtype=np.int32),
+        np.array(pixels, dtype=np.float64),
+        np.column_stack([l_values, a_values, b_values]).astype(np.float64),
+    )
+
+
+class ColorIndex:
+    """
+    KD-tree over LAB cluster centroids tagged with their image and cluster.
+
+    add() appends centroids without rebuilding the tree and remove_image()
+    only masks them out; queries search the tree and the buffer of appended
+    centroids together.
+    """
+
+    def __init__(self, rebuild_fraction=REBUILD_FRACTION, leaf_size=LEAF_SIZE):
+        self.rebuild_fraction = rebuild_fraction
+        self.leaf_size = leaf_size
+        self._points = np.empty(0, dtype=MATCH_DTYPE)  # Points in the tree
+        self._removed = np.zeros(0, dtype=bool)  # Masked-out tree points
+        self._tree = None
+        self._pending = []  # Record arrays not yet in the tree
+
+    @classmethod
+    def from_store(cls, conn, **kwargs):
+        """Index every cluster centroid in the palette store."""
+        index = cls(**kwargs)
+        index.add(*store_centroids(conn))
+        index.rebuild()
+        return index
+
+    def __len__(self):
+        indexed = len(self._points) - int(self._removed.sum())
+        return indexed + sum(len(points) for points in self._pending)
+
+    def add(self, image_ids, clusters, pixels, lab):
+        """Append centroids; the tree is rebuilt once enough are pending."""
+        points = np.zeros(len(lab), dtype=MATCH_DTYPE)
+        points["image_id"] = image_ids
+        points["cluster"] = clusters
+        points["pixels"] = pixels
+        points["lab"] = np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+        self._pending.append(points)
+        pending = sum(len(points) for points in self._pending)
+        if pending >= self._rebuild_size():
+            self.rebuild()
+
+    def _rebuild_size(self):
+        return max(MIN_REBUILD_SIZE, self.rebuild_fraction * len(self._points))
+
+    def add_image(self, conn, image_id):
+        """Index the clusters of one newly stored image."""
+        self.remove_image(image_id)
+        self.add(*store_centroids(conn, image_id))
+
+    def remove_image(self, image_id):
+        """Drop an image's centroids (e.g. before re-indexing it)."""
+        self._pending = [p[p["image_id"] != image_id] for p in self._pending]
+        self._removed |= self._points["image_id"] == image_id
+        if self._removed.sum() >= self._rebuild_size():
+            self.rebuild()
+
+    def rebuild(self):
+        """Fold pending centroids into a freshly built tree."""
+        self._points = np.concatenate([self._points[~self._removed], *self._pending])
+        self._removed = np.zeros(len(self._points), dtype=bool)
+        self._pending = []
+        self._tree = (
+            KDTree(self._points["lab"], leaf_size=self.leaf_size)
+            if len(self._points)
+            else None
+        )
+
+    def _pending_points(self):
+        if not self._pending:
+            return self._points[:0]
+        if len(self._pending) > 1:
+            self._pending = [np.concatenate(self._pending)]
+        return self._pending[0]
+
+    @staticmethod
+    def _matches(points, distances):
+        matches = points.copy()
+        matches["delta_e"] = distances
+        return matches
+
+    def within(self, color, radius):
+        """Centroids within ΔE radius of a color, nearest first."""
+        target = parse_color(color)
+        found = []
+        if self._tree is not None:
+            indices, distances = self._tree.query_radius(
+                target[np.newaxis], radius, return_distance=True
+            )
+            live = ~self._removed[indices[0]]
+            found.append(
+                self._matches(self._points[indices[0][live]], distances[0][live])
+            )
+        pending = self._pending_points()
+        distances = np.linalg.norm(pending["lab"] - target, axis=1)
+        close = distances <= radius
+        found.append(self._matches(pending[close], distances[close]))
+        matches = np.concatenate(found)
+        return matches[np.argsort(matches["delta_e"], kind="stable")]
+
+    def nearest(self, color, k=10):
+        """The k centroids closest to a color, nearest first."""
+        if k < 1:
+            raise ValueError("k must be at least 1.")
+        target = parse_color(color)
+        found = []
+        if self._tree is not None:
+            # Ask for enough extra neighbours to make up for masked-out ones.
+            distances, indices = self._tree.query(
+                target[np.newaxis],
+                k=min(k + int(self._removed.sum()), len(self._points)),
+            )
+            live = ~self._removed[indices[0]]
+            found.append(
+                self._matches(self._points[indices[0][live]], distances[0][live])
+            )
+        pending = self._pending_points()
+        distances = np.linalg.norm(pending["lab"] - target, axis=1)
+        found.append(self._matches(pending, distances))
+        matches = np.concatenate(found)
+        return matches[np.argsort(matches["delta_e"], kind="stable")[:k]]
+
+    def images_within(self, color, radius):
+        """
+        Images with a cluster within ΔE radius of a color.
+
+        Returns the MATCH_DTYPE record of each image's closest cluster,
+        nearest first.
+        """
+        matches = self.within(color, radius)
+        _, first = np.unique(matches["image_id"], return_index=True)
+        return matches[np.sort(first)]
+
+    def save(self, path):
+        """Write the indexed centroids to an .npz file (the tree is rebuilt)."""
+        self.rebuild()
+        np.savez(path, points=self._points)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Read centroids written by save()."""
+        index = cls(**kwargs)
+        with np.load(path, allow_pickle=False) as data:
+            index._pending = [data["points"].astype(MATCH_DTYPE)]
+        index.rebuild()
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the images containing a color close to a given one."
+    )
+    parser.add_argument("color", help="#rrggbb color to search for.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--radius", type=float, default=3.0, help="Max ΔE (CIE76).")
+    parser.add_argument("--nearest", type=int, default=None, help="k nearest instead.")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        index = ColorIndex.from_store(conn)
+        if args.nearest:
+            matches = index.nearest(args.color, args.nearest)
+        else:
+            matches = index.images_within(args.color, args.radius)
+        sources = dict(conn.execute("SELECT id, source FROM images").fetchall())
+    finally:
+        conn.close()
+
+    print(f"{len(matches)} matches among {len(index)} cluster centroids")
+    for match in matches:
+        l_value, a_value, b_value = match["lab"]
+        print(
+            f"{sources.get(int(match['image_id']))} cluster {match['cluster']}: "
+            f"ΔE {match['delta_e']:.2f}, LAB ({l_value:.1f}, {a_value:.1f}, "
+            f"{b_value:.1f}), {match['pixels']:g} px"
+        )
+
+
+if __name__ == "__main__":
+    main()
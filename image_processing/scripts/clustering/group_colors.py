@@ -0,0 +1,138 @@
+"""
+Per-cluster reduction of a labeled color palette.
+
+Replaces the legacy ``group_lab_colors.find_group_colors``, which scanned the
+whole palette once per label (O(k * n)). Here one lexsort orders colors by
+label and descending count, and every statistic is a ``reduceat`` over the
+resulting label runs, so grouping is O(n log n) however many clusters exist.
+"""
+
+import argparse
+
+import numpy as np
+
+from image_processing.scripts.clustering.lab_clustering import cluster_palette
+from image_processing.scripts.conversion.srgb_to_lab import rgb_to_lab
+from image_processing.utils.array_io import save_array
+from image_processing.utils.color_histogram import (
+    histogram_colors,
+    load_histogram,
+    pack_rgb,
+    save_histogram,
+    with_fields,
+)
+
+
+def group_dtype(float_counts=False):
+    """Record dtype of group_stats(); float counts hold opacity weights."""
+    return np.dtype(
+        [
+            ("label", np.int32),
+            ("rgb", np.uint32),  # Dominant (most common) color, packed 0xRRGGBB
+            # Total pixels in the group
+            ("count", np.float64 if float_counts else np.uint64),
+            ("members", np.int64),  # Distinct colors in the group
+            ("lab_mean", np.float32, (3,)),  # Pixel-weighted mean LAB
+            ("lab_min", np.float32, (3,)),
+            ("lab_max", np.float32, (3,)),
+        ]
+    )
+
+
+GROUP_DTYPE = group_dtype()
+
+
+def group_stats(colors, counts, labels, lab=None, include_noise=False):
+    """
+    Reduce a labeled palette to one GROUP_DTYPE record per cluster.
+
+    colors is (N, 3) uint8 with pixel counts and cluster labels (noise = -1);
+    lab defaults to the colors' LAB values. Records are sorted by label.
+    Float (opacity-weighted) counts are summed as float64, not truncated.
+    """
+    colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    counts = np.asarray(counts)
+    float_counts = counts.dtype.kind == "f"
+    counts = counts.astype(np.float64 if float_counts else np.int64)
+    dtype = group_dtype(float_counts)
+    labels = np.asarray(labels, dtype=np.int64)
+    lab = rgb_to_lab(colors) if lab is None else np.asarray(lab, dtype=np.float64)
+
+    # By label, then by descending count: each run starts at its dominant color.
+    order = np.lexsort((-counts, labels))
+    if not include_noise:
+        order = order[labels[order] >= 0]
+    if order.size == 0:
+        return np.empty(0, dtype=dtype)
+
+    labels, counts = labels[order], counts[order]
+    colors, lab = colors[order], lab[order]
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+
+    totals = np.add.reduceat(counts, starts)
+    groups = np.empty(starts.size, dtype=dtype)
+    groups["label"] = labels[starts]
+    groups["rgb"] = pack_rgb(colors[starts])
+    groups["count"] = totals
+    groups["members"] = np.diff(np.r_[starts, labels.size])
+    groups["lab_mean"] = (
+        np.add.reduceat(lab * counts[:, np.newaxis], starts) / totals[:, np.newaxis]
+    )
+    groups["lab_min"] = np.minimum.reduceat(lab, starts)
+    groups["lab_max"] = np.maximum.reduceat(lab, starts)
+    return groups
+
+
+def group_stats_from_histogram(histogram, include_noise=False):
+    """group_stats() of a color histogram that has a label field."""
+    lab = histogram["lab"] if "lab" in histogram.dtype.names else None
+    return group_stats(
+        histogram_colors(histogram),
+        histogram["count"],
+        histogram["label"],
+        lab=lab,
+        include_noise=include_noise,
+    )
+
+
+def find_group_colors(colors, counts, labels):
+    """Return {label: (r, g, b)} of each cluster's most common color."""
+    groups = group_stats(colors, counts, labels)
+    dominant = histogram_colors(groups)
+    return {
+        label: tuple(color)
+        for label, color in zip(groups["label"].tolist(), dominant.tolist())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cluster a LAB palette and summarize every cluster."
+    )
+    parser.add_argument("--input", default="../data/intermediate/example_palette.npz")
+    parser.add_argument(
+        "--clustered-output", default="../data/results/clustered_palette.npz"
+    )
+    parser.add_argument("--groups-output", default="../data/results/group_stats.npy")
+    parser.add_argument("--eps", type=float, default=2.5)
+    parser.add_argument("--min-samples", type=int, default=2)
+    args = parser.parse_args()
+
+    histogram = load_histogram(args.input)
+    lab = histogram["lab"] if "lab" in histogram.dtype.names else None
+    if lab is None:
+        lab = rgb_to_lab(histogram_colors(histogram))
+    labels = cluster_palette(lab, histogram["count"], args.eps, args.min_samples)
+    clustered = with_fields(histogram, lab=lab, labels=labels)
+    save_histogram(args.clustered_output, clustered)
+
+    groups = group_stats_from_histogram(clustered)
+    save_array(args.groups_output, groups)
+    print(
+        f"Saved {len(groups)} groups to {args.groups_output} and the clustered "
+        f"palette to {args.clustered_output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,241 @@
+"""
+DBSCAN clustering of LAB images.
+
+The default "weighted" mode clusters each distinct LAB color once, weighting it
+by its pixel count, and maps the labels back to the pixel grid. Identical
+pixels always share a neighborhood, so this yields the same label map as the
+"pixel" mode that feeds every pixel to DBSCAN.
+"""
+
+import argparse
+import time
+
 import numpy as np
 from sklearn.cluster import DBSCAN
-import os
+from sklearn.metrics import adjusted_rand_score
 
+from image_processing.scripts.preprocessing.extract_pixels import (
+    strip_rows_for_budget,
+)
+from image_processing.utils.array_io import (
+    compact_labels,
+    load_array,
+    open_output_array,
+    save_array,
+)
+from image_processing.utils.result_cache import (
+    ResultCache,
+    run_cached,
+    source_version,
+)
 
-def cluster_lab(input_path, output_path, eps=0.5, min_samples=10):
-    """Cluster LAB values using DBSCAN."""
-    # Load LAB data
-    lab_array = np.load(input_path)
-    lab_flat = lab_array.reshape(-1, 3)  # Flatten to 2D array
+CLUSTERING_MODES = ("weighted", "pixel")
+
+STAGE = "lab_clustering"
+VERSION = source_version(__file__)
+
+
+def _lab_rows(lab_flat):
+    """View an (N, 3) LAB array as N opaque rows that sort and compare bytewise."""
+    lab_flat = np.ascontiguousarray(lab_flat)
+    return lab_flat.view(np.dtype((np.void, lab_flat.dtype.itemsize * 3))).ravel()
+
+
+def unique_lab(lab_flat):
+    """
+    Deduplicate an (N, 3) LAB array.
+
+    Returns (colors, counts, inverse) with lab_flat == colors[inverse].
+    """
+    lab_flat = np.ascontiguousarray(lab_flat)
+    rows = _lab_rows(lab_flat)
+    _, first, inverse, counts = np.unique(
+        rows, return_index=True, return_inverse=True, return_counts=True
+    )
+    return lab_flat[first], counts, inverse.reshape(-1)
 
-    # Perform DBSCAN clustering
-    clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(lab_flat)
-    labels = clustering.labels_
+
+def cluster_palette(lab_colors, counts, eps=0.5, min_samples=10):
+    """
+    Run DBSCAN over distinct LAB colors weighted by their pixel counts.
+
+    Labels use the smallest signed integer dtype that holds them.
+    """
+    clustering = DBSCAN(eps=eps, min_samples=min_samples)
+    return compact_labels(clustering.fit_predict(lab_colors, sample_weight=counts))
+
+
+def label_lab_array(lab_array, eps=0.5, min_samples=10, mode="weighted"):
+    """Cluster an (H, W, 3) LAB array and return an (H, W) label map."""
+    lab_flat = lab_array.reshape(-1, 3)  # Flatten to 2D array
+    if mode == "pixel":
+        clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(lab_flat)
+        labels = compact_labels(clustering.labels_)
+    elif mode == "weighted":
+        lab_colors, counts, inverse = unique_lab(lab_flat)
+        labels = cluster_palette(lab_colors, counts, eps, min_samples)[inverse]
+    else:
+        raise ValueError(f"Unknown clustering mode: {mode}")
 
     # Reshape cluster labels to image dimensions
-    cluster_labels = labels.reshape(lab_array.shape[:2])
+    return labels.reshape(lab_array.shape[:2])
+
+
+def compare_modes(lab_array, eps=0.5, min_samples=10):
+    """
+    Run both clustering modes and report their timings and agreement.
+
+    Agreement is the adjusted Rand index between the two label maps, so 1.0
+    means identical clusterings regardless of label numbering.
+    """
+    timings = {}
+    label_maps = {}
+    for mode in CLUSTERING_MODES:
+        start = time.perf_counter()
+        label_maps[mode] = label_lab_array(lab_array, eps, min_samples, mode=mode)
+        timings[mode] = time.perf_counter() - start
+
+    return {
+        "pixel_seconds": timings["pixel"],
+        "weighted_seconds": timings["weighted"],
+        "speedup": timings["pixel"] / max(timings["weighted"], 1e-9),
+        "agreement": adjusted_rand_score(
+            label_maps["pixel"].ravel(), label_maps["weighted"].ravel()
+        ),
+        "noise_agreement": float(
+            np.mean((label_maps["pixel"] == -1) == (label_maps["weighted"] == -1))
+        ),
+    }
+
+
+def _iter_lab_strips(lab_array, strip_rows):
+    """Yield (row_start, (rows * W, 3) contiguous strip) pairs of a LAB array."""
+    for row_start in range(0, lab_array.shape[0], strip_rows):
+        strip = lab_array[row_start : row_start + strip_rows]
+        yield row_start, np.ascontiguousarray(strip).reshape(-1, 3)
+
+
+def cluster_lab_streaming(input_path, output_path, eps, min_samples, strip_budget):
+    """
+    Weighted DBSCAN over a memory-mapped LAB array, one strip at a time.
+
+    The first pass merges per-strip LAB histograms into the image palette, the
+    second maps each strip back to cluster labels into a memory-mapped .npy,
+    so peak memory is one strip plus the palette.
+    """
+    lab_array = load_array(input_path)
+    height, width = lab_array.shape[:2]
+    strip_rows = strip_rows_for_budget(width, strip_budget)
+
+    palette_rows, palette_counts = None, None
+    for _, strip in _iter_lab_strips(lab_array, strip_rows):
+        rows, counts = np.unique(_lab_rows(strip), return_counts=True)
+        if palette_rows is not None:
+            rows = np.concatenate([palette_rows, rows])
+            counts = np.concatenate([palette_counts, counts])
+        palette_rows, inverse = np.unique(rows, return_inverse=True)
+        palette_counts = np.bincount(inverse.reshape(-1), weights=counts)
+
+    palette = palette_rows.view(lab_array.dtype).reshape(-1, 3)
+    palette_labels = cluster_palette(
+        palette, palette_counts.astype(np.int64), eps, min_samples
+    )
+
+    cluster_labels = open_output_array(
+        output_path, (height, width), palette_labels.dtype
+    )
+    for row_start, strip in _iter_lab_strips(lab_array, strip_rows):
+        indices = np.searchsorted(palette_rows, _lab_rows(strip))
+        cluster_labels[row_start : row_start + strip_rows] = palette_labels[
+            indices
+        ].reshape(-1, width)
+    cluster_labels.flush()
+    del cluster_labels
+
+
+def cluster_lab(
+    input_path,
+    output_path,
+    eps=0.5,
+    min_samples=10,
+    mode="weighted",
+    strip_budget=None,
+    cache=None,
+):
+    """
+    Cluster LAB values using DBSCAN.
+
+    With a strip_budget (bytes), the LAB array is memory-mapped and processed
+    in bounded strips; this requires the weighted mode. With a cache
+    (ResultCache), unchanged inputs and parameters restore the previous labels.
+    """
+    if strip_budget and mode != "weighted":
+        raise ValueError("Streaming clustering requires the weighted mode.")
+
+    def compute():
+        if strip_budget:
+            cluster_lab_streaming(
+                input_path, output_path, eps, min_samples, strip_budget
+            )
+            return
+
+        # Load LAB data (memory-mapped; pages are read as DBSCAN touches them)
+        lab_array = load_array(input_path)
+
+        # Perform DBSCAN clustering
+        cluster_labels = label_lab_array(lab_array, eps, min_samples, mode=mode)
+
+        # Save cluster labels
+        save_array(output_path, cluster_labels)
+
+    params = {"eps": eps, "min_samples": min_samples, "mode": mode}
+    if run_cached(cache, STAGE, input_path, params, output_path, compute, VERSION):
+        print(f"Cluster labels restored from cache to {output_path}")
+    else:
+        print(f"Cluster labels saved to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster a LAB array with DBSCAN.")
+    parser.add_argument("--input", default="../data/intermediate/example_lab.npy")
+    parser.add_argument("--output", default="../data/results/example_clusters.npy")
+    parser.add_argument("--eps", type=float, default=0.5)
+    parser.add_argument("--min-samples", type=int, default=10)
+    parser.add_argument("--mode", choices=CLUSTERING_MODES, default="weighted")
+    parser.add_argument(
+        "--strip-budget",
+        type=int,
+        default=None,
+        help="Stream the LAB array in strips using at most this many bytes each.",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Run both modes and report the speedup and agreement.",
+    )
+    parser.add_argument("--cache-dir", help="Reuse results cached in this directory.")
+    args = parser.parse_args()
+
+    if args.compare:
+        report = compare_modes(load_array(args.input), args.eps, args.min_samples)
+        print(
+            f"Pixel mode: {report['pixel_seconds']:.2f}s, "
+            f"weighted mode: {report['weighted_seconds']:.2f}s "
+            f"({report['speedup']:.1f}x faster), "
+            f"agreement (ARI): {report['agreement']:.4f}"
+        )
+        return
 
-    # Save cluster labels
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    np.save(output_path, cluster_labels)
-    print(f"Cluster labels saved to {output_path}")
+    cluster_lab(
+        args.input,
+        args.output,
+        args.eps,
+        args.min_samples,
+        mode=args.mode,
+        strip_budget=args.strip_budget,
+        cache=ResultCache(args.cache_dir) if args.cache_dir else None,
+    )
 
 
 if __name__ == "__main__":
-    input_lab = "../data/intermediate/example_lab.npy"
-    output_file = "../data/results/example_clusters.npy"
-    cluster_lab(input_lab, output_file)
+    main()
@@ -0,0 +1,233 @@
+"""
+Octree color quantization as a bounded-memory alternative to DBSCAN.
+
+Pixels are streamed into a fixed-depth RGB octree whose leaves hold pixel
+counts and channel sums, so memory depends only on the tree depth. Leaves are
+then folded into their parents, deepest and least populated first, until at
+most ``max_colors`` remain. Time is O(pixels) for streaming and labeling, plus
+a reduction over at most 8**max_depth nodes.
+"""
+
+import argparse
+
+import numpy as np
+
+from image_processing.scripts.preprocessing.extract_pixels import load_rgb
+from image_processing.utils.array_io import compact_labels, save_array
+from image_processing.utils.color_histogram import make_histogram, save_histogram
+
+# Pixels handled per streaming step.
+BLOCK_PIXELS = 1 << 20
+
+# Node ids store the tree level above the 24 key bits.
+_KEY_BITS = 24
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+
+def _spread_table(max_depth):
+    """Spread the top max_depth bits of every 8-bit value three bits apart."""
+    values = np.arange(256, dtype=np.uint32)
+    spread = np.zeros(256, dtype=np.uint32)
+    for level in range(max_depth):
+        spread |= ((values >> (7 - level)) & 1) << (3 * (max_depth - 1 - level))
+    return spread
+
+
+class OctreeQuantizer:
+    """
+    Streaming RGB octree quantizer.
+
+    Feed pixels with update(), call reduce() once, then map pixels to palette
+    labels with predict(). Labels are ordered by pixel count, most common first.
+    """
+
+    def __init__(self, max_colors=64, max_depth=6):
+        if not 1 <= max_depth <= 8:
+            raise ValueError("max_depth must be between 1 and 8.")
+        if max_colors < 1:
+            raise ValueError("max_colors must be at least 1.")
+        self.max_colors = max_colors
+        self.max_depth = max_depth
+        self._shift = 8 - max_depth
+        self._size = 1 << (3 * max_depth)
+        self._spread = _spread_table(max_depth)
+        self._counts = np.zeros(self._size, dtype=np.int64)
+        self._sums = np.zeros((self._size, 3), dtype=np.float64)
+        self.palette = None
+        self.palette_counts = None
+        self._lookup = None
+
+    def _leaf_keys(self, rgb_flat):
+        """
+        Octree leaf key of each pixel at max_depth.
+
+        Keys interleave one bit per channel per level (R, G, B from the most
+        significant bit down), so a node's parent key is simply ``key >> 3``.
+        """
+        spread = self._spread
+        return (
+            (spread[rgb_flat[:, 0]] << 2)
+            | (spread[rgb_flat[:, 1]] << 1)
+            | spread[rgb_flat[:, 2]]
+        )
+
+    def update(self, rgb_array):
+        """Stream an (..., 3) uint8 block of pixels into the tree."""
+        rgb_flat = np.asarray(rgb_array, dtype=np.uint8).reshape(-1, 3)
+        for start in range(0, rgb_flat.shape[0], BLOCK_PIXELS):
+            block = rgb_flat[start : start + BLOCK_PIXELS]
+            keys = self._leaf_keys(block)
+            self._counts += np.bincount(keys, minlength=self._size)
+            for channel in range(3):
+                self._sums[:, channel] += np.bincount(
+                    keys, weights=block[:, channel], minlength=self._size
+                )
+        return self
+
+    def _fold(self, keys, counts):
+        """Fold leaves into parents until at most max_colors remain."""
+        node_ids = (np.int64(self.max_depth) << _KEY_BITS) | keys.astype(np.int64)
+        level = self.max_depth
+        while level > 0:
+            leaf_ids, inverse = np.unique(node_ids, return_inverse=True)
+            excess = leaf_ids.size - self.max_colors
+            if excess <= 0:
+                break
+
+            leaf_parents = (leaf_ids & _KEY_MASK) >> 3
+            parents, parent_of_leaf = np.unique(leaf_parents, return_inverse=True)
+            children = np.bincount(parent_of_leaf)
+            leaf_totals = np.bincount(inverse, weights=counts)
+            parent_totals = np.bincount(parent_of_leaf, weights=leaf_totals)
+
+            # Fold the least populated parents first, as in classic octree reduction.
+            order = np.argsort(parent_totals, kind="stable")
+            saved = np.cumsum(children[order] - 1)
+            fold = np.zeros(parents.size, dtype=bool)
+            fold[order[: np.searchsorted(saved, excess) + 1]] = True
+
+            folded = fold[parent_of_leaf][inverse]
+            node_ids[folded] = (np.int64(level - 1) << _KEY_BITS) | (
+                (node_ids[folded] & _KEY_MASK) >> 3
+            )
+            level -= 1
+        return np.unique(node_ids, return_inverse=True)[1]
+
+    def reduce(self):
+        """Merge leaves down to the target palette size and build the lookup."""
+        keys = np.flatnonzero(self._counts)
+        if keys.size == 0:
+            raise ValueError("No pixels have been added to the quantizer.")
+        counts = self._counts[keys]
+        leaf_of_key = self._fold(keys, counts)
+
+        leaf_counts = np.bincount(leaf_of_key, weights=counts)
+        leaf_sums = np.stack(
+            [
+                np.bincount(leaf_of_key, weights=self._sums[keys, channel])
+                for channel in range(3)
+            ],
+            axis=1,
+        )
+
+        # Relabel so label 0 is the most common palette color.
+        order = np.argsort(-leaf_counts, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(order.size)
+        self.palette_counts = leaf_counts[order].astype(np.int64)
+        self.palette = np.rint(
+            leaf_sums[order] / leaf_counts[order, np.newaxis]
+        ).astype(np.uint8)
+
+        # Every octree cell maps to a label; unseen cells take the nearest color.
+        self._lookup = np.full(self._size, -1, dtype=np.int32)
+        self._lookup[keys] = rank[leaf_of_key]
+        unseen = np.flatnonzero(self._lookup < 0)
+        if unseen.size:
+            self._lookup[unseen] = self._nearest(self._cell_centers(unseen))
+        return self
+
+    def _cell_centers(self, keys):
+        """RGB center of the octree cells with the given leaf keys."""
+        rgb_values = np.zeros((keys.size, 3), dtype=np.int64)
+        for level in range(self.max_depth):
+            shift = 3 * (self.max_depth - 1 - level)
+            for channel in range(3):
+                level_bit = (keys >> (shift + 2 - channel)) & 1
+                rgb_values[:, channel] |= level_bit << (7 - level)
+        return rgb_values + (1 << self._shift) / 2
+
+    def _nearest(self, rgb_values):
+        """Index of the nearest palette color for each RGB value."""
+        palette = self.palette.astype(np.float64)
+        palette_norms = (palette**2).sum(axis=1)
+        labels = np.empty(rgb_values.shape[0], dtype=np.int32)
+        for start in range(0, rgb_values.shape[0], BLOCK_PIXELS // 64):
+            block = rgb_values[start : start + BLOCK_PIXELS // 64]
+            # |x - p|^2 without the per-row |x|^2 term, which cannot change argmin.
+            distances = palette_norms - 2.0 * (block @ palette.T)
+            labels[start : start + block.shape[0]] = distances.argmin(axis=1)
+        return labels
+
+    def predict(self, rgb_array):
+        """Map an (..., 3) uint8 array to an (...) int32 array of palette labels."""
+        if self._lookup is None:
+            raise ValueError("Call reduce() before predict().")
+        rgb_array = np.asarray(rgb_array, dtype=np.uint8)
+        rgb_flat = rgb_array.reshape(-1, 3)
+        labels = np.empty(rgb_flat.shape[0], dtype=np.int32)
+        for start in range(0, rgb_flat.shape[0], BLOCK_PIXELS):
+            block = rgb_flat[start : start + BLOCK_PIXELS]
+            labels[start : start + block.shape[0]] = self._lookup[
+                self._leaf_keys(block)
+            ]
+        return labels.reshape(rgb_array.shape[:-1])
+
+    def group_colors(self):
+        """Return {label: (r, g, b)}, the same shape as find_group_colors."""
+        return {
+            label: tuple(color) for label, color in enumerate(self.palette.tolist())
+        }
+
+
+def quantize_image(rgb_array, max_colors=64, max_depth=6):
+    """Quantize an (H, W, 3) uint8 image; returns (label_map, quantizer)."""
+    quantizer = OctreeQuantizer(max_colors=max_colors, max_depth=max_depth)
+    quantizer.update(rgb_array).reduce()
+    return quantizer.predict(rgb_array), quantizer
+
+
+def cluster_octree(
+    input_path, output_path, max_colors=64, max_depth=6, palette_path=None
+):
+    """Cluster an image with the octree quantizer and save the label map."""
+    label_map, quantizer = quantize_image(load_rgb(input_path), max_colors, max_depth)
+
+    save_array(output_path, compact_labels(label_map))
+    print(f"Cluster labels saved to {output_path}")
+
+    if palette_path:
+        palette = make_histogram(
+            quantizer.palette,
+            quantizer.palette_counts,
+            labels=np.arange(len(quantizer.palette)),
+        )
+        save_histogram(palette_path, palette)
+        print(f"Group colors saved to {palette_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster an image with an octree.")
+    parser.add_argument("--input", default="../data/images/example.png")
+    parser.add_argument("--output", default="../data/results/example_clusters.npy")
+    parser.add_argument("--palette", default="../data/results/example_groups.npz")
+    parser.add_argument("--max-colors", type=int, default=64)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+    cluster_octree(
+        args.input, args.output, args.max_colors, args.max_depth, args.palette
+    )
+
+
+if __name__ == "__main__":
+    main()
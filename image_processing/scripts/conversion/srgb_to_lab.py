@@ -1,22 +1,155 @@
-from PIL import Image
+"""
+sRGB to CIELAB conversion.
+
+The default "unique" method converts each distinct color only once, through a
+cached 256-entry sRGB-to-linear table, and scatters the results back to the
+pixel grid. The "full" method runs skimage's rgb2lab over every pixel.
+"""
+
 from skimage.color import rgb2lab
 import numpy as np
-import os
 
+from image_processing.scripts.preprocessing.extract_pixels import (
+    DEFAULT_STRIP_BUDGET,
+    count_colors,
+    count_colors_streaming,
+    image_shape,
+    iter_rgb_strips,
+    load_rgb,
+    strip_rows_for_budget,
+    unique_colors,
+)
+from image_processing.utils.array_io import LAB_DTYPE, open_output_array, save_array
+from image_processing.utils.color_histogram import make_histogram, save_histogram
+from image_processing.utils.result_cache import run_cached, source_version
+
+STAGE = "srgb_to_lab"
+VERSION = source_version(__file__)
+
+# Linear sRGB to CIE XYZ and the D65 (2 degree) white point, as used by skimage.
+XYZ_FROM_LINEAR_RGB = np.array(
+    [
+        [0.412453, 0.357580, 0.180423],
+        [0.212671, 0.715160, 0.072169],
+        [0.019334, 0.119193, 0.950227],
+    ]
+)
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+# Relative luminance weights of linear sRGB (the Y row, as defined by WCAG 2).
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+
+def _build_linear_table():
+    """Evaluate the sRGB gamma curve once for every 8-bit channel value."""
+    xsrgb = np.arange(256) / 255.0
+    return np.where(xsrgb <= 0.04045, xsrgb / 12.92, ((xsrgb + 0.055) / 1.055) ** 2.4)
+
+
+# Same piecewise curve as scripts/research/generate_sRGB_linear_graph.py.
+SRGB_TO_LINEAR = _build_linear_table()
+
+
+def rgb_to_lab(colors):
+    """Convert an (N, 3) uint8 sRGB array to (N, 3) float64 LAB."""
+    linear = SRGB_TO_LINEAR[np.asarray(colors, dtype=np.uint8)]
+    xyz = linear @ (XYZ_FROM_LINEAR_RGB / D65_WHITE[:, np.newaxis]).T
+
+    # Nonlinear compression, matching skimage.color.xyz2lab
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def relative_luminance(colors):
+    """Relative luminance Y in [0, 1] of an (..., 3) uint8 sRGB array."""
+    return SRGB_TO_LINEAR[np.asarray(colors, dtype=np.uint8)] @ LUMINANCE_WEIGHTS
+
+
+def image_to_lab(rgb_array, method="unique"):
+    """Convert an (H, W, 3) uint8 sRGB array to an (H, W, 3) float32 LAB array."""
+    if method == "full":
+        return rgb2lab(rgb_array).astype(LAB_DTYPE)
+    if method == "unique":
+        colors, _, inverse = unique_colors(rgb_array)
+        return np.take(rgb_to_lab(colors).astype(LAB_DTYPE), inverse, axis=0)
+    raise ValueError(f"Unknown conversion method: {method}")
+
+
+def palette_histogram(colors, counts):
+    """Build a color histogram with LAB values for (N, 3) colors and counts."""
+    return make_histogram(colors, counts, lab=rgb_to_lab(colors))
+
+
+def palette_to_lab(rgb_array):
+    """Return the image's color histogram with LAB values, without a pixel grid."""
+    return palette_histogram(*count_colors(rgb_array))
+
+
+def convert_to_lab_streaming(
+    input_path, output_path, method="unique", strip_budget=DEFAULT_STRIP_BUDGET
+):
+    """
+    Convert an image to LAB strip by strip into a memory-mapped .npy file.
+
+    Only one strip of RGB and LAB data is held in memory at a time; an image
+    file is still decoded in full first (see iter_rgb_strips).
+    """
+    height, width = image_shape(input_path)
+    lab_array = open_output_array(output_path, (height, width, 3), LAB_DTYPE)
+    strip_rows = strip_rows_for_budget(width, strip_budget)
+    for row_start, strip in iter_rgb_strips(input_path, strip_rows):
+        lab_array[row_start : row_start + strip.shape[0]] = image_to_lab(
+            strip, method=method
+        )
+    lab_array.flush()
+    del lab_array
+
+
+def convert_to_lab(
+    input_path, output_path, method="unique", strip_budget=None, cache=None
+):
+    """
+    Convert an image from sRGB to LAB color space.
+
+    With a strip_budget (bytes), the image is converted in bounded strips.
+    With a cache (ResultCache), re-running on an unchanged image restores the
+    previous output instead of converting again.
+    """
+
+    def compute():
+        if strip_budget:
+            convert_to_lab_streaming(input_path, output_path, method, strip_budget)
+            return
+
+        # Load the image
+        img_array = load_rgb(input_path)
+
+        # Convert to LAB color space
+        lab_array = image_to_lab(img_array, method=method)
+
+        # Save LAB values to a .npy file
+        save_array(output_path, lab_array)
 
-def convert_to_lab(input_path, output_path):
-    """Convert an image from sRGB to LAB color space."""
-    # Load the image
-    img = Image.open(input_path).convert("RGB")
-    img_array = np.array(img)  # Convert to numpy array
+    params = {"method": method}
+    if run_cached(cache, STAGE, input_path, params, output_path, compute, VERSION):
+        print(f"LAB data restored from cache to {output_path}")
+    else:
+        print(f"LAB data saved to {output_path}")
 
-    # Convert to LAB color space
-    lab_array = rgb2lab(img_array)
 
-    # Save LAB values to a .npy file
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    np.save(output_path, lab_array)
-    print(f"LAB data saved to {output_path}")
+def convert_palette_to_lab(input_path, output_path, strip_budget=None):
+    """Convert only the distinct colors of an image and save a LAB histogram."""
+    if strip_budget:
+        histogram = palette_histogram(*count_colors_streaming(input_path, strip_budget))
+    else:
+        histogram = palette_to_lab(load_rgb(input_path))
+    save_histogram(output_path, histogram)
+    print(f"LAB palette of {len(histogram)} colors saved to {output_path}")
 
 
 if __name__ == "__main__":
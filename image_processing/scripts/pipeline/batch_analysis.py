@@ -0,0 +1,273 @@
+"""
+Multi-core batch color analysis over a directory or glob of images.
+
+Images are distributed across a process pool sized to the machine. Each worker
+counts one image's colors and returns its histogram; a failing image is
+recorded and skipped without affecting the rest, and a worker that dies takes
+down only the image it was analyzing. Per-image histograms are summed into a
+corpus-wide histogram whose LAB values are computed once at the end.
+"""
+
+import argparse
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from image_processing.scripts.conversion.srgb_to_lab import palette_histogram
+from image_processing.scripts.preprocessing.extract_pixels import (
+    ALPHA_MODES,
+    COLOR_SPACE_SIZE,
+    process_image,
+)
+from image_processing.utils.color_histogram import (
+    make_histogram,
+    save_histogram,
+    unpack_rgb,
+)
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff"}
+
+# Images queued on the pool per worker; a pool crash loses at most these.
+QUEUED_PER_WORKER = 2
+
+
+def find_images(source):
+    """Return sorted image paths from a directory (recursively) or glob pattern."""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "**", "*")
+    else:
+        pattern = source
+    return sorted(
+        path
+        for path in glob.glob(pattern, recursive=True)
+        if os.path.isfile(path)
+        and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+
+def histogram_path(output_dir, index, image_path):
+    """Per-image histogram path, prefixed by index so equal names cannot clash."""
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(output_dir, f"{index:05d}_{stem}.npz")
+
+
+def analyze_image(
+    index, image_path, output_dir=None, strip_budget=None, alpha_mode="ignore"
+):
+    """
+    Count the colors of one image (runs in a worker process).
+
+    Returns a result dict with either a histogram or an error message, so one
+    bad file never aborts the batch.
+    """
+    start = time.perf_counter()
+    try:
+        colors, counts = process_image(image_path, strip_budget, alpha_mode)
+        histogram = make_histogram(colors, counts)
+        if output_dir:
+            save_histogram(histogram_path(output_dir, index, image_path), histogram)
+        return {
+            "path": image_path,
+            "histogram": histogram,
+            "pixels": round(float(counts.sum())),
+            "seconds": time.perf_counter() - start,
+        }
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return _failure(image_path, exc)
+
+
+def _failure(image_path, exc):
+    return {"path": image_path, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _pool_result(future, image_path):
+    """A finished future's result dict, or None if the pool broke under it."""
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        return None
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return _failure(image_path, exc)
+
+
+def _analyze_isolated(index, image_path, *options):
+    """Analyze one image in a process of its own, so a crash fails only it."""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(analyze_image, index, image_path, *options)
+        result = _pool_result(future, image_path)
+    if result is None:
+        return {"path": image_path, "error": "Worker process died."}
+    return result
+
+
+def analyze_parallel(
+    paths, workers, output_dir=None, strip_budget=None, alpha_mode="ignore"
+):
+    """
+    Yield analyze_image results for paths from a process pool.
+
+    A worker that dies (segfault, out of memory) breaks the whole pool. The
+    images that were in flight are then re-run one per process, which fails
+    only the image that crashed, and the rest continue on a fresh pool.
+    """
+    options = (output_dir, strip_budget, alpha_mode)
+    tasks = deque(enumerate(paths))
+    while tasks:
+        lost = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while (tasks or running) and not lost:
+                while tasks and len(running) < workers * QUEUED_PER_WORKER:
+                    index, path = tasks.popleft()
+                    future = pool.submit(analyze_image, index, path, *options)
+                    running[future] = (index, path)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, path = running.pop(future)
+                    result = _pool_result(future, path)
+                    if result is None:
+                        lost.append((index, path))
+                    else:
+                        yield result
+            # The pool is broken; whatever it had not finished is lost too.
+            for future, (index, path) in running.items():
+                result = _pool_result(future, path)
+                if result is None:
+                    lost.append((index, path))
+                else:
+                    yield result
+        for index, path in sorted(lost):
+            yield _analyze_isolated(index, path, *options)
+
+
+class CorpusHistogram:
+    """
+    Corpus-wide color counts accumulated in a fixed 2**24 bin array.
+
+    weighted=True accumulates float opacity-weighted counts.
+    """
+
+    def __init__(self, weighted=False):
+        self._bins = np.zeros(
+            COLOR_SPACE_SIZE, dtype=np.float64 if weighted else np.int64
+        )
+
+    def add(self, histogram):
+        """Add one image histogram; its colors are unique, so this is O(palette)."""
+        self._bins[histogram["rgb"]] += histogram["count"]
+
+    def histogram(self, with_lab=True):
+        """Return the merged histogram, with LAB values computed once per color."""
+        colors = np.flatnonzero(self._bins).astype(np.uint32)
+        counts = self._bins[colors]
+        if with_lab:
+            return palette_histogram(unpack_rgb(colors), counts)
+        return make_histogram(colors, counts)
+
+
+def run_batch(
+    paths,
+    workers=None,
+    output_dir=None,
+    strip_budget=None,
+    with_lab=True,
+    alpha_mode="ignore",
+):
+    """
+    Analyze images in parallel and merge their histograms.
+
+    Returns a report dict with the corpus histogram, failures, and throughput
+    in images/sec and pixels/sec. workers=1 runs everything in-process.
+    alpha_mode (see extract_pixels.ALPHA_MODES) decides how transparent
+    pixels are counted; "weighted" yields float counts.
+    """
+    if alpha_mode not in ALPHA_MODES:
+        raise ValueError(f"Unknown alpha mode: {alpha_mode}")
+    workers = workers or os.cpu_count() or 1
+    corpus = CorpusHistogram(weighted=alpha_mode == "weighted")
+    failures = {}
+    pixels = 0
+    analyzed = 0
+    start = time.perf_counter()
+
+    def collect(result):
+        nonlocal pixels, analyzed
+        if "error" in result:
+            failures[result["path"]] = result["error"]
+            return
+        corpus.add(result["histogram"])
+        pixels += result["pixels"]
+        analyzed += 1
+
+    if workers == 1:
+        for index, path in enumerate(paths):
+            collect(analyze_image(index, path, output_dir, strip_budget, alpha_mode))
+    else:
+        results = analyze_parallel(paths, workers, output_dir, strip_budget, alpha_mode)
+        for result in results:
+            collect(result)
+
+    seconds = time.perf_counter() - start
+    return {
+        "histogram": corpus.histogram(with_lab=with_lab),
+        "images": analyzed,
+        "failures": failures,
+        "pixels": pixels,
+        "workers": workers,
+        "seconds": seconds,
+        "images_per_second": analyzed / seconds if seconds else 0.0,
+        "pixels_per_second": pixels / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count colors across a directory or glob of images in parallel."
+    )
+    parser.add_argument("source", help="Directory or glob pattern of images.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", help="Save per-image histograms here.")
+    parser.add_argument(
+        "--corpus-output", default="../data/results/corpus_histogram.npz"
+    )
+    parser.add_argument("--strip-budget", type=int, default=None)
+    parser.add_argument(
+        "--alpha-mode",
+        choices=ALPHA_MODES,
+        default="ignore",
+        help="Skip transparent pixels or weight pixels by opacity.",
+    )
+    args = parser.parse_args()
+
+    paths = find_images(args.source)
+    if not paths:
+        print(f"No images found for '{args.source}'.")
+        return
+
+    report = run_batch(
+        paths,
+        args.workers,
+        args.output_dir,
+        args.strip_budget,
+        alpha_mode=args.alpha_mode,
+    )
+    save_histogram(args.corpus_output, report["histogram"])
+
+    print(
+        f"Analyzed {report['images']}/{len(paths)} images with "
+        f"{report['workers']} workers in {report['seconds']:.2f}s "
+        f"({report['images_per_second']:.1f} images/sec, "
+        f"{report['pixels_per_second'] / 1e6:.1f} MP/sec)."
+    )
+    for path, error in report["failures"].items():
+        print(f"Failed: {path}: {error}")
+    print(f"Corpus histogram saved to {args.corpus_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Incremental DAG runner for the image analysis stages.
+
+Stages are declared with the stages they depend on and exchange arrays in
+memory instead of through ``../data/intermediate`` files. Every stage gets a
+fingerprint built from the input image's digest, its parameters, its code
+version and the fingerprints of its dependencies, so, make-style, a run only
+recomputes the stages downstream of a changed input, parameter or module.
+Results are reused from earlier runs in the same process (a memo bounded to
+``memo_bytes``) or from a ResultCache on disk, and stages whose dependencies
+are ready run concurrently on a thread pool (e.g. the histogram branch
+alongside clustering).
+"""
+
+import argparse
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from image_processing.scripts.analysis import visualize_clusters
+from image_processing.scripts.clustering import lab_clustering
+from image_processing.scripts.conversion.srgb_to_lab import (
+    image_to_lab,
+    palette_to_lab,
+)
+from image_processing.scripts.preprocessing.extract_pixels import load_rgb
+from image_processing.utils.array_io import compact_labels, save_array
+from image_processing.utils.color_histogram import save_histogram
+from image_processing.utils.result_cache import (
+    ResultCache,
+    file_digest,
+    source_version,
+)
+
+# Stage results kept in memory between runs, least recently used dropped first.
+DEFAULT_MEMO_BYTES = 512 << 20
+
+
+def _nbytes(result):
+    return getattr(result, "nbytes", 0)
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    func is called as ``func(*dependency_results, **params)``; a stage without
+    dependencies receives the input image path instead. Results must be NumPy
+    arrays. persist=False keeps a stage out of the on-disk cache (e.g. decoded
+    pixels, which are cheaper to decode again than to store).
+    """
+
+    def __init__(self, name, func, deps=(), params=None, persist=True, version=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = dict(params or {})
+        self.persist = persist
+        self.version = version or source_version(inspect.getsourcefile(func))
+
+
+class Pipeline:
+    """A DAG of stages run incrementally over one image at a time."""
+
+    def __init__(
+        self, stages=(), cache=None, max_workers=None, memo_bytes=DEFAULT_MEMO_BYTES
+    ):
+        self.stages = {}
+        self.cache = cache
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.memo_bytes = memo_bytes
+        # stage name -> (fingerprint, result), least recently used first.
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        for stage in stages:
+            self.add(stage)
+
+    def add(self, stage):
+        """Register a stage; its dependencies must already be registered."""
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicate stage '{stage.name}'.")
+        missing = [dep for dep in stage.deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown {missing}.")
+        self.stages[stage.name] = stage
+        return stage
+
+    def order(self):
+        """Stage names in dependency order (registration order is topological)."""
+        return list(self.stages)
+
+    def fingerprints(self, image_path, params=None):
+        """Fingerprint of every stage for this input and parameter overrides."""
+        input_digest = file_digest(image_path)
+        fingerprints = {}
+        for name in self.order():
+            stage = self.stages[name]
+            upstream = [fingerprints[dep] for dep in stage.deps] or [input_digest]
+            fingerprints[name] = ResultCache.make_key(
+                name,
+                ",".join(upstream),
+                self._params(stage, params),
+                stage.version,
+            )
+        return fingerprints
+
+    @staticmethod
+    def _params(stage, params):
+        return {**stage.params, **((params or {}).get(stage.name) or {})}
+
+    def _recall(self, name, fingerprint):
+        """A stage's memoized result for this fingerprint, or None."""
+        with self._memo_lock:
+            memo = self._memo.get(name)
+            if memo is None or memo[0] != fingerprint:
+                return None
+            self._memo.move_to_end(name)
+            return memo[1]
+
+    def _remember(self, name, fingerprint, result):
+        """Memoize a result, evicting the least recently used past memo_bytes."""
+        with self._memo_lock:
+            self._memo.pop(name, None)
+            if _nbytes(result) > self.memo_bytes:
+                return
+            self._memo[name] = (fingerprint, result)
+            total = sum(_nbytes(memo[1]) for memo in self._memo.values())
+            while total > self.memo_bytes:
+                _, (_, evicted) = self._memo.popitem(last=False)
+                total -= _nbytes(evicted)
+
+    def _available(self, stage, fingerprint):
+        if self._recall(stage.name, fingerprint) is not None:
+            return True
+        return (
+            stage.persist
+            and self.cache is not None
+            and self.cache.lookup(fingerprint) is not None
+        )
+
+    def plan(self, image_path, targets=None, params=None):
+        """
+        Decide which stages a run needs.
+
+        Returns (fingerprints, compute, reuse): stages to compute and stages
+        whose earlier results are reused. Dependencies of a reusable stage are
+        not visited, so nothing upstream of an unchanged result is loaded.
+        """
+        fingerprints = self.fingerprints(image_path, params)
+        compute, reuse = set(), set()
+
+        def visit(name):
+            if name in compute or name in reuse:
+                return
+            stage = self.stages[name]
+            if self._available(stage, fingerprints[name]):
+                reuse.add(name)
+                return
+            compute.add(name)
+            for dep in stage.deps:
+                visit(dep)
+
+        for target in targets or self.order():
+            if target not in self.stages:
+                raise ValueError(f"Unknown stage '{target}'.")
+            visit(target)
+        return fingerprints, compute, reuse
+
+    def _load(self, stage, fingerprints, image_path, params, recomputed):
+        """
+        The earlier result of a stage planned for reuse.
+
+        If it has left the memo or been evicted from the cache since planning,
+        it is recomputed from its dependencies, loaded the same way.
+        """
+        fingerprint = fingerprints[stage.name]
+        result = self._recall(stage.name, fingerprint)
+        if result is None and stage.persist and self.cache is not None:
+            result = self.cache.get_array(fingerprint)
+        if result is None:
+            inputs = [
+                self._load(
+                    self.stages[dep], fingerprints, image_path, params, recomputed
+                )
+                for dep in stage.deps
+            ]
+            result = self._compute(
+                stage, fingerprint, inputs or [image_path], self._params(stage, params)
+            )
+            self._remember(stage.name, fingerprint, result)
+            recomputed.append(stage.name)
+        return result
+
+    def _compute(self, stage, fingerprint, inputs, params):
+        result = stage.func(*inputs, **params)
+        if stage.persist and self.cache is not None:
+            self.cache.put_array(fingerprint, result)
+        return result
+
+    def run(self, image_path, targets=None, params=None):
+        """
+        Run the stages needed for targets (default: every stage).
+
+        params maps stage names to parameter overrides. Returns a report dict
+        with the target results and the stages computed and reused. Other
+        stage results are released as soon as every stage consuming them has
+        started.
+        """
+        targets = list(targets or self.order())
+        fingerprints, compute, reuse = self.plan(image_path, targets, params)
+        start = time.perf_counter()
+        results = {}
+        recomputed = []
+        pending = [name for name in self.order() if name in compute or name in reuse]
+        consumers = {
+            name: {other for other in compute if name in self.stages[other].deps}
+            for name in pending
+        }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if name in reuse:
+                        future = pool.submit(
+                            self._load,
+                            stage,
+                            fingerprints,
+                            image_path,
+                            params,
+                            recomputed,
+                        )
+                    elif all(dep in results for dep in stage.deps):
+                        inputs = [results[dep] for dep in stage.deps] or [image_path]
+                        future = pool.submit(
+                            self._compute,
+                            stage,
+                            fingerprints[name],
+                            inputs,
+                            self._params(stage, params),
+                        )
+                    else:
+                        continue
+                    running[future] = name
+                    pending.remove(name)
+                    for dep in stage.deps if name in compute else ():
+                        consumers[dep].discard(name)
+                        if not consumers[dep] and dep not in targets:
+                            results.pop(dep, None)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    self._remember(name, fingerprints[name], results[name])
+
+        computed = compute.union(recomputed)
+        return {
+            "results": {name: results[name] for name in targets},
+            "computed": [name for name in self.order() if name in computed],
+            "reused": [name for name in self.order() if name in reuse - computed],
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def _clusters(lab_array, eps=0.5, min_samples=10, mode="weighted"):
+    return compact_labels(
+        lab_clustering.label_lab_array(lab_array, eps, min_samples, mode)
+    )
+
+
+def _cluster_chart(label_map):
+    return np.frombuffer(visualize_clusters.render_clusters(label_map), dtype=np.uint8)
+
+
+def build_pipeline(cache=None, max_workers=None):
+    """
+    The standard analysis DAG.
+
+    ``rgb`` (composited onto ``background`` if one is given, so transparent
+    pixels do not read as black) feeds two independent branches:
+    ``histogram`` (the image's color histogram with LAB values) and ``lab`` ->
+    ``clusters`` -> ``cluster_chart`` (PNG bytes).
+    """
+    return Pipeline(
+        [
+            Stage("rgb", load_rgb, params={"background": None}, persist=False),
+            Stage("histogram", palette_to_lab, deps=["rgb"]),
+            Stage("lab", image_to_lab, deps=["rgb"], params={"method": "unique"}),
+            Stage(
+                "clusters",
+                _clusters,
+                deps=["lab"],
+                params={"eps": 0.5, "min_samples": 10, "mode": "weighted"},
+                version=lab_clustering.VERSION,
+            ),
+            Stage(
+                "cluster_chart",
+                _cluster_chart,
+                deps=["clusters"],
+                version=visualize_clusters.VERSION,
+            ),
+        ],
+        cache=cache,
+        max_workers=max_workers,
+    )
+
+
+def save_output(path, result):
+    """Write a stage result: PNG bytes, a .npz histogram or a .npy array."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".png":
+        with open(path, "wb") as file:
+            file.write(np.asarray(result).tobytes())
+    elif extension == ".npz":
+        save_histogram(path, result)
+    else:
+        save_array(path, result)
+
+
+OUTPUT_FILES = {
+    "histogram": "histogram.npz",
+    "lab": "lab.npy",
+    "clusters": "clusters.npy",
+    "cluster_chart": "clusters.png",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the analysis stages as an incremental DAG."
+    )
+    parser.add_argument("--input", default="../data/images/example.png")
+    parser.add_argument("--output-dir", default="../data/results")
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        default=["histogram", "cluster_chart"],
+        choices=sorted(OUTPUT_FILES),
+    )
+    parser.add_argument("--eps", type=float, default=0.5)
+    parser.add_argument("--min-samples", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=None, help="Defaults to data/cache.")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir) if args.cache_dir else ResultCache()
+    pipeline = build_pipeline(cache=cache, max_workers=args.workers)
+    report = pipeline.run(
+        args.input,
+        targets=args.targets,
+        params={"clusters": {"eps": args.eps, "min_samples": args.min_samples}},
+    )
+
+    stem = os.path.splitext(os.path.basename(args.input))[0]
+    for name, result in report["results"].items():
+        path = os.path.join(args.output_dir, f"{stem}_{OUTPUT_FILES[name]}")
+        save_output(path, result)
+        print(f"{name} saved to {path}")
+    print(
+        f"Computed {report['computed'] or 'nothing'}, reused {report['reused']} "
+        f"in {report['seconds']:.2f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
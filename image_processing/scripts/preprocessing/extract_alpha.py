@@ -1 +1,78 @@
-# Placeholder file for extracting alpha channel data
+"""
+Alpha-aware pixel extraction.
+
+By default load_rgb() flattens transparency away, so fully transparent pixels
+count as whatever color they happen to store (usually black). These helpers
+keep the alpha channel: they histogram it, count colors while skipping
+transparent pixels or weighting them by opacity, and composite onto solid
+backgrounds with integer arithmetic over the whole array. The counting and
+compositing primitives live in extract_pixels, so process_image() and the
+batch runner honor the same alpha modes.
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from image_processing.scripts.preprocessing.extract_pixels import (
+    ALPHA_MODES,
+    composite,
+    count_colors_rgba,
+    load_rgba,
+)
+from image_processing.utils.color_histogram import make_histogram, save_histogram
+
+DEFAULT_BACKGROUNDS = {"light": (255, 255, 255), "dark": (0, 0, 0)}
+
+
+def alpha_histogram(rgba_array):
+    """Pixel count of each of the 256 alpha values."""
+    alpha = np.asarray(rgba_array)[..., 3].reshape(-1)
+    return np.bincount(alpha, minlength=256).astype(np.int64)
+
+
+def alpha_coverage(histogram):
+    """Transparent / partial / opaque fractions and mean opacity of a histogram."""
+    total = histogram.sum()
+    if total == 0:
+        return {"transparent": 0.0, "partial": 0.0, "opaque": 0.0, "opacity": 0.0}
+    return {
+        "transparent": float(histogram[0] / total),
+        "partial": float(histogram[1:255].sum() / total),
+        "opaque": float(histogram[255] / total),
+        "opacity": float(histogram @ np.arange(256) / (255.0 * total)),
+    }
+
+
+def composite_backgrounds(rgba_array, backgrounds=None):
+    """Composite onto each named background; returns {name: (H, W, 3) array}."""
+    backgrounds = backgrounds or DEFAULT_BACKGROUNDS
+    return {name: composite(rgba_array, color) for name, color in backgrounds.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count the visible colors of an image with an alpha channel."
+    )
+    parser.add_argument("image_path", help="Path to the image file.")
+    parser.add_argument("output_file", help="Output .npz color histogram.")
+    parser.add_argument("--mode", choices=ALPHA_MODES, default="skip")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.image_path):
+        print(f"Error: File '{args.image_path}' not found.")
+        return
+
+    rgba = load_rgba(args.image_path)
+    coverage = alpha_coverage(alpha_histogram(rgba))
+    colors, counts = count_colors_rgba(rgba, mode=args.mode)
+    save_histogram(args.output_file, make_histogram(colors, counts))
+    print(
+        f"{len(colors)} colors saved to '{args.output_file}' "
+        f"({coverage['transparent']:.1%} of pixels transparent)."
+    )
+
+
+if __name__ == "__main__":
+    main()
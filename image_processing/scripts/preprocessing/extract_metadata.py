@@ -1 +1,224 @@
-# Placeholder file for extracting metadata
+"""
+Header-only image metadata extraction for PNG, JPEG and GIF.
+
+Only the few bytes that describe an image are read: the PNG IHDR chunk (plus
+the headers of the chunks before the first IDAT), the JPEG markers up to the
+start-of-frame segment, and the GIF logical screen descriptor. No pixel data
+is decoded, so the cost does not depend on the image size.
+"""
+
+import argparse
+import io
+import json
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+GIF_SIGNATURES = (b"GIF87a", b"GIF89a")
+JPEG_SOI = b"\xff\xd8"
+
+PNG_COLOR_TYPES = {
+    0: "grayscale",
+    2: "rgb",
+    3: "indexed",
+    4: "grayscale_alpha",
+    6: "rgba",
+}
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# Start-of-frame markers and the coding process each one declares.
+JPEG_SOF_MARKERS = {
+    0xC0: "baseline_dct",
+    0xC1: "extended_dct",
+    0xC2: "progressive_dct",
+    0xC3: "lossless",
+    0xC5: "differential_sequential_dct",
+    0xC6: "differential_progressive_dct",
+    0xC7: "differential_lossless",
+    0xC9: "extended_dct_arithmetic",
+    0xCA: "progressive_dct_arithmetic",
+    0xCB: "lossless_arithmetic",
+    0xCD: "differential_sequential_dct_arithmetic",
+    0xCE: "differential_progressive_dct_arithmetic",
+    0xCF: "differential_lossless_arithmetic",
+}
+JPEG_COLOR_TYPES = {1: "grayscale", 3: "ycbcr", 4: "cmyk"}
+# Markers without a length field.
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
+# A PNG's metadata chunks are small; larger ones (e.g. ICC profiles) are
+# recorded by name only.
+PNG_MAX_CHUNK_READ = 64
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated image header.")
+    return data
+
+
+def _png_metadata(stream):
+    length, chunk_type = struct.unpack(">I4s", _read_exact(stream, 8))
+    if chunk_type != b"IHDR" or length != 13:
+        raise ValueError("PNG is missing its IHDR chunk.")
+    width, height, bit_depth, color_type, compression, filter_method, interlace = (
+        struct.unpack(">IIBBBBB", _read_exact(stream, 13))
+    )
+    stream.seek(4, io.SEEK_CUR)  # IHDR CRC
+
+    metadata = {
+        "interlaced": interlace == 1,
+        "filter_method": filter_method,
+        "channels": PNG_CHANNELS.get(color_type),
+        "has_transparency": color_type in (4, 6),
+        "chunks": [],
+    }
+    # Walk the chunk headers before the pixel data, skipping their bodies.
+    while True:
+        header = stream.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", header)
+        name = chunk_type.decode("latin-1")
+        if name in ("IDAT", "IEND"):
+            break
+        metadata["chunks"].append(name)
+        body = stream.read(length) if length <= PNG_MAX_CHUNK_READ else None
+        if body is None:
+            stream.seek(length, io.SEEK_CUR)
+        elif name == "tRNS":
+            metadata["has_transparency"] = True
+        elif name == "gAMA" and length == 4:
+            metadata["gamma"] = struct.unpack(">I", body)[0] / 100000
+        elif name == "sRGB" and length == 1:
+            metadata["srgb_intent"] = body[0]
+        elif name == "pHYs" and length == 9:
+            x_density, y_density, unit = struct.unpack(">IIB", body)
+            metadata["pixels_per_unit"] = [x_density, y_density]
+            metadata["unit"] = "meter" if unit == 1 else "unknown"
+        stream.seek(4, io.SEEK_CUR)  # CRC
+
+    return {
+        "format": "png",
+        "width": width,
+        "height": height,
+        "bit_depth": bit_depth,
+        "color_type": PNG_COLOR_TYPES.get(color_type, f"unknown_{color_type}"),
+        "compression_method": "deflate" if compression == 0 else str(compression),
+        "metadata": metadata,
+    }
+
+
+def _jpeg_metadata(stream):
+    metadata = {"segments": []}
+    while True:
+        byte = _read_exact(stream, 1)
+        if byte != b"\xff":
+            raise ValueError("Malformed JPEG marker.")
+        marker = _read_exact(stream, 1)[0]
+        while marker == 0xFF:  # Fill bytes
+            marker = _read_exact(stream, 1)[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("JPEG has no start-of-frame segment.")
+
+        (length,) = struct.unpack(">H", _read_exact(stream, 2))
+        if marker in JPEG_SOF_MARKERS:
+            precision, height, width, components = struct.unpack(
+                ">BHHB", _read_exact(stream, 6)
+            )
+            metadata["components"] = components
+            metadata["progressive"] = marker in (0xC2, 0xC6, 0xCA, 0xCE)
+            return {
+                "format": "jpeg",
+                "width": width,
+                "height": height,
+                "bit_depth": precision,
+                "color_type": JPEG_COLOR_TYPES.get(
+                    components, f"{components}_components"
+                ),
+                "compression_method": JPEG_SOF_MARKERS[marker],
+                "metadata": metadata,
+            }
+
+        if 0xE0 <= marker <= 0xEF:
+            identifier = stream.read(min(length - 2, 5))
+            stream.seek(length - 2 - len(identifier), io.SEEK_CUR)
+            name = identifier.split(b"\x00", 1)[0].decode("latin-1", "replace")
+            metadata["segments"].append(f"APP{marker - 0xE0}:{name}")
+        else:
+            stream.seek(length - 2, io.SEEK_CUR)
+
+
+def _gif_metadata(stream, version):
+    width, height, packed, background_index, aspect = struct.unpack(
+        "<HHBBB", _read_exact(stream, 7)
+    )
+    has_color_table = bool(packed & 0x80)
+    return {
+        "format": "gif",
+        "width": width,
+        "height": height,
+        "bit_depth": (
+            (packed & 0x07) + 1 if has_color_table else ((packed >> 4) & 7) + 1
+        ),
+        "color_type": "indexed",
+        "compression_method": "lzw",
+        "metadata": {
+            "version": version,
+            "global_color_table": has_color_table,
+            "global_color_table_size": (
+                2 ** ((packed & 0x07) + 1) if has_color_table else 0
+            ),
+            "color_resolution": ((packed >> 4) & 7) + 1,
+            "background_color_index": background_index,
+            "pixel_aspect_ratio": aspect,
+        },
+    }
+
+
+def read_metadata(stream):
+    """
+    Parse the header of a binary stream positioned at the start of an image.
+
+    Returns a dict with format, width, height, bit_depth, color_type,
+    compression_method and a format-specific ``metadata`` dict. Raises
+    ValueError for unsupported or truncated files.
+    """
+    signature = stream.read(8)
+    if signature == PNG_SIGNATURE:
+        return _png_metadata(stream)
+    if signature[:2] == JPEG_SOI:
+        stream.seek(-6, io.SEEK_CUR)
+        return _jpeg_metadata(stream)
+    if signature[:6] in GIF_SIGNATURES:
+        stream.seek(-2, io.SEEK_CUR)
+        return _gif_metadata(stream, signature[3:6].decode("ascii"))
+    raise ValueError("Unsupported image format; expected PNG, JPEG or GIF.")
+
+
+def extract_metadata(source):
+    """Header metadata of an image given as a file path or its bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return read_metadata(io.BytesIO(source))
+    with open(source, "rb") as stream:
+        return read_metadata(stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Print image header metadata without decoding pixels."
+    )
+    parser.add_argument("paths", nargs="+", help="PNG, JPEG or GIF files.")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        try:
+            print(json.dumps({"path": path, **extract_metadata(path)}))
+        except (OSError, ValueError) as exc:
+            print(json.dumps({"path": path, "error": str(exc)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,361 @@
-# Placeholder file for extracting pixel data
+"""
+Vectorized pixel extraction and unique-color counting.
+
+Colors are packed into 24-bit integers (0xRRGGBB) so an image can be counted
+with a single bincount/unique pass over its NumPy buffer instead of a
+per-pixel Python loop. Every counting entry point takes an alpha mode, so
+transparent pixels need not be counted as the color they happen to store.
+"""
+
+import argparse
+import os
+
+import numpy as np
+from PIL import Image
+
+from image_processing.utils.color_histogram import (
+    make_histogram,
+    merge_packed_counts,
+    pack_rgb,
+    save_histogram,
+    unpack_rgb,
+)
+
+# Number of distinct 24-bit sRGB colors.
+COLOR_SPACE_SIZE = 1 << 24
+
+# Below this many pixels np.unique beats allocating a full 2**24 bincount.
+BINCOUNT_MIN_PIXELS = 1 << 20
+
+# Pixels packed and counted per block, bounding the temporary uint32 buffer.
+COUNT_BLOCK_PIXELS = 1 << 24
+
+# Default working-memory budget for one strip in streaming mode.
+DEFAULT_STRIP_BUDGET = 32 << 20
+
+# Working bytes per pixel of a strip: uint8 RGB, packed colors, inverse indices
+# and a float64 LAB strip, with headroom for temporaries.
+STRIP_BYTES_PER_PIXEL = 48
+
+# Per-strip histograms buffered before merging them in streaming mode.
+MERGE_MIN_STRIPS = 4
+
+# How alpha is treated when counting colors: drop alpha == 0 pixels, weight
+# every pixel by alpha / 255 (float counts), or ignore alpha so transparent
+# pixels count as whatever color they store (usually black).
+ALPHA_MODES = ("skip", "weighted", "ignore")
+
+
+def load_rgb(image_path, background=None):
+    """
+    Load an image as an (H, W, 3) uint8 sRGB array.
+
+    Alpha is dropped, so transparent pixels keep whatever color they store;
+    with a background (r, g, b) the image is composited onto it instead.
+    """
+    with Image.open(image_path) as img:
+        if background is None:
+            return np.asarray(img.convert("RGB"))
+        return composite(np.asarray(img.convert("RGBA")), background)
+
+
+def load_rgba(image_path):
+    """Load an image as an (H, W, 4) uint8 RGBA array (opaque if no alpha)."""
+    with Image.open(image_path) as img:
+        return np.asarray(img.convert("RGBA"))
+
+
+def composite(rgba_array, background=(255, 255, 255)):
+    """Alpha-composite an (..., 4) uint8 array over a solid sRGB background."""
+    rgba_array = np.asarray(rgba_array, dtype=np.uint8)
+    alpha = rgba_array[..., 3:].astype(np.uint16)
+    rgb = rgba_array[..., :3].astype(np.uint16)
+    background = np.asarray(background, dtype=np.uint16)
+    # Rounded integer blend: (c * a + bg * (255 - a)) / 255.
+    blended = rgb * alpha + background * (255 - alpha) + 127
+    return (blended // 255).astype(np.uint8)
+
+
+def _check_alpha_mode(alpha_mode):
+    if alpha_mode not in ALPHA_MODES:
+        raise ValueError(f"Unknown alpha mode: {alpha_mode}")
+
+
+def image_shape(source):
+    """(height, width) of an image path, .npy RGB array path or array."""
+    if isinstance(source, np.ndarray):
+        return source.shape[:2]
+    if str(source).endswith(".npy"):
+        return np.load(source, mmap_mode="r").shape[:2]
+    with Image.open(source) as img:
+        return img.height, img.width
+
+
+def strip_rows_for_budget(
+    width, strip_budget=DEFAULT_STRIP_BUDGET, bytes_per_pixel=STRIP_BYTES_PER_PIXEL
+):
+    """Number of image rows whose working memory fits in strip_budget bytes."""
+    return max(1, int(strip_budget) // (int(width) * bytes_per_pixel))
+
+
+def iter_rgb_strips(source, strip_rows, mode="RGB"):
+    """
+    Yield (row_start, strip) pairs of (rows, W, 3) uint8 sRGB strips.
+
+    Arrays are yielded with the channels they have; image files are converted
+    to mode, so mode="RGBA" yields (rows, W, 4) strips that keep alpha.
+
+    source may be an array, a .npy file (memory-mapped, so only the current
+    strip is read) or an image file. PIL cannot decode PNG or JPEG partially,
+    so an image file is decoded in full, in its native mode, and only the RGB
+    conversion happens one strip at a time: no full-size RGB, packed or LAB
+    copy is made, but the decoded image itself grows with the image size.
+    Save the pixels as .npy to keep memory within the strip budget.
+    """
+    if isinstance(source, np.ndarray) or str(source).endswith(".npy"):
+        pixels = source
+        if not isinstance(source, np.ndarray):
+            pixels = np.load(source, mmap_mode="r")
+        for row_start in range(0, pixels.shape[0], strip_rows):
+            strip = pixels[row_start : row_start + strip_rows]
+            yield row_start, np.asarray(strip, dtype=np.uint8)
+        return
+
+    with Image.open(source) as img:
+        img.load()
+        for row_start in range(0, img.height, strip_rows):
+            box = (0, row_start, img.width, min(row_start + strip_rows, img.height))
+            yield row_start, np.asarray(img.crop(box).convert(mode))
+
+
+def _count_blocks(blocks):
+    """Accumulate packed color blocks into a full 2**24 bincount."""
+    bins = None
+    for block in blocks:
+        block_bins = np.bincount(block, minlength=COLOR_SPACE_SIZE)
+        if bins is None:
+            bins = block_bins
+        else:
+            bins += block_bins
+    if bins is None:
+        bins = np.zeros(COLOR_SPACE_SIZE, dtype=np.int64)
+    colors = np.flatnonzero(bins).astype(np.uint32)
+    return colors, bins[colors]
+
+
+def count_packed(packed):
+    """
+    Count packed 0xRRGGBB values.
+
+    Returns (colors, counts): the distinct packed colors in ascending order as
+    uint32 and how often each occurs as int64.
+    """
+    packed = np.asarray(packed, dtype=np.uint32).reshape(-1)
+    if packed.size < BINCOUNT_MIN_PIXELS:
+        colors, counts = np.unique(packed, return_counts=True)
+        return colors.astype(np.uint32), counts.astype(np.int64)
+    return _count_blocks(
+        packed[start : start + COUNT_BLOCK_PIXELS]
+        for start in range(0, packed.size, COUNT_BLOCK_PIXELS)
+    )
+
+
+def count_colors(rgb_array):
+    """
+    Count the unique colors of an (H, W, 3) uint8 array.
+
+    Returns (colors, counts) where colors is an (N, 3) uint8 array sorted
+    ascending by (R, G, B) and counts is the matching int64 pixel count.
+    """
+    rgb_flat = np.asarray(rgb_array, dtype=np.uint8).reshape(-1, 3)
+    if rgb_flat.shape[0] < BINCOUNT_MIN_PIXELS:
+        colors, counts = count_packed(pack_rgb(rgb_flat))
+    else:
+        # Pack block by block so a 100 MP image never needs a full uint32 copy.
+        colors, counts = _count_blocks(
+            pack_rgb(rgb_flat[start : start + COUNT_BLOCK_PIXELS])
+            for start in range(0, rgb_flat.shape[0], COUNT_BLOCK_PIXELS)
+        )
+    return unpack_rgb(colors), counts
+
+
+def index_packed(colors, packed):
+    """
+    Map packed pixels to their position in the sorted colors array.
+
+    Returns int32 indices so per-color results can be scattered back to the
+    pixel grid with ``palette_values[inverse]``.
+    """
+    packed = np.asarray(packed, dtype=np.uint32)
+    if packed.size < BINCOUNT_MIN_PIXELS:
+        return np.searchsorted(colors, packed).astype(np.int32)
+    lookup = np.zeros(COLOR_SPACE_SIZE, dtype=np.int32)
+    lookup[colors] = np.arange(colors.size, dtype=np.int32)
+    return lookup[packed]
+
+
+def unique_colors(rgb_array):
+    """
+    Deduplicate the colors of an (H, W, 3) uint8 array.
+
+    Returns (colors, counts, inverse): the (N, 3) sorted unique colors, their
+    pixel counts, and an (H, W) int32 index of each pixel into colors.
+    """
+    rgb_array = np.asarray(rgb_array, dtype=np.uint8)
+    packed = pack_rgb(rgb_array)
+    colors, counts = count_packed(packed)
+    inverse = index_packed(colors, packed)
+    return unpack_rgb(colors), counts, inverse
+
+
+def count_visible(pixels, alpha_mode="ignore"):
+    """
+    Count (N, 3) or (N, 4) uint8 pixels under an alpha mode.
+
+    Returns (colors, counts) with colors packed; counts are int64 pixel
+    counts, or float64 opacity sums in weighted mode. Pixels without an alpha
+    channel are opaque.
+    """
+    _check_alpha_mode(alpha_mode)
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    if pixels.shape[-1] == 3 or alpha_mode == "ignore":
+        colors, counts = count_packed(pack_rgb(pixels[:, :3]))
+        if alpha_mode == "weighted":
+            counts = counts.astype(np.float64)
+        return colors, counts
+
+    alpha = pixels[:, 3]
+    visible = pixels[alpha > 0] if alpha.size and alpha.min() == 0 else pixels
+    packed = pack_rgb(visible[:, :3])
+    colors, counts = count_packed(packed)
+    if alpha_mode == "weighted":
+        counts = np.bincount(
+            index_packed(colors, packed),
+            weights=visible[:, 3] / 255.0,
+            minlength=colors.size,
+        )
+    return colors, counts
+
+
+def count_colors_rgba(rgba_array, mode="skip"):
+    """
+    Count the colors of an (H, W, 4) uint8 array, honoring alpha.
+
+    Returns (colors, counts) like count_colors(). With mode="weighted" the
+    counts are float64 sums of per-pixel opacity rather than pixel counts.
+    """
+    _check_alpha_mode(mode)
+    rgba_array = np.asarray(rgba_array, dtype=np.uint8)
+    if mode == "ignore":
+        return count_colors(rgba_array[..., :3])
+    colors, counts = count_visible(rgba_array.reshape(-1, 4), mode)
+    return unpack_rgb(colors), counts
+
+
+def count_colors_streaming(
+    source, strip_budget=DEFAULT_STRIP_BUDGET, alpha_mode="ignore"
+):
+    """
+    Count unique colors strip by strip, merging the per-strip histograms.
+
+    Per-strip histograms are merged in batches, once they hold as many
+    entries as the merged palette, so each color is re-sorted a logarithmic
+    number of times rather than once per strip. Besides the current strip,
+    memory holds the merged palette and the buffered strip histograms, at
+    most as many entries as the palette or MERGE_MIN_STRIPS strips (image
+    files are also decoded in full, see iter_rgb_strips).
+    Returns the same (colors, counts) as count_colors, or count_colors_rgba
+    for an alpha_mode other than "ignore".
+    """
+    _check_alpha_mode(alpha_mode)
+    strip_rows = strip_rows_for_budget(image_shape(source)[1], strip_budget)
+    mode = "RGB" if alpha_mode == "ignore" else "RGBA"
+    colors_list = [np.empty(0, dtype=np.uint32)]
+    counts_list = [np.empty(0, dtype=np.int64)]
+    pending = 0
+    for _, strip in iter_rgb_strips(source, strip_rows, mode):
+        strip_colors, strip_counts = count_visible(
+            strip.reshape(-1, strip.shape[-1]), alpha_mode
+        )
+        colors_list.append(strip_colors)
+        counts_list.append(strip_counts)
+        pending += strip_colors.size
+        if len(colors_list) > MERGE_MIN_STRIPS and pending >= colors_list[0].size:
+            colors, counts = merge_packed_counts(colors_list, counts_list)
+            colors_list, counts_list = [colors], [counts]
+            pending = 0
+    colors, counts = merge_packed_counts(colors_list, counts_list)
+    return unpack_rgb(colors), counts
+
+
+def process_image(image_path, strip_budget=None, alpha_mode="ignore"):
+    """
+    Count the unique colors of an image file; returns (colors, counts).
+
+    With a strip_budget (bytes), the image is processed in bounded strips.
+    alpha_mode is one of ALPHA_MODES; "weighted" returns float64 counts.
+    """
+    _check_alpha_mode(alpha_mode)
+    if strip_budget:
+        return count_colors_streaming(image_path, strip_budget, alpha_mode)
+    if alpha_mode == "ignore":
+        return count_colors(load_rgb(image_path))
+    return count_colors_rgba(load_rgba(image_path), alpha_mode)
+
+
+def color_count_dict(colors, counts):
+    """Return {(r, g, b): count}, matching the legacy counter's output."""
+    return {
+        tuple(color): count for color, count in zip(colors.tolist(), counts.tolist())
+    }
+
+
+def save_results(colors, counts, output_file):
+    """Save counts in the legacy text format, sorted by color."""
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    lines = [
+        f"({r}, {g}, {b}), {count}\n"
+        for (r, g, b), count in zip(colors.tolist(), counts.tolist())
+    ]
+    with open(output_file, "w") as f:
+        f.write("sRGB Color (R, G, B), Count\n")
+        f.writelines(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count unique colors in an image and save as sRGB data with counts."
+    )
+    parser.add_argument("image_path", help="Path to the image file (PNG or JPEG).")
+    parser.add_argument(
+        "output_file",
+        help="Output file; a .npz path writes the binary histogram format.",
+    )
+    parser.add_argument(
+        "--strip-budget",
+        type=int,
+        default=None,
+        help="Stream the image in strips using at most this many bytes each.",
+    )
+    parser.add_argument(
+        "--alpha-mode",
+        choices=ALPHA_MODES,
+        default="ignore",
+        help="Skip transparent pixels or weight pixels by opacity.",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.image_path):
+        print(f"Error: File '{args.image_path}' not found.")
+        return
+
+    colors, counts = process_image(args.image_path, args.strip_budget, args.alpha_mode)
+    if args.output_file.endswith(".npz"):
+        save_histogram(args.output_file, make_histogram(colors, counts))
+    else:
+        save_results(colors, counts, args.output_file)
+    print(f"{len(colors)} unique colors saved to '{args.output_file}'.")
+
+
+if __name__ == "__main__":
+    main()
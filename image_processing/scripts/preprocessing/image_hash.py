@@ -0,0 +1,185 @@
+"""
+Exact and perceptual image hashes for duplicate detection.
+
+The SHA-256 of the file bytes identifies byte-identical uploads. Re-exported
+copies (another encoder, a resize, a metadata change) differ byte-wise but
+keep their structure, so each image also gets two 64-bit perceptual hashes of
+a downscaled L channel: aHash (pixel above the mean) and dHash (pixel brighter
+than its right neighbour). Near duplicates are hashes within a few bits of
+Hamming distance; HashIndex finds them with one vectorized XOR/popcount pass.
+
+Only JPEGs can be decoded at reduced scale (``draft``); PNG and GIF are
+decoded in full, so callers on a latency budget pass max_pixels to skip the
+perceptual hashes of large images.
+"""
+
+import argparse
+import hashlib
+import io
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+# Side of the grayscale thumbnail both hashes are sampled from.
+THUMBNAIL_SIZE = 64
+# Largest Hamming distance (per hash, out of 64 bits) for a near duplicate.
+DEFAULT_MAX_DISTANCE = 6
+READ_BLOCK = 1 << 20
+# Set bits of every byte value: a popcount that works before NumPy 2.0.
+BYTE_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], np.uint8)
+
+
+def content_hash(source):
+    """SHA-256 hex digest of a file path or of bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as file:
+        for block in iter(lambda: file.read(READ_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def luminance_thumbnail(image):
+    """Small L-mode copy of a PIL image; JPEGs are decoded at reduced scale."""
+    image.draft("L", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail(
+        (THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.BOX, reducing_gap=2.0
+    )
+    return thumbnail
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), "big")
+
+
+def average_hash(thumbnail, size=HASH_SIZE):
+    """aHash: one bit per cell of a size x size grid, set above the mean."""
+    cells = np.asarray(
+        thumbnail.resize((size, size), Image.Resampling.LANCZOS), dtype=np.float64
+    )
+    return _bits_to_int(cells > cells.mean())
+
+
+def difference_hash(thumbnail, size=HASH_SIZE):
+    """dHash: one bit per horizontal neighbour pair, set when brightness drops."""
+    cells = np.asarray(
+        thumbnail.resize((size + 1, size), Image.Resampling.LANCZOS),
+        dtype=np.int16,
+    )
+    return _bits_to_int(cells[:, :-1] > cells[:, 1:])
+
+
+def hamming_distance(first, second):
+    """Number of differing bits between two hashes."""
+    return bin(first ^ second).count("1")
+
+
+def image_hashes(source, max_pixels=None):
+    """
+    Hashes of an image given as a file path or its bytes.
+
+    Returns {"sha256", "ahash", "dhash"}, the perceptual hashes as 16-digit
+    hex strings. If the image would decode to more than max_pixels pixels
+    (after JPEG draft scaling), it is not decoded and both perceptual hashes
+    are None. Raises OSError if the image cannot be decoded.
+    """
+    data = source
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        with open(source, "rb") as file:
+            data = file.read()
+    hashes = {"sha256": content_hash(data), "ahash": None, "dhash": None}
+    with Image.open(io.BytesIO(data)) as image:
+        # Only the header has been read so far; draft() updates the size.
+        image.draft("L", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        width, height = image.size
+        if max_pixels is not None and width * height > max_pixels:
+            return hashes
+        thumbnail = luminance_thumbnail(image)
+    hashes["ahash"] = f"{average_hash(thumbnail):016x}"
+    hashes["dhash"] = f"{difference_hash(thumbnail):016x}"
+    return hashes
+
+
+class HashIndex:
+    """
+    Perceptual hashes of many images, searchable by Hamming distance.
+
+    Hashes are kept as uint64 arrays, so a lookup is one XOR and popcount
+    over every indexed image instead of a per-image Python loop.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty((0, 2), dtype=np.uint64)  # (aHash, dHash)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _as_uint64(values):
+        return np.array(
+            [int(value, 16) if isinstance(value, str) else value for value in values],
+            dtype=np.uint64,
+        )
+
+    def add(self, ids, ahashes, dhashes):
+        """Index images by id; hashes may be ints or hex strings."""
+        hashes = np.column_stack(
+            [self._as_uint64(ahashes), self._as_uint64(dhashes)]
+        ).reshape(-1, 2)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.hashes = np.concatenate([self.hashes, hashes])
+
+    def remove(self, image_id):
+        keep = self.ids != image_id
+        self.ids, self.hashes = self.ids[keep], self.hashes[keep]
+
+    def clear(self):
+        self.ids, self.hashes = self.ids[:0], self.hashes[:0]
+
+    def near(self, ahash, dhash, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Ids of images whose aHash and dHash are both within max_distance bits.
+
+        Returns (ids, distances), closest first, with distance the larger of
+        the two Hamming distances.
+        """
+        query = self._as_uint64([ahash, dhash])
+        differing = (self.hashes ^ query).view(np.uint8).reshape(-1, 2, 8)
+        distances = BYTE_POPCOUNT[differing].sum(axis=2, dtype=np.int64).max(axis=1)
+        matches = np.flatnonzero(distances <= max_distance)
+        order = matches[np.argsort(distances[matches], kind="stable")]
+        return self.ids[order], distances[order].astype(np.int64)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Print exact and perceptual hashes and flag near duplicates."
+    )
+    parser.add_argument("paths", nargs="+", help="Image files.")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    args = parser.parse_args()
+
+    index = HashIndex()
+    seen = {}
+    for number, path in enumerate(args.paths):
+        try:
+            hashes = image_hashes(path)
+        except OSError as exc:
+            print(f"{path}: {exc}")
+            continue
+        ids, distances = index.near(hashes["ahash"], hashes["dhash"], args.max_distance)
+        exact = seen.get(hashes["sha256"])
+        note = f" (exact duplicate of {exact})" if exact else ""
+        if not exact and len(ids):
+            note = f" (near duplicate of {args.paths[ids[0]]}, {distances[0]} bits)"
+        print(f"{path}: {hashes['ahash']} {hashes['dhash']}{note}")
+        seen.setdefault(hashes["sha256"], path)
+        index.add([number], [hashes["ahash"]], [hashes["dhash"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,99 @@
-# Placeholder file for creating the database
+"""
+SQLite schema for the palette store.
+
+Each analyzed image gets a row in ``images``; its palette is stored in
+``palette_colors`` with one row per color (packed RGB, pixel count, LAB and
+cluster label), clustered on (image_id, rank) where rank orders the colors by
+descending pixel count. A palette is therefore written append-only and its
+top colors are read as one contiguous range. The index on (image_id, cluster,
+rank) does the same for each cluster; it only holds the first
+CLUSTER_INDEX_RANKS colors of every cluster (cluster_rank counts colors within
+their cluster), which is all a query can ask for and keeps inserts from paying
+for an entry per color. Every image keeps its dominant color, indexed by L*,
+so images are filtered without scanning palettes. Connections use WAL
+journaling, so readers are not blocked while a palette is written.
+
+The schema version is recorded in ``PRAGMA user_version``.
+"""
+
+import argparse
+import os
+import sqlite3
+
+DEFAULT_DB_PATH = "../data/palettes.db"
+
+SCHEMA_VERSION = 1
+# Colors per cluster kept in the cluster index.
+CLUSTER_INDEX_RANKS = 1000
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE,
+    width INTEGER,
+    height INTEGER,
+    pixels INTEGER NOT NULL DEFAULT 0,
+    colors INTEGER NOT NULL DEFAULT 0,
+    dominant_rgb INTEGER,
+    dominant_l REAL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS palette_colors (
+    image_id INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    rgb INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    l REAL,
+    a REAL,
+    b REAL,
+    cluster INTEGER,
+    cluster_rank INTEGER,
+    PRIMARY KEY (image_id, rank)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS images_dominant_l ON images (dominant_l);
+CREATE INDEX IF NOT EXISTS palette_colors_cluster
+    ON palette_colors (image_id, cluster, rank)
+    WHERE cluster_rank < {CLUSTER_INDEX_RANKS};
+
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+
+def connect(db_path=DEFAULT_DB_PATH, **connect_args):
+    """
+    Open the palette store with WAL journaling and foreign keys enabled.
+
+    connect_args are passed on to sqlite3.connect().
+    """
+    if db_path != ":memory:":
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, **connect_args)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Safe with WAL: a crash can lose the last commit but not corrupt the store.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    # 64 MiB page cache keeps the cluster index in memory during bulk inserts.
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+
+def create_db(db_path=DEFAULT_DB_PATH, **connect_args):
+    """Create the palette store schema if needed and return a connection."""
+    conn = connect(db_path, **connect_args)
+    with conn:
+        conn.executescript(SCHEMA)
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the palette store.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+    create_db(args.db).close()
+    print(f"Palette store ready at {args.db}")
+
+
+if __name__ == "__main__":
+    main()
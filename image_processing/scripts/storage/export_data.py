@@ -1 +1,306 @@
-# Placeholder file for exporting data
+"""
+Streaming export of the palette store to NDJSON, CSV or Parquet.
+
+Every dataset is read as a generator of fixed-size row chunks (a SQLite
+cursor drained with ``fetchmany``, or one image at a time for luminosity
+histograms), and each chunk is written before the next one is read, so memory
+stays constant however large the corpus is. Text output can be gzip or zstd
+compressed on the fly; Parquet files use the codec inside the file instead.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+
+from image_processing.scripts.analysis.compute_histogram import LabHistogram
+from image_processing.scripts.storage.create_db import DEFAULT_DB_PATH, connect
+from image_processing.scripts.storage.insert_data import fetch_palette
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Rows read from the store and written out at a time.
+CHUNK_ROWS = 50_000
+
+FORMATS = ("ndjson", "csv", "parquet")
+COMPRESSIONS = ("gzip", "zstd")
+SUFFIXES = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".gz": "gzip",
+    ".zst": "zstd",
+}
+
+# dataset -> ((column, Arrow type name), ...). Palette counts are float64
+# because opacity-weighted palettes store fractional pixel counts.
+DATASETS = {
+    "palettes": (
+        ("image_id", "int64"),
+        ("source", "string"),
+        ("hex", "string"),
+        ("count", "float64"),
+        ("L", "float64"),
+        ("a", "float64"),
+        ("b", "float64"),
+        ("cluster", "int64"),
+    ),
+    "clusters": (
+        ("image_id", "int64"),
+        ("source", "string"),
+        ("cluster", "int64"),
+        ("members", "int64"),
+        ("count", "float64"),
+        ("dominant_hex", "string"),
+        ("L", "float64"),
+        ("a", "float64"),
+        ("b", "float64"),
+    ),
+    "luminosity": (
+        ("image_id", "int64"),
+        ("source", "string"),
+        ("channel", "string"),
+        ("bin", "int64"),
+        ("lower", "float64"),
+        ("upper", "float64"),
+        ("count", "int64"),
+    ),
+}
+
+PALETTE_QUERY = """
+SELECT p.image_id, i.source, printf('#%06x', p.rgb), p.count, p.l, p.a, p.b,
+       p.cluster
+FROM palette_colors AS p JOIN images AS i ON i.id = p.image_id
+ORDER BY p.image_id, p.rank
+"""
+
+# SQLite fills the bare rgb column from the row holding MAX(count), i.e. the
+# cluster's most frequent color. L*a*b* is the pixel-weighted mean, NULL for
+# palettes stored without LAB.
+CLUSTER_SUMMARY = """
+SELECT p.image_id, i.source, p.cluster, COUNT(*), SUM(p.count),
+       printf('#%06x', p.rgb), MAX(p.count),
+       SUM(p.count * p.l) / SUM(p.count), SUM(p.count * p.a) / SUM(p.count),
+       SUM(p.count * p.b) / SUM(p.count)
+FROM palette_colors AS p JOIN images AS i ON i.id = p.image_id
+WHERE p.cluster IS NOT NULL AND p.cluster != -1{image_filter}
+GROUP BY p.image_id, p.cluster
+ORDER BY p.image_id, p.cluster
+"""
+CLUSTER_QUERY = CLUSTER_SUMMARY.format(image_filter="")
+IMAGE_CLUSTER_QUERY = CLUSTER_SUMMARY.format(image_filter=" AND p.image_id = ?")
+
+
+def _cursor_chunks(cursor, chunk_rows):
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_palettes(conn, chunk_rows=CHUNK_ROWS):
+    """Yield chunks of palette rows for every image in the store."""
+    yield from _cursor_chunks(conn.execute(PALETTE_QUERY), chunk_rows)
+
+
+def iter_clusters(conn, chunk_rows=CHUNK_ROWS, image_id=None):
+    """
+    Yield chunks of per-cluster summaries (noise excluded) for every image,
+    or only for image_id.
+    """
+    if image_id is None:
+        cursor = conn.execute(CLUSTER_QUERY)
+    else:
+        cursor = conn.execute(IMAGE_CLUSTER_QUERY, (image_id,))
+    for rows in _cursor_chunks(cursor, chunk_rows):
+        # Drop the MAX(count) helper column.
+        yield [row[:6] + row[7:] for row in rows]
+
+
+def iter_luminosity(conn, chunk_rows=CHUNK_ROWS, channels=("L", "Y"), bins=None):
+    """
+    Yield chunks of non-empty L* and luminance histogram bins for every image.
+
+    Palettes are read one image at a time, so memory is bounded by the largest
+    single palette rather than the corpus.
+    """
+    images = conn.execute("SELECT id, source FROM images ORDER BY id").fetchall()
+    chunk = []
+    for image_id, source in images:
+        histogram = LabHistogram.from_histogram(fetch_palette(conn, image_id), bins)
+        for channel in channels:
+            edges = histogram.edges(channel).tolist()
+            counts = histogram.counts[channel]
+            for index in counts.nonzero()[0].tolist():
+                chunk.append(
+                    (
+                        image_id,
+                        source,
+                        channel,
+                        index,
+                        edges[index],
+                        edges[index + 1],
+                        int(counts[index]),
+                    )
+                )
+                if len(chunk) == chunk_rows:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+DATASET_READERS = {
+    "palettes": iter_palettes,
+    "clusters": iter_clusters,
+    "luminosity": iter_luminosity,
+}
+
+
+def infer_format(path):
+    """(format, compression) implied by a file name such as palettes.csv.gz."""
+    name = path.lower()
+    compression = None
+    for suffix in (".gz", ".zst"):
+        if name.endswith(suffix):
+            compression = SUFFIXES[suffix]
+            name = name[: -len(suffix)]
+    for suffix, fmt in SUFFIXES.items():
+        if fmt in FORMATS and name.endswith(suffix):
+            return fmt, compression
+    raise ValueError(f"Cannot infer the export format of {path}")
+
+
+def open_text_output(path, compression=None):
+    """Open a text stream that compresses on the fly."""
+    if compression is None:
+        return open(path, "w", encoding="utf-8", newline="")
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package.")
+        writer = zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+        return io.TextIOWrapper(writer, encoding="utf-8", newline="")
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def write_ndjson(chunks, columns, path, compression=None):
+    """Write row chunks as one JSON object per line; returns the row count."""
+    written = 0
+    with open_text_output(path, compression) as stream:
+        for rows in chunks:
+            stream.write(
+                "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            )
+            written += len(rows)
+    return written
+
+
+def write_csv(chunks, columns, path, compression=None):
+    """Write row chunks as CSV with a header line; returns the row count."""
+    written = 0
+    with open_text_output(path, compression) as stream:
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            written += len(rows)
+    return written
+
+
+def write_parquet(chunks, schema, path, compression=None):
+    """Write each row chunk as a Parquet row group; returns the row count."""
+    if pa is None:
+        raise RuntimeError("Parquet export requires the pyarrow package.")
+    arrow_schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in schema])
+    types = arrow_schema.types
+    written = 0
+    with pq.ParquetWriter(
+        path, arrow_schema, compression=compression or "none"
+    ) as writer:
+        for rows in chunks:
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [
+                        pa.array(values, type=kind)
+                        for values, kind in zip(zip(*rows), types)
+                    ],
+                    schema=arrow_schema,
+                )
+            )
+            written += len(rows)
+        if not written:
+            writer.write_table(arrow_schema.empty_table())
+    return written
+
+
+def export_dataset(
+    conn, dataset, path, fmt=None, compression=None, chunk_rows=CHUNK_ROWS
+):
+    """
+    Stream one dataset (palettes, clusters or luminosity) to a file.
+
+    The format and compression default to those implied by the file name.
+    Returns the number of rows written.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    if fmt is None:
+        fmt, inferred = infer_format(path)
+        compression = compression or inferred
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    schema = DATASETS[dataset]
+    chunks = DATASET_READERS[dataset](conn, chunk_rows)
+    if fmt == "parquet":
+        return write_parquet(chunks, schema, path, compression)
+    columns = [name for name, _ in schema]
+    writer = write_ndjson if fmt == "ndjson" else write_csv
+    return writer(chunks, columns, path, compression)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export palettes, clusters or luminosity histograms."
+    )
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("output", help="e.g. palettes.ndjson.gz or clusters.csv")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--compression", choices=COMPRESSIONS, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        rows = export_dataset(
+            conn,
+            args.dataset,
+            args.output,
+            args.format,
+            args.compression,
+            args.chunk_rows,
+        )
+    finally:
+        conn.close()
+    print(f"Exported {rows} {args.dataset} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
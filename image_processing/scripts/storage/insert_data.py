@@ -1 +1,255 @@
-# Placeholder file for inserting data into the database
+"""
+Bulk insertion of color histograms into the palette store.
+
+A palette is written inside a single transaction. Each chunk of rows is
+converted from the histogram's columns in one ``tolist()`` call, interleaved
+into a flat parameter list and written with ``executemany`` over multi-row
+``INSERT ... VALUES`` statements, so SQLite steps one statement per hundred
+rows rather than per row. Rows are sorted by descending count first, so they
+arrive in primary-key (rank) order. Reading back streams the rows straight
+into a numpy array instead of building per-column tuples.
+"""
+
+import argparse
+from itertools import chain
+
+import numpy as np
+
+from image_processing.scripts.conversion.srgb_to_lab import rgb_to_lab
+from image_processing.scripts.storage.create_db import DEFAULT_DB_PATH, create_db
+from image_processing.utils.color_histogram import (
+    histogram_colors,
+    load_histogram,
+    make_histogram,
+)
+
+# Rows converted from the histogram at a time.
+CHUNK_ROWS = 50_000
+# SQLite before 3.32 allows at most 999 parameters per statement.
+MAX_PARAMETERS = 999
+
+COLOR_COLUMNS = (
+    "image_id",
+    "rank",
+    "rgb",
+    "count",
+    "l",
+    "a",
+    "b",
+    "cluster",
+    "cluster_rank",
+)
+ROWS_PER_INSERT = MAX_PARAMETERS // len(COLOR_COLUMNS)
+
+
+def _insert_colors(rows):
+    """INSERT statement for the given number of palette_colors rows."""
+    values = "(" + ", ".join("?" * len(COLOR_COLUMNS)) + ")"
+    return (
+        f"INSERT INTO palette_colors ({', '.join(COLOR_COLUMNS)}) "
+        f"VALUES {', '.join([values] * rows)}"
+    )
+
+
+INSERT_COLORS = _insert_colors(ROWS_PER_INSERT)
+
+
+def cluster_ranks(labels):
+    """Position of every color within its cluster, for labels in rank order."""
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    sizes = np.diff(np.r_[starts, labels.size])
+    ranks = np.empty(labels.size, dtype=np.int64)
+    ranks[order] = np.arange(labels.size) - np.repeat(starts, sizes)
+    return ranks
+
+
+def _palette_rows(image_id, histogram, chunk_rows):
+    """
+    Yield (rows, parameters) chunks for a histogram sorted by rank.
+
+    parameters holds the chunk's palette_colors values row after row, in
+    COLOR_COLUMNS order.
+    """
+    names = histogram.dtype.names
+    width = len(COLOR_COLUMNS)
+    if "label" in names:
+        within_cluster = cluster_ranks(histogram["label"])
+    for start in range(0, len(histogram), chunk_rows):
+        chunk = histogram[start : start + chunk_rows]
+        size = len(chunk)
+        if "lab" in names:
+            lab = chunk["lab"].astype(np.float64).T.tolist()
+        else:
+            lab = [[None] * size] * 3
+        if "label" in names:
+            labels = chunk["label"].tolist()
+            ranks = within_cluster[start : start + size].tolist()
+        else:
+            labels = ranks = [None] * size
+        columns = [
+            [image_id] * size,
+            range(start, start + size),
+            chunk["rgb"].tolist(),
+            chunk["count"].tolist(),
+            *lab,
+            labels,
+            ranks,
+        ]
+        parameters = [None] * (size * width)
+        for offset, column in enumerate(columns):
+            parameters[offset::width] = column
+        yield size, parameters
+
+
+def _write_rows(conn, rows, parameters):
+    """Insert one chunk of rows, ROWS_PER_INSERT per statement."""
+    width = len(COLOR_COLUMNS)
+    step = ROWS_PER_INSERT * width
+    full = rows - rows % ROWS_PER_INSERT
+    conn.executemany(
+        INSERT_COLORS,
+        (parameters[i : i + step] for i in range(0, full * width, step)),
+    )
+    if full < rows:
+        conn.execute(_insert_colors(rows - full), parameters[full * width :])
+
+
+def rank_colors(histogram):
+    """Histogram reordered by descending count (ties keep their rgb order)."""
+    # float64 negates unsigned and opacity-weighted counts alike without loss.
+    counts = histogram["count"].astype(np.float64)
+    return histogram[np.argsort(-counts, kind="stable")]
+
+
+def _dominant(ranked):
+    """(packed rgb, L*) of a ranked histogram's most frequent color."""
+    if len(ranked) == 0:
+        return None, None
+    top = ranked[:1]
+    lab = top["lab"] if "lab" in top.dtype.names else rgb_to_lab(histogram_colors(top))
+    return int(top["rgb"][0]), float(lab[0, 0])
+
+
+def insert_palette(
+    conn,
+    histogram,
+    source=None,
+    width=None,
+    height=None,
+    chunk_rows=CHUNK_ROWS,
+    color_index=None,
+):
+    """
+    Store a histogram as one image's palette and return the image id.
+
+    Re-inserting the same source replaces its previous palette. Everything
+    happens in one transaction, so readers never see a partial palette.
+    color_index, a clustering.color_index.ColorIndex, is given the image's
+    new cluster centroids once the palette is committed.
+    """
+    ranked = rank_colors(histogram)
+    dominant_rgb, dominant_l = _dominant(ranked)
+    with conn:
+        image_id = None
+        if source is not None:
+            row = conn.execute(
+                "SELECT id FROM images WHERE source = ?", (source,)
+            ).fetchone()
+            image_id = row[0] if row else None
+        pixels = round(float(histogram["count"].sum(dtype=np.float64)))
+        if image_id is None:
+            image_id = conn.execute(
+                "INSERT INTO images (source, width, height, pixels, colors, "
+                "dominant_rgb, dominant_l) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source,
+                    width,
+                    height,
+                    pixels,
+                    len(histogram),
+                    dominant_rgb,
+                    dominant_l,
+                ),
+            ).lastrowid
+        else:
+            conn.execute(
+                "UPDATE images SET width = ?, height = ?, pixels = ?, colors = ?, "
+                "dominant_rgb = ?, dominant_l = ? WHERE id = ?",
+                (
+                    width,
+                    height,
+                    pixels,
+                    len(histogram),
+                    dominant_rgb,
+                    dominant_l,
+                    image_id,
+                ),
+            )
+            conn.execute("DELETE FROM palette_colors WHERE image_id = ?", (image_id,))
+        for rows, parameters in _palette_rows(image_id, ranked, chunk_rows):
+            _write_rows(conn, rows, parameters)
+    if color_index is not None:
+        color_index.add_image(conn, image_id)
+    return image_id
+
+
+def fetch_palette(conn, image_id):
+    """Read an image's palette back as a histogram record array."""
+    # LAB and cluster labels are stored for all of a palette's colors or none.
+    first = conn.execute(
+        "SELECT l, cluster FROM palette_colors WHERE image_id = ? "
+        "ORDER BY rank LIMIT 1",
+        (image_id,),
+    ).fetchone()
+    if first is None:
+        return make_histogram(np.empty(0, dtype=np.uint32), np.empty(0, np.int64))
+    with_lab, with_labels = first[0] is not None, first[1] is not None
+    columns = ["rgb", "count"]
+    if with_lab:
+        columns += ["l", "a", "b"]
+    if with_labels:
+        columns.append("cluster")
+    cursor = conn.execute(
+        f"SELECT {', '.join(columns)} FROM palette_colors "
+        "WHERE image_id = ? ORDER BY rank",
+        (image_id,),
+    )
+    # Every stored value is exact as float64: packed colors, labels, counts.
+    values = np.fromiter(chain.from_iterable(cursor), np.float64)
+    values = values.reshape(-1, len(columns))
+    counts = values[:, 1]
+    # Opacity-weighted counts are stored as REAL only if they are fractional.
+    if np.array_equal(counts, np.round(counts)):
+        counts = counts.astype(np.int64)
+    histogram = make_histogram(
+        values[:, 0].astype(np.uint32),
+        counts,
+        lab=values[:, 2:5].astype(np.float32) if with_lab else None,
+        labels=values[:, -1].astype(np.int32) if with_labels else None,
+    )
+    return histogram[np.argsort(histogram["rgb"], kind="stable")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Insert .npz color histograms into the palette store."
+    )
+    parser.add_argument("histograms", nargs="+", help=".npz color histograms.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    conn = create_db(args.db)
+    try:
+        for path in args.histograms:
+            histogram = load_histogram(path)
+            image_id = insert_palette(conn, histogram, source=path)
+            print(f"Stored {len(histogram)} colors from {path} as image {image_id}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
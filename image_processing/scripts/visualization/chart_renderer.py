@@ -0,0 +1,154 @@
+"""
+Headless, cached rendering of the histogram, luminosity-zone and cluster charts.
+
+Charts are drawn on standalone Agg figures, never registered with pyplot, and
+cleared as soon as their PNG is encoded, so batch runs do not accumulate
+figures. Histogram bars are a single step patch and only the tallest bins are
+annotated. With a ResultCache, PNGs are keyed by a digest of the chart data
+and its options, and an unchanged chart is a file read.
+"""
+
+import io
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from image_processing.scripts.analysis.luminosity_zones import ZONE_BOUNDARIES, ZONES
+from image_processing.utils.result_cache import data_digest, source_version
+
+VERSION = source_version(__file__)
+
+# Band colors of the legacy luminosity layer chart; gaps are left unshaded.
+ZONE_COLORS = {
+    "hardware": "red",
+    "background": "blue",
+    "card": "green",
+    "action": "yellow",
+}
+
+
+class ChartRenderer:
+    """Render charts to PNG bytes, optionally through a ResultCache."""
+
+    def __init__(self, cache=None, dpi=100):
+        self.cache = cache
+        self.dpi = dpi
+
+    def _render(self, kind, arrays, options, draw, figsize):
+        key = None
+        if self.cache is not None:
+            params = {**options, "figsize": figsize, "dpi": self.dpi}
+            key = self.cache.make_key(kind, data_digest(*arrays), params, VERSION)
+            png_bytes = self.cache.get_bytes(key, ".png")
+            if png_bytes is not None:
+                return png_bytes
+
+        figure = Figure(figsize=figsize)
+        FigureCanvasAgg(figure)
+        try:
+            draw(figure.add_subplot())
+            buffer = io.BytesIO()
+            figure.savefig(buffer, format="png", dpi=self.dpi, bbox_inches="tight")
+        finally:
+            figure.clear()
+        png_bytes = buffer.getvalue()
+
+        if key is not None:
+            self.cache.put_bytes(key, png_bytes, ".png")
+        return png_bytes
+
+    @staticmethod
+    def _draw_bars(axes, counts, edges, annotate_fraction, max_annotations):
+        """Horizontal histogram bars as one artist, annotating the tallest bins."""
+        axes.stairs(
+            counts,
+            edges,
+            orientation="horizontal",
+            fill=True,
+            color="gray",
+            edgecolor="black",
+            linewidth=0.3,
+        )
+        peak = counts.max() if counts.size else 0
+        if peak > 0 and max_annotations:
+            candidates = np.flatnonzero(counts >= annotate_fraction * peak)
+            tallest = candidates[np.argsort(-counts[candidates], kind="stable")]
+            for index in tallest[:max_annotations]:
+                axes.text(
+                    counts[index],
+                    (edges[index] + edges[index + 1]) / 2,
+                    str(int(counts[index])),
+                    va="center",
+                    fontsize=6,
+                )
+        axes.set_ylim(edges[0], edges[-1])
+        axes.set_xlabel("Count")
+        axes.grid(axis="x", linestyle="--", alpha=0.7)
+
+    def histogram_chart(
+        self,
+        counts,
+        edges,
+        title="Distribution of Luminosity (L) Values",
+        ylabel="Luminosity (L)",
+        annotate_fraction=0.05,
+        max_annotations=20,
+    ):
+        """PNG of a horizontal histogram (values on the y axis)."""
+        counts = np.asarray(counts)
+        edges = np.asarray(edges, dtype=np.float64)
+        options = {
+            "title": title,
+            "ylabel": ylabel,
+            "annotate_fraction": annotate_fraction,
+            "max_annotations": max_annotations,
+        }
+
+        def draw(axes):
+            self._draw_bars(axes, counts, edges, annotate_fraction, max_annotations)
+            axes.set_ylabel(ylabel)
+            axes.set_title(title)
+
+        return self._render("histogram_chart", [counts, edges], options, draw, (10, 12))
+
+    def luminosity_zone_chart(
+        self, counts, edges, annotate_fraction=0.05, max_annotations=20
+    ):
+        """PNG of a relative-luminance histogram with the zone bands shaded."""
+        counts = np.asarray(counts)
+        edges = np.asarray(edges, dtype=np.float64)
+        options = {
+            "annotate_fraction": annotate_fraction,
+            "max_annotations": max_annotations,
+        }
+        bounds = np.r_[edges[0], ZONE_BOUNDARIES, edges[-1]]
+
+        def draw(axes):
+            self._draw_bars(axes, counts, edges, annotate_fraction, max_annotations)
+            for index, zone in enumerate(ZONES):
+                if zone in ZONE_COLORS:
+                    axes.axhspan(
+                        bounds[index],
+                        bounds[index + 1],
+                        color=ZONE_COLORS[zone],
+                        alpha=0.3,
+                        label=zone.capitalize(),
+                    )
+            axes.set_ylabel("Relative luminance (Y)")
+            axes.set_title("Luminosity Layer Distribution with Zones")
+            axes.legend()
+
+        return self._render(
+            "luminosity_zone_chart", [counts, edges], options, draw, (10, 8)
+        )
+
+    def cluster_chart(self, cluster_labels):
+        """PNG of a cluster label map."""
+        cluster_labels = np.asarray(cluster_labels)
+
+        def draw(axes):
+            axes.imshow(cluster_labels, cmap="tab20", interpolation="nearest")
+            axes.axis("off")
+
+        return self._render("cluster_chart", [cluster_labels], {}, draw, (8, 8))
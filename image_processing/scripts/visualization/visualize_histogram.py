@@ -1 +1,64 @@
-# Placeholder file for visualizing histograms
+"""
+Render L* and luminosity-zone histogram charts for one or more images.
+
+Inputs are images, saved .npz color histograms or LabHistogram files; their
+histograms are merged before rendering.
+"""
+
+import argparse
+import os
+
+from image_processing.scripts.analysis.compute_histogram import (
+    LabHistogram,
+    compute_histogram,
+)
+from image_processing.scripts.visualization.chart_renderer import ChartRenderer
+from image_processing.utils.result_cache import ResultCache
+
+
+def load_lab_histogram(path):
+    """A LabHistogram from an image, a color histogram or a saved LabHistogram."""
+    if path.endswith(".npz"):
+        try:
+            return LabHistogram.load(path)
+        except KeyError:
+            pass
+    return compute_histogram(path)
+
+
+def visualize_histogram(histogram, output_dir, renderer=None, prefix=""):
+    """Write the L* and luminosity-zone charts of a LabHistogram as PNGs."""
+    renderer = renderer or ChartRenderer()
+    charts = {
+        "luminosity_distribution.png": renderer.histogram_chart(
+            histogram.counts["L"], histogram.edges("L")
+        ),
+        "luminosity_layer_zones.png": renderer.luminosity_zone_chart(
+            histogram.counts["Y"], histogram.edges("Y")
+        ),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, png_bytes in charts.items():
+        path = os.path.join(output_dir, prefix + name)
+        with open(path, "wb") as file:
+            file.write(png_bytes)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render luminosity histograms.")
+    parser.add_argument("inputs", nargs="+", help="Images or .npz histograms.")
+    parser.add_argument("--output-dir", default="../data/results")
+    parser.add_argument("--cache-dir", default=None, help="Defaults to data/cache.")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir) if args.cache_dir else ResultCache()
+    histogram = LabHistogram.merge(load_lab_histogram(path) for path in args.inputs)
+    for path in visualize_histogram(histogram, args.output_dir, ChartRenderer(cache)):
+        print(f"Chart saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,201 @@
-# Placeholder file for database API
+"""
+Read API over the palette store.
+
+Every query is a fixed SQL string with bound parameters, so SQLite compiles
+it once and the connection's statement cache reuses the prepared statement.
+Each one is answered from an index range (see storage/create_db.py): top
+colors from the (image_id, rank) key, cluster members from the partial
+(image_id, cluster, rank) index over each cluster's first MAX_LIMIT colors
+and images by dominant L* from the images_dominant_l index. Recent results
+are kept in a small LRU cache that is dropped whenever another connection
+writes to the store.
+"""
+
+import argparse
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+
+from image_processing.scripts.storage.create_db import (
+    CLUSTER_INDEX_RANKS,
+    DEFAULT_DB_PATH,
+    create_db,
+)
+
+# Results remembered by the query cache.
+CACHE_SIZE = 256
+# Compiled statements kept per connection.
+STATEMENT_CACHE_SIZE = 64
+DEFAULT_LIMIT = 20
+# The cluster index holds no more colors per cluster than this.
+MAX_LIMIT = CLUSTER_INDEX_RANKS
+
+IMAGE_COLUMNS = """
+id AS image_id, source, width, height, pixels, colors,
+printf('#%06x', dominant_rgb) AS dominant_hex, dominant_l
+"""
+COLOR_COLUMNS = """
+rank, printf('#%06x', rgb) AS hex, count, l AS L, a, b, cluster
+"""
+
+IMAGE_QUERY = f"SELECT {IMAGE_COLUMNS} FROM images WHERE id = ?"
+IMAGES_BY_DOMINANT_L_QUERY = f"""
+SELECT {IMAGE_COLUMNS} FROM images
+WHERE dominant_l BETWEEN ? AND ?
+ORDER BY dominant_l LIMIT ? OFFSET ?
+"""
+TOP_COLORS_QUERY = f"""
+SELECT {COLOR_COLUMNS} FROM palette_colors
+WHERE image_id = ? ORDER BY rank LIMIT ?
+"""
+# Without statistics the planner would walk the image's whole key range and
+# filter on cluster, which is slow for small clusters. The cluster_rank term
+# repeats the partial index's condition, so the index applies.
+CLUSTER_COLORS_QUERY = f"""
+SELECT {COLOR_COLUMNS} FROM palette_colors INDEXED BY palette_colors_cluster
+WHERE image_id = ? AND cluster = ? AND cluster_rank < {CLUSTER_INDEX_RANKS}
+ORDER BY rank LIMIT ?
+"""
+
+
+class PaletteQueries:
+    """
+    Cached, index-backed palette queries on one read-only connection.
+
+    The connection is shared by the server's threads behind a lock; each
+    query takes milliseconds, so serializing them costs little.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, cache_size=CACHE_SIZE):
+        # create_db also adds any missing indexes to an existing store.
+        self.conn = create_db(
+            db_path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA query_only=ON")
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def _query(self, sql, params):
+        with self._lock:
+            # data_version changes whenever another connection commits.
+            (version,) = self.conn.execute("PRAGMA data_version").fetchone()
+            if version != self._data_version:
+                self._cache.clear()
+                self._data_version = version
+
+            key = (sql, params)
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+                return rows
+            rows = [dict(row) for row in self.conn.execute(sql, params)]
+            self._cache[key] = rows
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return rows
+
+    def image(self, image_id):
+        """An image's summary, or None if it is not stored."""
+        rows = self._query(IMAGE_QUERY, (image_id,))
+        return rows[0] if rows else None
+
+    def images_by_dominant_lightness(self, l_min, l_max, limit=DEFAULT_LIMIT, offset=0):
+        """Images whose most frequent color has L* in [l_min, l_max]."""
+        return self._query(
+            IMAGES_BY_DOMINANT_L_QUERY,
+            (float(l_min), float(l_max), _clamp(limit), int(offset)),
+        )
+
+    def top_colors(self, image_id, limit=DEFAULT_LIMIT):
+        """An image's most frequent colors, most frequent first."""
+        return self._query(TOP_COLORS_QUERY, (image_id, _clamp(limit)))
+
+    def cluster_colors(self, image_id, cluster, limit=DEFAULT_LIMIT):
+        """The most frequent colors of one of an image's clusters."""
+        return self._query(
+            CLUSTER_COLORS_QUERY, (image_id, int(cluster), _clamp(limit))
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+def _clamp(limit):
+    return max(1, min(int(limit), MAX_LIMIT))
+
+
+palettes_bp = Blueprint("palettes", __name__, url_prefix="/palettes")
+
+
+def _queries():
+    return current_app.extensions["palette_queries"]
+
+
+def _error(message, status=400):
+    return jsonify({"error": message}), status
+
+
+@palettes_bp.route("/images", methods=["GET"])
+def images_by_lightness():
+    args = request.args
+    try:
+        images = _queries().images_by_dominant_lightness(
+            float(args.get("l_min", 0.0)),
+            float(args.get("l_max", 100.0)),
+            int(args.get("limit", DEFAULT_LIMIT)),
+            int(args.get("offset", 0)),
+        )
+    except ValueError:
+        return _error("l_min, l_max, limit and offset must be numbers.")
+    return jsonify(images)
+
+
+@palettes_bp.route("/images/<int:image_id>", methods=["GET"])
+def get_image(image_id):
+    image = _queries().image(image_id)
+    if image is None:
+        return _error("Image not found.", 404)
+    return jsonify(image)
+
+
+@palettes_bp.route("/images/<int:image_id>/colors", methods=["GET"])
+def get_colors(image_id):
+    queries = _queries()
+    if queries.image(image_id) is None:
+        return _error("Image not found.", 404)
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        cluster = request.args.get("cluster")
+        if cluster is None:
+            return jsonify(queries.top_colors(image_id, limit))
+        return jsonify(queries.cluster_colors(image_id, int(cluster), limit))
+    except ValueError:
+        return _error("limit and cluster must be integers.")
+
+
+def create_app(queries=None, db_path=DEFAULT_DB_PATH):
+    """Flask app serving palette queries from the store at db_path."""
+    app = Flask(__name__)
+    app.extensions["palette_queries"] = queries or PaletteQueries(db_path)
+    app.register_blueprint(palettes_bp)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve palette store queries.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    args = parser.parse_args()
+    create_app(db_path=args.db).run(host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,352 @@
-# Placeholder file for image API
+"""
+Asynchronous analysis job API.
+
+POST /jobs queues a run of the analysis DAG (see pipeline/dag_runner.py) for
+an image and answers at once with a job id; the conversion and clustering
+stages run on a local worker pool, off the request thread. Clients poll
+GET /jobs/<id> for the status and, once finished, the saved outputs. Workers
+share the on-disk ResultCache, so resubmitting an image only recomputes the
+stages whose parameters changed. Jobs name an image by ``path`` inside the
+image directory or by the ``image_id`` the backend assigned at upload, which
+UploadResolver looks up in the backend's SQLite database.
+"""
+
+import argparse
+import functools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from urllib.request import pathname2url
+
+from flask import Blueprint, Flask, current_app, jsonify, request, send_file
+
+from image_processing.scripts.pipeline.dag_runner import (
+    OUTPUT_FILES,
+    build_pipeline,
+    save_output,
+)
+from image_processing.utils.result_cache import ResultCache
+
+DEFAULT_IMAGE_DIR = "../data/images"
+DEFAULT_OUTPUT_DIR = "../data/results/jobs"
+# The backend's development database and upload folder (see backend/config).
+DEFAULT_BACKEND_DB = "backend/instance/backend.db"
+DEFAULT_UPLOAD_DIR = os.getenv("UPLOAD_FOLDER", "backend/uploads")
+DEFAULT_TARGETS = ("histogram", "cluster_chart")
+# Finished jobs remembered for polling; older ones are forgotten first.
+MAX_FINISHED_JOBS = 1000
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+def run_job(image_path, output_dir, targets, params, cache_dir=None):
+    """Worker entry point: run the pipeline and save each target's result."""
+    cache = ResultCache(cache_dir) if cache_dir else ResultCache()
+    report = build_pipeline(cache=cache, max_workers=1).run(
+        image_path, targets=targets, params=params
+    )
+    outputs = {}
+    for name, result in report["results"].items():
+        path = os.path.join(output_dir, OUTPUT_FILES[name])
+        save_output(path, result)
+        outputs[name] = path
+    return {
+        "outputs": outputs,
+        "computed": report["computed"],
+        "reused": report["reused"],
+        "seconds": report["seconds"],
+    }
+
+
+class UploadResolver:
+    """
+    Maps a backend image id to the uploaded file it names.
+
+    Reads the backend's images table (user_id, filename) from its SQLite
+    database, read-only and with a connection per lookup, so it is safe to
+    call from any request thread.
+    """
+
+    def __init__(self, db_path=DEFAULT_BACKEND_DB, upload_dir=DEFAULT_UPLOAD_DIR):
+        self.db_path = db_path
+        self.upload_dir = upload_dir
+
+    def __call__(self, image_id):
+        """The image's path, or None if the backend has no such image."""
+        if isinstance(image_id, bool) or not isinstance(image_id, int):
+            raise ValueError("image_id must be an integer.")
+        uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        try:
+            with closing(sqlite3.connect(uri, uri=True)) as conn:
+                row = conn.execute(
+                    "SELECT user_id, filename FROM images WHERE id = ?", (image_id,)
+                ).fetchone()
+        except sqlite3.Error as exc:
+            raise ValueError(f"Cannot look up image ids: {exc}") from exc
+        if row is None:
+            return None
+        user_id, filename = row
+        # Same layout as backend.utils.file_handler.construct_file_path.
+        return os.path.join(self.upload_dir, f"user_{user_id}", filename)
+
+
+class Job:
+    """A submitted run and the future that will hold its result."""
+
+    def __init__(self, job_id, image, targets, params, future):
+        self.id = job_id
+        self.image = image
+        self.targets = targets
+        self.params = params
+        self.future = future
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def status(self):
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        if self.future.cancelled() or self.future.exception() is not None:
+            return "failed"
+        return "done"
+
+    def to_dict(self):
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "image": self.image,
+            "targets": self.targets,
+            "params": self.params,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+        }
+        if info["status"] == "done":
+            info["result"] = self.future.result()
+        elif info["status"] == "failed":
+            error = None if self.future.cancelled() else self.future.exception()
+            info["error"] = str(error) if error else "cancelled"
+        return info
+
+
+class JobManager:
+    """
+    Queues pipeline runs on a worker pool and tracks them by job id.
+
+    executor defaults to a process pool so long DBSCAN runs neither hold the
+    server's GIL nor share its memory; any concurrent.futures executor works.
+    If a worker process dies, the jobs it took down report the failure and
+    the next submission replaces the broken pool with a new one.
+    """
+
+    def __init__(
+        self,
+        output_dir=DEFAULT_OUTPUT_DIR,
+        cache_dir=None,
+        executor=None,
+        max_workers=None,
+        max_finished=MAX_FINISHED_JOBS,
+    ):
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, image_path, targets=DEFAULT_TARGETS, params=None):
+        """Queue a run and return its Job without waiting for it."""
+        job_id = uuid.uuid4().hex
+        targets = list(targets)
+        params = params or {}
+        args = (
+            image_path,
+            os.path.join(self.output_dir, job_id),
+            targets,
+            params,
+            self.cache_dir,
+        )
+        with self._lock:
+            try:
+                future = self.executor.submit(run_job, *args)
+            except BrokenProcessPool:
+                # Jobs lost with the pool already hold the error.
+                self.executor.shutdown(wait=False)
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                future = self.executor.submit(run_job, *args)
+            job = Job(job_id, image_path, targets, params, future)
+            self._jobs[job_id] = job
+            self._forget_finished()
+        future.add_done_callback(lambda _: setattr(job, "finished_at", time.time()))
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[: max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor = self.executor
+        executor.shutdown(wait=wait)
+
+
+def _error(message, status=400):
+    return jsonify({"error": message}), status
+
+
+def _resolve_image(payload):
+    """Absolute image path for a request's ``path`` or ``image_id``."""
+    config = current_app.config
+    if payload.get("image_id") is not None:
+        resolver = config.get("IMAGE_RESOLVER")
+        if resolver is None:
+            raise ValueError("This server does not resolve image ids.")
+        path = resolver(payload["image_id"])
+        if path is None:
+            raise ValueError(f"Unknown image id: {payload['image_id']}")
+        return path
+
+    relative = payload.get("path")
+    if not isinstance(relative, str) or not relative:
+        raise ValueError("Provide an image 'path' or 'image_id'.")
+    image_dir = os.path.realpath(config["IMAGE_DIR"])
+    path = os.path.realpath(os.path.join(image_dir, relative))
+    if os.path.commonpath([image_dir, path]) != image_dir:
+        raise ValueError("Image path must stay inside the image directory.")
+    return path
+
+
+@functools.lru_cache(maxsize=1)
+def _stage_params():
+    """Parameter names each pipeline stage accepts."""
+    return {name: set(stage.params) for name, stage in build_pipeline().stages.items()}
+
+
+def _validate(payload):
+    """(targets, params) of a job request; raises ValueError when invalid."""
+    targets = payload.get("targets") or list(DEFAULT_TARGETS)
+    if not isinstance(targets, list) or not set(targets) <= set(OUTPUT_FILES):
+        raise ValueError(f"Targets must be a list of {sorted(OUTPUT_FILES)}.")
+
+    params = payload.get("params") or {}
+    stages = _stage_params()
+    if not isinstance(params, dict):
+        raise ValueError("params must map stage names to parameters.")
+    for stage, values in params.items():
+        if stage not in stages or not isinstance(values, dict):
+            raise ValueError(f"Unknown stage parameters: {stage}")
+        unknown = set(values) - stages[stage]
+        if unknown:
+            raise ValueError(f"Unknown parameters for {stage}: {sorted(unknown)}")
+    return targets, params
+
+
+@jobs_bp.route("", methods=["POST"])
+def submit_job():
+    payload = request.get_json(silent=True) or {}
+    try:
+        image_path = _resolve_image(payload)
+        targets, params = _validate(payload)
+    except ValueError as exc:
+        return _error(str(exc))
+    if not os.path.isfile(image_path):
+        return _error("Image not found.", 404)
+
+    job = current_app.extensions["analysis_jobs"].submit(image_path, targets, params)
+    response = jsonify({"job_id": job.id, "status": job.status})
+    return response, 202, {"Location": f"{jobs_bp.url_prefix}/{job.id}"}
+
+
+@jobs_bp.route("", methods=["GET"])
+def list_jobs():
+    jobs = current_app.extensions["analysis_jobs"].jobs()
+    return jsonify(
+        [{"job_id": job.id, "status": job.status, "image": job.image} for job in jobs]
+    )
+
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = current_app.extensions["analysis_jobs"].get(job_id)
+    if job is None:
+        return _error("Job not found.", 404)
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route("/<job_id>/outputs/<name>", methods=["GET"])
+def get_output(job_id, name):
+    job = current_app.extensions["analysis_jobs"].get(job_id)
+    if job is None:
+        return _error("Job not found.", 404)
+    if job.status != "done":
+        return _error(f"Job is {job.status}.", 409)
+    path = job.future.result()["outputs"].get(name)
+    if path is None:
+        return _error("Output not found.", 404)
+    return send_file(os.path.abspath(path))
+
+
+def create_app(manager=None, image_dir=DEFAULT_IMAGE_DIR, image_resolver=None):
+    """
+    Flask app serving the job API.
+
+    image_resolver, if given, maps an ``image_id`` from a request to an image
+    path (or None when unknown); otherwise jobs name images by ``path``
+    relative to image_dir.
+    """
+    app = Flask(__name__)
+    app.config["IMAGE_DIR"] = image_dir
+    app.config["IMAGE_RESOLVER"] = image_resolver
+    app.extensions["analysis_jobs"] = manager or JobManager()
+    app.register_blueprint(jobs_bp)
+    _stage_params()  # Load the stage definitions before the first request.
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the analysis job API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--image-dir", default=DEFAULT_IMAGE_DIR)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--cache-dir", default=None, help="Defaults to data/cache.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--backend-db",
+        default=DEFAULT_BACKEND_DB,
+        help="Backend SQLite database used to resolve image ids.",
+    )
+    parser.add_argument(
+        "--upload-dir",
+        default=DEFAULT_UPLOAD_DIR,
+        help="Backend upload folder holding the files of image ids.",
+    )
+    args = parser.parse_args()
+
+    manager = JobManager(args.output_dir, args.cache_dir, max_workers=args.workers)
+    resolver = UploadResolver(args.backend_db, args.upload_dir)
+    try:
+        create_app(manager, args.image_dir, image_resolver=resolver).run(
+            host=args.host, port=args.port
+        )
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
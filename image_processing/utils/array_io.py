@@ -0,0 +1,50 @@
+"""
+Compact, memory-mapped storage for the pipeline's intermediate arrays.
+
+LAB cubes are kept as float32 and label maps in the smallest signed integer
+type that holds their range, and later stages open intermediates with
+memory mapping so only the pages they touch are read.
+"""
+
+import os
+
+import numpy as np
+
+LAB_DTYPE = np.float32
+
+_SIGNED_INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def smallest_int_dtype(min_value, max_value):
+    """Smallest signed integer dtype holding [min_value, max_value]."""
+    for dtype in _SIGNED_INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return np.dtype(dtype)
+    raise ValueError(f"Range [{min_value}, {max_value}] does not fit in int64.")
+
+
+def compact_labels(labels):
+    """Cast labels (noise = -1) to the smallest signed dtype holding them."""
+    labels = np.asarray(labels)
+    if labels.size == 0:
+        return labels.astype(np.int8)
+    dtype = smallest_int_dtype(int(labels.min()), int(labels.max()))
+    return labels.astype(dtype, copy=False)
+
+
+def save_array(path, array):
+    """Save an array to a .npy file, creating the parent directory."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(path, array)
+
+
+def load_array(path, mmap=True):
+    """Open a .npy file, memory-mapped read-only by default."""
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def open_output_array(path, shape, dtype):
+    """Create a writable memory-mapped .npy file to fill strip by strip."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
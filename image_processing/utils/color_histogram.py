@@ -0,0 +1,198 @@
+"""
+Binary color-histogram interchange format shared by the pipeline stages.
+
+A histogram is a structured NumPy array with one record per unique color:
+
+- ``rgb``: packed 0xRRGGBB color (uint32)
+- ``count``: pixel count (uint32, widened to uint64 only when a count overflows),
+  or float64 for opacity-weighted counts
+- ``lab``: CIELAB color as three float32 values (optional)
+- ``label``: cluster label, -1 for noise (int32, optional)
+
+Histograms are stored as uncompressed ``.npz`` files holding the record array
+and a format version, so a round trip is a single buffer copy rather than a
+regex parse per line.
+"""
+
+import os
+import re
+
+import numpy as np
+
+FORMAT_VERSION = 1
+SUPPORTED_VERSIONS = (1,)
+
+RGB_FIELD = ("rgb", np.uint32)
+LAB_FIELD = ("lab", np.float32, (3,))
+LABEL_FIELD = ("label", np.int32)
+
+UINT32_MAX = np.iinfo(np.uint32).max
+
+_LEGACY_TUPLE = re.compile(r"\(([^)]*)\)")
+
+
+def pack_rgb(rgb_array):
+    """Pack an (..., 3) uint8 array into (...) uint32 values of 0xRRGGBB."""
+    rgb_array = np.asarray(rgb_array, dtype=np.uint8)
+    packed = rgb_array[..., 0].astype(np.uint32)
+    packed <<= 8
+    packed |= rgb_array[..., 1]
+    packed <<= 8
+    packed |= rgb_array[..., 2]
+    return packed
+
+
+def unpack_rgb(packed):
+    """Unpack 0xRRGGBB integers into an (..., 3) uint8 array."""
+    packed = np.asarray(packed, dtype=np.uint32)
+    rgb_array = np.empty(packed.shape + (3,), dtype=np.uint8)
+    rgb_array[..., 0] = packed >> 16
+    rgb_array[..., 1] = packed >> 8
+    rgb_array[..., 2] = packed
+    return rgb_array
+
+
+def merge_packed_counts(colors_list, counts_list):
+    """
+    Merge several (packed colors, counts) pairs into one sorted pair.
+
+    Counts of colors present in more than one input are summed, as int64, or
+    as float64 if any input has float (opacity-weighted) counts.
+    """
+    counts_list = [np.asarray(n) for n in counts_list]
+    float_counts = any(n.dtype.kind == "f" for n in counts_list)
+    count_dtype = np.float64 if float_counts else np.int64
+    colors = np.concatenate([np.asarray(c, dtype=np.uint32) for c in colors_list])
+    counts = np.concatenate([n.astype(count_dtype) for n in counts_list])
+    if colors.size == 0:
+        return colors, counts
+    order = np.argsort(colors, kind="stable")
+    colors = colors[order]
+    starts = np.flatnonzero(np.r_[True, colors[1:] != colors[:-1]])
+    return colors[starts], np.add.reduceat(counts[order], starts)
+
+
+def histogram_dtype(
+    with_lab=False, with_labels=False, wide_counts=False, float_counts=False
+):
+    """Build the record dtype for a histogram with the given optional fields."""
+    count_dtype = np.uint64 if wide_counts else np.uint32
+    fields = [RGB_FIELD, ("count", np.float64 if float_counts else count_dtype)]
+    if with_lab:
+        fields.append(LAB_FIELD)
+    if with_labels:
+        fields.append(LABEL_FIELD)
+    return np.dtype(fields)
+
+
+def make_histogram(colors, counts, lab=None, labels=None):
+    """
+    Build a histogram record array.
+
+    colors may be an (N, 3) uint8 array or N packed uint32 values; lab and
+    labels are optional per-color arrays of shape (N, 3) and (N,). Float
+    counts (opacity weights) are stored as float64 rather than truncated.
+    """
+    colors = np.asarray(colors)
+    packed = pack_rgb(colors) if colors.ndim == 2 else colors.astype(np.uint32)
+    counts = np.asarray(counts)
+    if counts.shape != packed.shape:
+        raise ValueError("colors and counts must have the same length.")
+
+    float_counts = counts.dtype.kind == "f"
+    wide_counts = (
+        not float_counts and counts.size > 0 and int(counts.max()) > UINT32_MAX
+    )
+    histogram = np.empty(
+        packed.shape[0],
+        dtype=histogram_dtype(
+            lab is not None, labels is not None, wide_counts, float_counts
+        ),
+    )
+    histogram["rgb"] = packed
+    histogram["count"] = counts
+    if lab is not None:
+        histogram["lab"] = lab
+    if labels is not None:
+        histogram["label"] = labels
+    return histogram
+
+
+def histogram_colors(histogram):
+    """Return the histogram colors as an (N, 3) uint8 array."""
+    return unpack_rgb(histogram["rgb"])
+
+
+def with_fields(histogram, lab=None, labels=None):
+    """Return a copy of histogram with lab and/or labels columns set."""
+    names = histogram.dtype.names
+    lab = histogram["lab"] if lab is None and "lab" in names else lab
+    labels = histogram["label"] if labels is None and "label" in names else labels
+    return make_histogram(histogram["rgb"], histogram["count"], lab=lab, labels=labels)
+
+
+def merge_histograms(histograms):
+    """
+    Merge histograms (e.g. per-strip or per-image) into one.
+
+    LAB values carry over when every input has them, since LAB is a function of
+    the color. Cluster labels are dropped because they are not comparable
+    across inputs.
+    """
+    histograms = list(histograms)
+    colors, counts = merge_packed_counts(
+        [h["rgb"] for h in histograms], [h["count"] for h in histograms]
+    )
+    lab = None
+    if histograms and all("lab" in h.dtype.names for h in histograms):
+        all_rgb = np.concatenate([h["rgb"] for h in histograms])
+        all_lab = np.concatenate([h["lab"] for h in histograms])
+        lab = np.empty((colors.size, 3), dtype=np.float32)
+        lab[np.searchsorted(colors, all_rgb)] = all_lab
+    return make_histogram(colors, counts, lab=lab)
+
+
+def save_histogram(path, histogram):
+    """Write a histogram to an uncompressed .npz file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, version=np.int32(FORMAT_VERSION), histogram=histogram)
+
+
+def load_histogram(path):
+    """Read a histogram written by save_histogram."""
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"])
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported histogram format version: {version}")
+        return data["histogram"]
+
+
+def load_legacy_text(path):
+    """
+    Convert a legacy text file (``(r, g, b), count[, (L, a, b)[, label]]``).
+
+    This exists to migrate old outputs once; new stages should exchange .npz
+    histograms instead.
+    """
+    colors, counts, lab, labels = [], [], [], []
+    with open(path, "r") as file:
+        next(file)  # Skip the header
+        for line in file:
+            if not line.strip():
+                continue
+            tuples = _LEGACY_TUPLE.findall(line)
+            colors.append([int(v) for v in tuples[0].split(",")])
+            rest = [part.strip() for part in _LEGACY_TUPLE.sub("", line).split(",")]
+            rest = [part for part in rest if part]
+            counts.append(int(rest[0]))
+            if len(tuples) > 1:
+                lab.append([float(v) for v in tuples[1].split(",")])
+            if len(rest) > 1:
+                labels.append(int(rest[1]))
+
+    return make_histogram(
+        np.array(colors, dtype=np.uint8).reshape(-1, 3),
+        np.array(counts, dtype=np.int64),
+        lab=np.array(lab, dtype=np.float32) if lab else None,
+        labels=np.array(labels, dtype=np.int32) if labels else None,
+    )
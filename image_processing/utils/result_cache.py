@@ -0,0 +1,234 @@
+"""
+Content-addressed on-disk cache for analysis stage outputs.
+
+An entry is keyed by SHA-256 over the input file's bytes, the stage name, its
+parameters and the stage's code version (its module and every image_processing
+module it imports), so re-running an unchanged stage is a file copy instead of
+a recomputation. Entries are plain files in one directory; a hit refreshes the
+entry's mtime and the least recently used entries are evicted once the cache
+grows past ``max_bytes``.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache"
+)
+DEFAULT_MAX_BYTES = 2 << 30
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+PACKAGE = "image_processing"
+# Directory containing the image_processing package.
+PACKAGE_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# (realpath, size, mtime_ns) -> digest, so unchanged inputs are hashed once.
+_digest_memo = {}
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file's bytes, memoized on size and mtime."""
+    stat = os.stat(path)
+    memo_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(_HASH_CHUNK_BYTES), b""):
+                sha.update(chunk)
+        digest = _digest_memo[memo_key] = sha.hexdigest()
+    return digest
+
+
+def data_digest(*arrays):
+    """SHA-256 hex digest of in-memory arrays (dtype, shape and bytes)."""
+    sha = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        sha.update(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+        sha.update(array.data)
+    return sha.hexdigest()
+
+
+def _imported_modules(path):
+    """Dotted names a source file imports from the image_processing package."""
+    with open(path, "rb") as file:
+        tree = ast.parse(file.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # ``from package import module`` names a module, too.
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return {name for name in names if name.split(".")[0] == PACKAGE}
+
+
+def source_files(module_file, root=PACKAGE_ROOT):
+    """module_file and the image_processing modules it imports, transitively."""
+    files = set()
+    pending = [os.path.abspath(module_file)]
+    while pending:
+        path = pending.pop()
+        if path in files:
+            continue
+        files.add(path)
+        for name in _imported_modules(path):
+            dependency = os.path.join(root, *name.split(".")) + ".py"
+            if os.path.isfile(dependency):
+                pending.append(dependency)
+    return sorted(files)
+
+
+def source_version(module_file, root=PACKAGE_ROOT):
+    """
+    Code version of a stage: a digest of its module's source file and of the
+    image_processing modules it depends on, so editing a helper such as
+    extract_pixels also invalidates the outputs cached by stages using it.
+    """
+    sha = hashlib.sha256()
+    for path in source_files(module_file, root):
+        sha.update(file_digest(path).encode("utf-8"))
+    return sha.hexdigest()[:16]
+
+
+class ResultCache:
+    """Size-bounded LRU cache of stage output files."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(stage, input_digest, params=None, version=""):
+        """Key for a stage run over an input with the given parameters."""
+        payload = json.dumps(
+            {
+                "stage": stage,
+                "input": input_digest,
+                "params": params or {},
+                "version": version,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key, suffix):
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def lookup(self, key, suffix=".npy"):
+        """Path of a cached entry (marking it recently used), or None."""
+        path = self._entry_path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_file(self, key, dest_path):
+        """Copy a cached entry to dest_path; returns False on a miss."""
+        path = self.lookup(key, os.path.splitext(dest_path)[1])
+        if path is None:
+            return False
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        shutil.copyfile(path, dest_path)
+        return True
+
+    def put_file(self, key, src_path):
+        """Store a copy of src_path under key and evict old entries if needed."""
+        path = self._entry_path(key, os.path.splitext(src_path)[1])
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def get_array(self, key):
+        """Return a cached array (memory-mapped), or None on a miss."""
+        path = self.lookup(key, ".npy")
+        return None if path is None else np.load(path, mmap_mode="r")
+
+    def put_array(self, key, array):
+        """Store an array under key and evict old entries if needed."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, np.asarray(array))
+        os.replace(tmp_path, self._entry_path(key, ".npy"))
+        self.evict()
+
+    def get_bytes(self, key, suffix):
+        """Return a cached entry's bytes, or None on a miss."""
+        path = self.lookup(key, suffix)
+        if path is None:
+            return None
+        with open(path, "rb") as file:
+            return file.read()
+
+    def put_bytes(self, key, data, suffix):
+        """Store bytes under key and evict old entries if needed."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, self._entry_path(key, suffix))
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def size_bytes(self):
+        """Total size of all cached entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until under max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Delete every cached entry."""
+        for _, _, path in self._entries():
+            os.remove(path)
+
+
+def run_cached(cache, stage, input_path, params, output_path, compute, version=""):
+    """
+    Produce output_path with compute() unless the cache already holds it.
+
+    Returns True on a cache hit. With cache=None this just calls compute().
+    """
+    if cache is None:
+        compute()
+        return False
+
+    key = cache.make_key(stage, file_digest(input_path), params, version)
+    if cache.get_file(key, output_path):
+        return True
+    compute()
+    cache.put_file(key, output_path)
+    return False
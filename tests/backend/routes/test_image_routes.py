@@ -4,13 +4,17 @@ Tests for image_routes.py
 
 # pylint: disable=redefined-outer-name,unused-argument
 
+import io
+import numpy as np
 import pytest
 from flask import url_for
+from PIL import Image as PILImage
 from unittest.mock import patch
 from werkzeug.security import generate_password_hash
 from backend.db import db
-from backend.models import Image, User
+from backend.models import Image, ImageAnalysis, User
 from flask_jwt_extended import create_access_token  # moved import to top
+from backend.routes.image_routes import read_image_hashes, read_image_header
 
 
 @pytest.fixture
@@ -132,3 +136,120 @@ def test_delete_image_not_found(client, user_with_token):
     )
     assert response.status_code == 404
     assert response.json["error"] == "Image not found."
+
+
+def test_read_image_header_parses_png():
+    buffer = io.BytesIO()
+    PILImage.new("RGBA", (64, 48)).save(buffer, format="PNG")
+    columns = read_image_header(buffer.getvalue(), "header.png")
+    assert columns["width"] == 64
+    assert columns["height"] == 48
+    assert columns["bit_depth"] == 8
+    assert columns["color_type"] == "rgba"
+    assert columns["compression_method"] == "deflate"
+    assert columns["image_metadata"]["format"] == "png"
+
+
+def test_read_image_header_ignores_unreadable_files():
+    assert read_image_header(b"not an image", "broken.png") == {}
+
+
+@patch("backend.routes.image_routes.write_file")
+@pytest.mark.usefixtures("function_db_setup")
+def test_upload_image_stores_header_metadata(mock_write_file, client, user_with_token):
+    _, token = user_with_token
+    headers = {"Authorization": f"Bearer {token}"}
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (120, 80)).save(buffer, format="JPEG")
+    buffer.seek(0)
+
+    response = client.post(
+        url_for("image_routes.upload_image"),
+        data={"file": (buffer, "photo.jpg")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 201
+
+    uploaded_image = db.session.get(Image, response.get_json()["image_id"])
+    assert (uploaded_image.width, uploaded_image.height) == (120, 80)
+    assert uploaded_image.color_type == "ycbcr"
+    assert uploaded_image.compression_method == "baseline_dct"
+    assert uploaded_image.image_metadata["format"] == "jpeg"
+
+
+def _scene_bytes(fmt="PNG", seed=0, **options):
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    scene = PILImage.fromarray(coarse).resize((320, 240), PILImage.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    scene.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def _upload(client, token, data, filename):
+    return client.post(
+        url_for("image_routes.upload_image"),
+        data={"file": (io.BytesIO(data), filename)},
+        headers={"Authorization": f"Bearer {token}"},
+        content_type="multipart/form-data",
+    )
+
+
+def test_read_image_hashes():
+    columns = read_image_hashes(_scene_bytes(), "scene.png")
+    assert len(columns["content_hash"]) == 64
+    assert len(columns["average_hash"]) == len(columns["difference_hash"]) == 16
+
+
+def test_read_image_hashes_skips_perceptual_hashes_of_large_images(monkeypatch):
+    monkeypatch.setattr("backend.routes.image_routes.MAX_HASH_PIXELS", 16)
+    columns = read_image_hashes(_scene_bytes(), "scene.png")
+    assert set(columns) == {"content_hash"}
+
+
+def test_read_image_hashes_keeps_content_hash_of_unreadable_files():
+    columns = read_image_hashes(b"not an image", "broken.png")
+    assert set(columns) == {"content_hash"}
+
+
+@patch("backend.routes.image_routes.write_file")
+@pytest.mark.usefixtures("function_db_setup")
+def test_upload_links_duplicates_to_existing_analysis(
+    mock_write_file, client, user_with_token
+):
+    _, token = user_with_token
+    original = _upload(client, token, _scene_bytes(), "brand.png").get_json()
+    assert "duplicate_of" not in original
+    analysis = ImageAnalysis(
+        image_id=original["image_id"], analysis_results={"clusters": 3}
+    )
+    db.session.add(analysis)
+    db.session.commit()
+
+    exact = _upload(client, token, _scene_bytes(), "brand_copy.png").get_json()
+    assert exact["duplicate_of"] == original["image_id"]
+    assert exact["match"] == "exact"
+    assert exact["analysis_id"] == analysis.id
+
+    reexport = _scene_bytes("JPEG", quality=70)
+    near = _upload(client, token, reexport, "brand.jpg").get_json()
+    assert near["duplicate_of"] == original["image_id"]
+    assert near["match"] == "near"
+    linked = db.session.get(Image, near["image_id"])
+    assert linked.effective_analysis.id == analysis.id
+
+    other = _upload(client, token, _scene_bytes(seed=1), "other.png").get_json()
+    assert "duplicate_of" not in other
+
+
+@patch("backend.routes.image_routes.write_file")
+@pytest.mark.usefixtures("function_db_setup")
+def test_upload_does_not_link_unanalyzed_duplicates(
+    mock_write_file, client, user_with_token
+):
+    _, token = user_with_token
+    _upload(client, token, _scene_bytes(), "brand.png")
+    second = _upload(client, token, _scene_bytes(), "brand_copy.png").get_json()
+    assert "duplicate_of" not in second
+    assert db.session.get(Image, second["image_id"]).content_hash is not None
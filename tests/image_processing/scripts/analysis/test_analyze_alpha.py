@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from image_processing.scripts.analysis.analyze_alpha import analyze_alpha
+
+
+def test_report_covers_visible_and_composited_palettes():
+    rgba = np.zeros((10, 10, 4), dtype=np.uint8)
+    rgba[:2, :, :3] = (200, 10, 10)
+    rgba[:2, :, 3] = 255
+    report = analyze_alpha(rgba)
+
+    assert report["coverage"]["transparent"] == 0.8
+    assert report["visible"]["dominant_color"] == (200, 10, 10)
+    assert len(report["visible"]["colors"]) == 1, "Hidden black must not count"
+    assert report["composites"]["light"]["dominant_color"] == (255, 255, 255)
+    assert report["composites"]["dark"]["dominant_color"] == (0, 0, 0)
+    assert report["composites"]["light"]["counts"].sum() == 100
+
+
+def test_weighted_and_composited_palettes_use_partial_opacity():
+    rgba = np.zeros((4, 5, 4), dtype=np.uint8)
+    rgba[0, :, :] = (0, 0, 255, 255)  # 5 opaque blue pixels
+    rgba[1, :3, :] = (255, 0, 0, 51)  # 3 red pixels at 20% opacity
+    rgba[1, 3:, :] = (0, 0, 255, 102)  # 2 blue pixels at 40% opacity
+    report = analyze_alpha(rgba, {"white": (255, 255, 255), "grey": (128, 128, 128)})
+
+    visible = report["visible"]
+    weights = dict(zip(map(tuple, visible["colors"].tolist()), visible["weights"]))
+    assert visible["weights"].dtype == np.float64
+    assert weights == pytest.approx({(0, 0, 255): 5.8, (255, 0, 0): 0.6})
+    assert visible["dominant_color"] == (0, 0, 255)
+    assert report["coverage"]["partial"] == 0.25
+
+    white = report["composites"]["white"]
+    counts = dict(zip(map(tuple, white["colors"].tolist()), white["counts"]))
+    assert counts == {
+        (0, 0, 255): 5,
+        (255, 204, 204): 3,  # 20% red over white
+        (153, 153, 255): 2,  # 40% blue over white
+        (255, 255, 255): 10,
+    }
+    assert white["dominant_color"] == (255, 255, 255)
+    grey = report["composites"]["grey"]
+    assert grey["counts"].sum() == 20
+    assert (153, 102, 102) in map(tuple, grey["colors"].tolist())
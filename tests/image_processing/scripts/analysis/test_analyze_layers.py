@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from image_processing.scripts.analysis.analyze_layers import (
+    label_regions,
+    layer_summary,
+)
+
+
+def _label_map(seed=0, shape=(40, 50), clusters=4):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-1, clusters, shape).repeat(2, 0).repeat(2, 1)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_regions_match_scipy_per_cluster(connectivity):
+    label_map = _label_map()
+    region_map, regions = label_regions(label_map, connectivity=connectivity)
+    structure = ndimage.generate_binary_structure(2, 1 if connectivity == 4 else 2)
+
+    assert (region_map[label_map == -1] == -1).all()
+    for label in range(4):
+        expected, count = ndimage.label(label_map == label, structure=structure)
+        ours = region_map[label_map == label]
+        assert (regions["label"][np.unique(ours)] == label).all()
+        assert np.unique(ours).size == count
+        # Same partition: each expected component maps to exactly one region.
+        pairs = np.unique(np.stack([expected[label_map == label], ours]), axis=1)
+        assert pairs.shape[1] == count
+
+
+def test_region_table_statistics():
+    label_map = np.array(
+        [
+            [1, 1, 0, 2],
+            [1, 0, 0, 2],
+            [0, 0, 1, 1],
+        ]
+    )
+    region_map, regions = label_regions(label_map, ignore_label=0)
+    assert len(regions) == 3
+    first = regions[region_map[0, 0]]
+    assert first["area"] == 3
+    assert (first["row_min"], first["row_max"]) == (0, 1)
+    assert (first["col_min"], first["col_max"]) == (0, 1)
+    assert first["centroid_row"] == pytest.approx(1 / 3)
+    assert first["centroid_col"] == pytest.approx(1 / 3)
+    last = regions[region_map[2, 3]]
+    assert (last["area"], last["row_min"], last["col_min"]) == (2, 2, 2)
+
+    layers = layer_summary(regions)
+    assert layers["label"].tolist() == [1, 2]
+    assert layers["blobs"].tolist() == [2, 1]
+    assert layers["area"].tolist() == [5, 2]
+    assert layers["largest_area"].tolist() == [3, 2]
+
+
+def test_spiral_region_is_one_component():
+    # A long snake is one region however far apart its ends are.
+    label_map = np.zeros((41, 41), dtype=np.int8)
+    label_map[::4, :40] = 1
+    label_map[2::4, 1:] = 1
+    label_map[1::4, 39] = 1
+    label_map[3::4, 1] = 1
+    _, regions = label_regions(label_map, ignore_label=0)
+    expected, count = ndimage.label(label_map == 1)
+    assert len(regions) == count == 1
+    assert regions["area"][0] == (label_map == 1).sum()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from PIL import Image
+from skimage.color import rgb2lab
+
+from image_processing.scripts.analysis.compute_histogram import (
+    LabHistogram,
+    compute_histogram,
+)
+from image_processing.scripts.conversion.srgb_to_lab import (
+    palette_to_lab,
+    relative_luminance,
+)
+from image_processing.scripts.preprocessing.extract_pixels import count_colors
+from image_processing.utils.color_histogram import save_histogram
+
+
+def _sample_image(seed=0):
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (10, 3), dtype=np.uint8)
+    return palette[rng.integers(0, len(palette), (24, 20))]
+
+
+def test_relative_luminance_matches_wcag_endpoints():
+    luminance = relative_luminance(np.array([[0, 0, 0], [255, 255, 255], [255, 0, 0]]))
+    assert np.allclose(luminance, [0.0, 1.0, 0.2126])
+
+
+def test_palette_histogram_matches_per_pixel_histogram():
+    rgb = _sample_image()
+    histogram = LabHistogram.from_palette(*count_colors(rgb))
+
+    lab = rgb2lab(rgb).reshape(-1, 3)
+    expected_l, _ = np.histogram(lab[:, 0], bins=histogram.edges("L"))
+    np.testing.assert_array_equal(histogram.counts["L"], expected_l)
+    expected_y, _ = np.histogram(
+        relative_luminance(rgb.reshape(-1, 3)), bins=histogram.edges("Y")
+    )
+    np.testing.assert_array_equal(histogram.counts["Y"], expected_y)
+    assert histogram.total() == rgb.shape[0] * rgb.shape[1]
+    assert histogram.mean("L") == pytest.approx(lab[:, 0].mean(), abs=0.05)
+
+
+def test_merge_equals_histogram_of_combined_pixels():
+    first, second = _sample_image(1), _sample_image(2)
+    merged = LabHistogram.merge(
+        [
+            LabHistogram.from_palette(*count_colors(first)),
+            LabHistogram.from_palette(*count_colors(second)),
+        ]
+    )
+    combined = LabHistogram.from_palette(*count_colors(np.concatenate([first, second])))
+    for channel, counts in combined.counts.items():
+        np.testing.assert_array_equal(merged.counts[channel], counts)
+
+    with pytest.raises(ValueError):
+        merged + LabHistogram({"L": 100})
+
+
+def test_compute_histogram_from_image_and_npz_agree(tmp_path):
+    rgb = _sample_image()
+    image_path = tmp_path / "image.png"
+    Image.fromarray(rgb).save(image_path)
+    npz_path = tmp_path / "palette.npz"
+    save_histogram(str(npz_path), palette_to_lab(rgb))
+
+    from_image = compute_histogram(str(image_path))
+    from_npz = compute_histogram(str(npz_path))
+    np.testing.assert_array_equal(from_image.counts["L"], from_npz.counts["L"])
+
+    from_image.save(str(tmp_path / "lab_histogram.npz"))
+    loaded = LabHistogram.load(str(tmp_path / "lab_histogram.npz"))
+    for channel, counts in from_image.counts.items():
+        np.testing.assert_array_equal(loaded.counts[channel], counts)
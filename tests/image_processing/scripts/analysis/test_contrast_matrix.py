@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from image_processing.scripts.analysis.contrast_matrix import (
+    best_foregrounds,
+    contrast_matrix,
+    pass_counts,
+    wcag_masks,
+)
+from image_processing.scripts.conversion.srgb_to_lab import relative_luminance
+
+
+def _palette(size=50, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (size, 3), dtype=np.uint8)
+
+
+def test_black_on_white_is_21_to_1():
+    matrix = contrast_matrix(np.array([[0, 0, 0], [255, 255, 255]]))
+    assert matrix[0, 1] == pytest.approx(21.0)
+    assert matrix[1, 0] == pytest.approx(21.0)
+    np.testing.assert_allclose(np.diag(matrix), 1.0)
+
+
+def test_chunked_matrix_matches_pairwise_loop():
+    colors = _palette()
+    luminance = relative_luminance(colors)
+    expected = np.array(
+        [
+            [(max(a, b) + 0.05) / (min(a, b) + 0.05) for b in luminance]
+            for a in luminance
+        ]
+    )
+    # A tiny budget forces one background row per block.
+    np.testing.assert_allclose(
+        contrast_matrix(colors, chunk_bytes=1), expected, rtol=1e-6
+    )
+    np.testing.assert_allclose(contrast_matrix(colors), expected, rtol=1e-6)
+
+
+def test_masks_and_pass_counts_agree():
+    colors = _palette()
+    matrix = contrast_matrix(colors)
+    masks = wcag_masks(matrix)
+    counts = pass_counts(colors, chunk_bytes=1000)
+    np.testing.assert_array_equal(counts["AA"], masks["AA"].sum(axis=1))
+    np.testing.assert_array_equal(counts["AAA"], masks["AAA"].sum(axis=1))
+    assert np.all(masks["AAA"] <= masks["AA"]), "AAA implies AA"
+    large = wcag_masks(matrix, large_text=True)
+    assert large["AA"].sum() >= masks["AA"].sum()
+
+
+def test_best_foregrounds_are_sorted_top_k():
+    colors = _palette()
+    matrix = contrast_matrix(colors)
+    indices, ratios = best_foregrounds(colors, k=4, chunk_bytes=1000)
+    assert indices.shape == ratios.shape == (len(colors), 4)
+    assert np.all(np.diff(ratios, axis=1) <= 0), "Ratios should be descending"
+    np.testing.assert_allclose(ratios[:, 0], matrix.max(axis=1), rtol=1e-6)
+    np.testing.assert_allclose(
+        np.take_along_axis(matrix, indices, axis=1), ratios, rtol=1e-6
+    )
+    assert best_foregrounds(colors[:2], k=5)[0].shape == (2, 2)
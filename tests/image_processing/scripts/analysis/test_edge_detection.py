@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from scipy import ndimage
+from skimage.color import rgb2lab
+
+from image_processing.scripts.analysis.edge_detection import (
+    OPERATORS,
+    detect_edges,
+    gradient_magnitude,
+    lightness,
+)
+
+
+def _blocky_image(seed=0):
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (8, 3), dtype=np.uint8)
+    return palette[rng.integers(0, 8, (9, 11))].repeat(5, 0).repeat(4, 1)
+
+
+def test_lightness_matches_skimage():
+    rgb = _blocky_image()
+    np.testing.assert_allclose(lightness(rgb), rgb2lab(rgb)[..., 0], atol=1e-3)
+
+
+@pytest.mark.parametrize("operator", sorted(OPERATORS))
+def test_gradient_matches_scipy_reference(operator):
+    values = lightness(_blocky_image()).astype(np.float64)
+    smooth, _ = OPERATORS[operator]
+    if operator == "sobel":
+        gx = ndimage.sobel(values, axis=1, mode="nearest")
+        gy = ndimage.sobel(values, axis=0, mode="nearest")
+    else:
+        weights = np.outer(smooth, [-1.0, 0.0, 1.0])
+        gx = ndimage.correlate(values, weights, mode="nearest")
+        gy = ndimage.correlate(values, weights.T, mode="nearest")
+    expected = np.hypot(gx, gy) / (smooth.sum() * 2)
+    padded = np.pad(values.astype(np.float32), 1, mode="edge")
+    np.testing.assert_allclose(
+        gradient_magnitude(padded, operator), expected, rtol=1e-4, atol=1e-3
+    )
+
+
+def test_strips_match_single_pass_and_count_edge_colors():
+    rgb = _blocky_image()
+    whole = detect_edges(rgb, strip_budget=1 << 30)
+    # Three rows per strip exercises the halo on every strip boundary.
+    strips = detect_edges(rgb, strip_budget=3 * rgb.shape[1] * 40)
+    np.testing.assert_array_equal(strips["mask"], whole["mask"])
+    np.testing.assert_array_equal(strips["colors"], whole["colors"])
+    np.testing.assert_array_equal(strips["edge_counts"], whole["edge_counts"])
+    np.testing.assert_allclose(strips["edge_strength"], whole["edge_strength"])
+
+    mask = whole["mask"]
+    assert 0 < mask.mean() < 1
+    assert whole["edge_counts"].sum() == mask.sum()
+    for color, count in zip(whole["colors"], whole["edge_counts"]):
+        assert count == ((rgb == color).all(axis=-1) & mask).sum()
+
+
+def test_flat_image_has_no_edges():
+    flat = np.full((10, 10, 3), 120, dtype=np.uint8)
+    edges = detect_edges(flat)
+    assert not edges["mask"].any()
+    assert len(edges["colors"]) == 0
+    with pytest.raises(ValueError):
+        detect_edges(flat, operator="canny")
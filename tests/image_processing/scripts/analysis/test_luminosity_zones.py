@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.scripts.analysis.luminosity_zones import (
+    ZONE_BOUNDARIES,
+    ZONES,
+    analyze_zones,
+    classify_luminance,
+    zone_map,
+    zone_summary,
+)
+from image_processing.scripts.conversion.srgb_to_lab import relative_luminance
+from image_processing.scripts.preprocessing.extract_pixels import count_colors
+
+
+def _zone_by_loop(luminance):
+    """The legacy chart's bands, evaluated one value at a time."""
+    zone = 0
+    for boundary in ZONE_BOUNDARIES:
+        if luminance >= boundary:
+            zone += 1
+    return zone
+
+
+def test_classify_matches_boundary_loop():
+    values = np.r_[np.linspace(0, 1, 501), ZONE_BOUNDARIES]
+    expected = [_zone_by_loop(value) for value in values]
+    np.testing.assert_array_equal(classify_luminance(values), expected)
+    assert ZONES[classify_luminance(0.0)] == "hardware"
+    assert ZONES[classify_luminance(1.0)] == "action"
+
+
+def test_zone_summary_coverage_and_dominant_colors():
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, (40, 30, 3), dtype=np.uint8)
+    rgb[:10] = (255, 255, 255)
+    summary = zone_summary(*count_colors(rgb))
+
+    zones = zone_map(rgb)
+    assert zones.shape == rgb.shape[:2]
+    for index, zone in enumerate(ZONES):
+        in_zone = zones == index
+        assert summary[zone]["pixels"] == in_zone.sum()
+        assert np.isclose(summary[zone]["coverage"], in_zone.mean())
+    assert np.isclose(sum(stats["coverage"] for stats in summary.values()), 1.0)
+    assert summary["action"]["dominant_color"] == (255, 255, 255)
+    assert np.all(
+        classify_luminance(relative_luminance(rgb[zones == 0])) == 0
+    ), "Zone map and classifier should agree"
+
+
+def test_empty_zone_has_no_dominant_color():
+    summary = zone_summary(np.array([[0, 0, 0]]), np.array([5]))
+    assert summary["hardware"]["coverage"] == 1.0
+    assert summary["action"]["dominant_color"] is None
+
+
+def test_weighted_zone_coverage(tmp_path):
+    rgba = np.zeros((1, 7, 4), dtype=np.uint8)
+    rgba[0, 0] = (255, 255, 255, 255)
+    rgba[0, 1:] = (0, 0, 0, 250)
+    Image.fromarray(rgba).save(tmp_path / "icon.png")
+    summary = analyze_zones(str(tmp_path / "icon.png"), alpha_mode="weighted")
+
+    dark = 6 * 250 / 255
+    assert summary["hardware"]["pixels"] == pytest.approx(dark)
+    assert summary["hardware"]["coverage"] == pytest.approx(dark / (dark + 1))
+    assert summary["action"]["pixels"] == 1.0
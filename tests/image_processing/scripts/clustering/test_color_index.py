@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+
+from image_processing.scripts.clustering.color_index import (
+    ColorIndex,
+    parse_color,
+    store_centroids,
+)
+from image_processing.scripts.conversion.srgb_to_lab import (
+    palette_histogram,
+    rgb_to_lab,
+)
+from image_processing.scripts.storage.create_db import create_db
+from image_processing.scripts.storage.insert_data import insert_palette
+from image_processing.utils.color_histogram import make_histogram, with_fields
+
+
+def _centroids(images=200, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    size = images * clusters
+    lab = np.column_stack([rng.uniform(0, 100, size), rng.uniform(-60, 60, (size, 2))])
+    return (
+        np.repeat(np.arange(images), clusters),
+        np.tile(np.arange(clusters), images),
+        rng.integers(1, 1000, size),
+        lab,
+    )
+
+
+def _brute_within(lab, target, radius):
+    distances = np.linalg.norm(lab - target, axis=1)
+    return np.flatnonzero(distances <= radius), distances
+
+
+def test_parse_color():
+    assert np.allclose(parse_color("#1A73E8"), rgb_to_lab(np.array([[26, 115, 232]])))
+    assert np.allclose(parse_color([50.0, 1.0, -2.0]), [50.0, 1.0, -2.0])
+    with pytest.raises(ValueError):
+        parse_color("#fff")
+
+
+def test_within_matches_brute_force():
+    image_ids, clusters, pixels, lab = _centroids()
+    index = ColorIndex()
+    index.add(image_ids, clusters, pixels, lab)
+    index.rebuild()
+
+    target = np.array([50.0, 10.0, -10.0])
+    matches = index.within(target, 12.0)
+    expected, distances = _brute_within(lab, target, 12.0)
+    assert len(matches) == len(expected) > 0
+    assert np.all(np.diff(matches["delta_e"]) >= 0)
+    assert set(zip(matches["image_id"], matches["cluster"])) == set(
+        zip(image_ids[expected], clusters[expected])
+    )
+    assert np.allclose(np.sort(matches["delta_e"]), np.sort(distances[expected]))
+
+
+def test_nearest_matches_brute_force():
+    image_ids, clusters, pixels, lab = _centroids()
+    index = ColorIndex()
+    index.add(image_ids, clusters, pixels, lab)
+    index.rebuild()
+
+    matches = index.nearest("#1A73E8", k=7)
+    distances = np.linalg.norm(lab - parse_color("#1A73E8"), axis=1)
+    assert np.allclose(matches["delta_e"], np.sort(distances)[:7])
+    with pytest.raises(ValueError):
+        index.nearest("#1A73E8", k=0)
+
+
+def test_incremental_add_and_remove():
+    image_ids, clusters, pixels, lab = _centroids(images=100)
+    index = ColorIndex()
+    index.add(image_ids, clusters, pixels, lab)
+    index.rebuild()
+
+    # A new image lands in the pending buffer and is found immediately.
+    target = np.array([42.0, 42.0, 42.0])
+    index.add([500], [0], [10], [target + 0.5])
+    assert len(index._pending) == 1
+    assert index.nearest(target, k=1)["image_id"][0] == 500
+    assert 500 in index.images_within(target, 1.0)["image_id"]
+
+    # Removing an indexed image masks it out of both query kinds.
+    victim = index.nearest(lab[0], k=1)["image_id"][0]
+    index.remove_image(victim)
+    assert victim not in index.within(lab[0], 5.0)["image_id"]
+    assert victim not in index.nearest(lab[0], k=40)["image_id"]
+    assert len(index.nearest(lab[0], k=40)) == 40
+    assert len(index) == len(lab) + 1 - 20
+
+    index.rebuild()
+    assert len(index) == len(lab) + 1 - 20
+    assert 500 in index.images_within(target, 1.0)["image_id"]
+
+
+def test_pending_buffer_is_folded_into_the_tree():
+    index = ColorIndex(rebuild_fraction=0.1)
+    index.add(*_centroids(images=600))
+    assert index._pending == []
+    assert len(index._points) == 12000
+
+
+def test_images_within_reports_each_image_once():
+    index = ColorIndex()
+    index.add([1, 1, 2], [0, 1, 0], [5, 6, 7], [[50, 0, 0], [51, 0, 0], [53, 0, 0]])
+    matches = index.images_within([50.5, 0, 0], 3.0)
+    assert matches["image_id"].tolist() == [1, 2]
+    assert np.allclose(matches["delta_e"], [0.5, 2.5])
+
+
+def test_index_from_store(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    colors = np.array([[26, 115, 232], [30, 110, 230], [250, 250, 250], [0, 0, 0]])
+    histogram = with_fields(
+        palette_histogram(colors.astype(np.uint8), np.array([10, 30, 5, 2])),
+        labels=np.array([0, 0, 1, -1]),
+    )
+    image_id = insert_palette(conn, histogram, source="brand.png")
+    # Stored without LAB, so it has no centroids to index.
+    without_lab = make_histogram(colors[:2], np.array([4, 1]), labels=np.array([0, 1]))
+    insert_palette(conn, without_lab, source="no_lab.png")
+
+    image_ids, clusters, pixels, lab = store_centroids(conn)
+    assert image_ids.tolist() == [image_id, image_id]
+    assert clusters.tolist() == [0, 1]
+    assert pixels.tolist() == [40, 5]
+    expected = (histogram["lab"][:2] * [[10], [30]]).sum(axis=0) / 40
+    assert np.allclose(lab[0], expected, atol=1e-4)
+
+    index = ColorIndex.from_store(conn)
+    assert index.images_within("#1A73E8", 3.0)["image_id"].tolist() == [image_id]
+
+    # Re-analysis replaces the image's centroids as it is stored.
+    relabeled = with_fields(histogram, labels=np.array([-1, -1, 1, -1]))
+    insert_palette(conn, relabeled, source="brand.png", color_index=index)
+    assert len(index.images_within("#1A73E8", 3.0)) == 0
+    assert len(index) == 1
+    conn.close()
+
+
+def test_save_and_load(tmp_path):
+    index = ColorIndex()
+    index.add(*_centroids(images=10))
+    path = str(tmp_path / "colors.npz")
+    index.save(path)
+    loaded = ColorIndex.load(path)
+    target = [60.0, 0.0, 0.0]
+    assert np.array_equal(loaded.nearest(target, 5), index.nearest(target, 5))
+
+
+def test_store_centroids_keep_weighted_pixels(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    colors = np.array([[200, 0, 0], [190, 0, 0]], dtype=np.uint8)
+    histogram = palette_histogram(colors, np.array([1.0, 5.88]))
+    insert_palette(conn, with_fields(histogram, labels=np.array([0, 0])))
+
+    _, _, pixels, _ = store_centroids(conn)
+    assert pixels.tolist() == pytest.approx([6.88])
+    index = ColorIndex.from_store(conn)
+    assert index.nearest("#be0000", 1)["pixels"].tolist() == pytest.approx([6.88])
+    conn.close()
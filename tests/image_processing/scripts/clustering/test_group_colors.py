@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.scripts.clustering.group_colors import (
+    find_group_colors,
+    group_stats,
+    group_stats_from_histogram,
+)
+from image_processing.scripts.conversion.srgb_to_lab import rgb_to_lab
+from image_processing.scripts.preprocessing.extract_pixels import process_image
+from image_processing.utils.color_histogram import histogram_colors, make_histogram
+
+
+def _labeled_palette(size=300, clusters=12, seed=0):
+    rng = np.random.default_rng(seed)
+    colors = np.unique(rng.integers(0, 256, (size, 3), dtype=np.uint8), axis=0)
+    counts = rng.integers(1, 50, len(colors))
+    labels = rng.integers(-1, clusters, len(colors))
+    return colors, counts, labels
+
+
+def _legacy_find_group_colors(sRGB_data, counts, labels):
+    """Reference copy of archive/obsolete/group_lab_colors.find_group_colors."""
+    group_colors = {}
+    for label in set(labels) - {-1}:
+        indices = [i for i, lbl in enumerate(labels) if lbl == label]
+        max_count_index = max(indices, key=lambda i: counts[i])
+        group_colors[label] = sRGB_data[max_count_index]
+    return group_colors
+
+
+def test_find_group_colors_matches_legacy():
+    colors, counts, labels = _labeled_palette()
+    expected = _legacy_find_group_colors(
+        [tuple(c) for c in colors.tolist()], counts.tolist(), labels.tolist()
+    )
+    assert find_group_colors(colors, counts, labels) == expected
+
+
+def test_group_stats_match_per_group_loop():
+    colors, counts, labels = _labeled_palette()
+    lab = rgb_to_lab(colors)
+    groups = group_stats(colors, counts, labels, lab=lab)
+
+    assert groups["label"].tolist() == sorted(set(labels.tolist()) - {-1})
+    for group in groups:
+        members = labels == group["label"]
+        weights = counts[members]
+        assert group["count"] == weights.sum()
+        assert group["members"] == members.sum()
+        np.testing.assert_allclose(
+            group["lab_mean"],
+            np.average(lab[members], axis=0, weights=weights),
+            rtol=1e-5,
+            atol=1e-4,
+        )
+        np.testing.assert_allclose(
+            group["lab_min"], lab[members].min(axis=0), atol=1e-4
+        )
+        np.testing.assert_allclose(
+            group["lab_max"], lab[members].max(axis=0), atol=1e-4
+        )
+
+
+def test_noise_is_optional_and_histograms_are_accepted():
+    colors, counts, labels = _labeled_palette()
+    histogram = make_histogram(colors, counts, lab=rgb_to_lab(colors), labels=labels)
+    with_noise = group_stats_from_histogram(histogram, include_noise=True)
+    assert with_noise["label"][0] == -1
+    assert with_noise["count"].sum() == counts.sum()
+
+    groups = group_stats_from_histogram(histogram)
+    assert (groups["label"] >= 0).all()
+    assert histogram_colors(groups).shape == (len(groups), 3)
+    assert len(group_stats(colors[:0], counts[:0], labels[:0])) == 0
+
+
+def test_weighted_counts_are_not_truncated(tmp_path):
+    rgba = np.zeros((1, 7, 4), dtype=np.uint8)
+    rgba[0, 0] = (200, 0, 0, 255)
+    rgba[0, 1:] = (190, 0, 0, 250)
+    Image.fromarray(rgba).save(tmp_path / "icon.png")
+    colors, counts = process_image(str(tmp_path / "icon.png"), alpha_mode="weighted")
+    assert counts.tolist() == pytest.approx([6 * 250 / 255, 1.0])
+
+    groups = group_stats(colors, counts, np.zeros(len(colors)))
+    assert groups["count"].dtype == np.float64
+    assert groups["count"].tolist() == pytest.approx([1 + 6 * 250 / 255])
+    assert histogram_colors(groups).tolist() == [[190, 0, 0]]
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from image_processing.scripts.clustering.lab_clustering import (
+    cluster_lab,
+    compare_modes,
+    label_lab_array,
+    unique_lab,
+)
+
+
+def _blob_lab_image(seed=0):
+    """Three tight LAB blobs plus a few isolated noise colors, as a 20x30 image."""
+    rng = np.random.default_rng(seed)
+    centers = np.array([[20.0, 5.0, -5.0], [50.0, -20.0, 30.0], [80.0, 0.0, 0.0]])
+    palette = np.concatenate(
+        [center + rng.normal(0, 0.1, (6, 3)) for center in centers]
+        + [rng.uniform(-50, 50, (3, 3)) + [50, 0, 0]]
+    )
+    weights = np.r_[np.full(18, 1.0), np.full(3, 0.02)]
+    indices = rng.choice(len(palette), size=600, p=weights / weights.sum())
+    return palette[indices].reshape(20, 30, 3)
+
+
+def test_unique_lab_inverse_rebuilds_input():
+    lab = _blob_lab_image().reshape(-1, 3)
+    colors, counts, inverse = unique_lab(lab)
+    assert (colors[inverse] == lab).all()
+    assert counts.sum() == len(lab)
+    assert len(colors) <= 21
+
+
+def test_weighted_mode_matches_pixel_mode():
+    lab = _blob_lab_image()
+    weighted = label_lab_array(lab, eps=1.0, min_samples=5, mode="weighted")
+    pixel = label_lab_array(lab, eps=1.0, min_samples=5, mode="pixel")
+    assert weighted.shape == (20, 30)
+    assert len(set(weighted.ravel()) - {-1}) == 3
+    assert ((weighted == -1) == (pixel == -1)).all(), "Noise should match."
+
+
+def test_compare_modes_reports_agreement():
+    report = compare_modes(_blob_lab_image(), eps=1.0, min_samples=5)
+    assert report["agreement"] == pytest.approx(1.0)
+    assert report["noise_agreement"] == pytest.approx(1.0)
+    assert report["speedup"] > 0
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError, match="Unknown clustering mode"):
+        label_lab_array(_blob_lab_image(), mode="octree")
+
+
+def test_cluster_lab_saves_label_map(tmp_path):
+    input_path = tmp_path / "intermediate" / "lab.npy"
+    input_path.parent.mkdir()
+    np.save(input_path, _blob_lab_image())
+    output_path = tmp_path / "results" / "clusters.npy"
+
+    cluster_lab(str(input_path), str(output_path), eps=1.0, min_samples=5)
+    labels = np.load(output_path)
+    assert labels.shape == (20, 30)
+    assert labels.dtype == np.int8, "Labels should use the smallest dtype."
+
+
+def test_streaming_clustering_matches_in_memory(tmp_path):
+    input_path = tmp_path / "lab.npy"
+    np.save(input_path, _blob_lab_image(seed=1))
+    in_memory_path = tmp_path / "results" / "clusters.npy"
+    streamed_path = tmp_path / "results" / "clusters_streamed.npy"
+
+    cluster_lab(str(input_path), str(in_memory_path), eps=1.0, min_samples=5)
+    cluster_lab(
+        str(input_path),
+        str(streamed_path),
+        eps=1.0,
+        min_samples=5,
+        strip_budget=30 * 48 * 3,
+    )
+    assert np.array_equal(np.load(in_memory_path), np.load(streamed_path))
+
+    with pytest.raises(ValueError, match="weighted"):
+        cluster_lab(str(input_path), str(streamed_path), mode="pixel", strip_budget=1)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from PIL import Image
+from image_processing.scripts.clustering.octree_quantizer import (
+    OctreeQuantizer,
+    cluster_octree,
+    quantize_image,
+)
+from image_processing.utils.color_histogram import histogram_colors, load_histogram
+
+
+def _noisy_palette_image(seed=0):
+    """Four well separated base colors with small per-pixel noise."""
+    rng = np.random.default_rng(seed)
+    base = np.array(
+        [[200, 30, 30], [30, 200, 30], [30, 30, 200], [240, 240, 240]], dtype=np.int16
+    )
+    rows = base[rng.integers(0, 4, (40, 50))] + rng.integers(-4, 5, (40, 50, 3))
+    return np.clip(rows, 0, 255).astype(np.uint8)
+
+
+def test_quantize_image_reduces_to_max_colors():
+    rgb = _noisy_palette_image()
+    label_map, quantizer = quantize_image(rgb, max_colors=4)
+
+    assert label_map.shape == (40, 50)
+    assert label_map.dtype == np.int32
+    assert len(quantizer.palette) <= 4
+    assert quantizer.palette_counts.sum() == 40 * 50
+    assert (np.bincount(label_map.ravel()) == quantizer.palette_counts).all()
+    assert (np.diff(quantizer.palette_counts) <= 0).all(), "Most common first."
+
+    error = np.abs(quantizer.palette[label_map].astype(int) - rgb).max()
+    assert error <= 16, "Each pixel should map to its own base color."
+
+
+def test_streaming_matches_single_update():
+    rgb = _noisy_palette_image(seed=1)
+    streamed = OctreeQuantizer(max_colors=8)
+    for strip in np.array_split(rgb, 7):
+        streamed.update(strip)
+    streamed.reduce()
+    _, whole = quantize_image(rgb, max_colors=8)
+
+    assert (streamed.palette == whole.palette).all()
+    assert (streamed.predict(rgb) == whole.predict(rgb)).all()
+
+
+def test_predict_maps_unseen_colors_to_nearest():
+    quantizer = OctreeQuantizer(max_colors=2, max_depth=4)
+    quantizer.update(np.array([[0, 0, 0], [255, 255, 255]], dtype=np.uint8)).reduce()
+    labels = quantizer.predict(np.array([[10, 10, 10], [250, 240, 245]], np.uint8))
+    assert [tuple(quantizer.palette[label]) for label in labels] == [
+        (0, 0, 0),
+        (255, 255, 255),
+    ]
+    assert set(quantizer.group_colors()) == {0, 1}
+
+
+def test_invalid_usage_raises():
+    with pytest.raises(ValueError, match="max_depth"):
+        OctreeQuantizer(max_depth=9)
+    with pytest.raises(ValueError, match="No pixels"):
+        OctreeQuantizer().reduce()
+    with pytest.raises(ValueError, match="reduce"):
+        OctreeQuantizer().predict(np.zeros((1, 3), dtype=np.uint8))
+
+
+def test_cluster_octree_saves_outputs(tmp_path):
+    image_path = tmp_path / "sample.png"
+    Image.fromarray(_noisy_palette_image(seed=2)).save(image_path)
+    output_path = tmp_path / "results" / "clusters.npy"
+    palette_path = tmp_path / "results" / "groups.npz"
+
+    cluster_octree(str(image_path), str(output_path), 4, palette_path=str(palette_path))
+
+    label_map = np.load(output_path)
+    palette = load_histogram(str(palette_path))
+    assert label_map.shape == (40, 50)
+    assert palette["label"].tolist() == list(range(len(palette)))
+    assert histogram_colors(palette).shape == (len(palette), 3)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from PIL import Image
+from skimage.color import rgb2lab
+from image_processing.scripts.conversion.srgb_to_lab import (
+    SRGB_TO_LINEAR,
+    convert_palette_to_lab,
+    convert_to_lab,
+    image_to_lab,
+    palette_to_lab,
+    rgb_to_lab,
+)
+from image_processing.utils.color_histogram import histogram_colors, load_histogram
+
+
+def _sample_image(seed=0):
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (12, 3), dtype=np.uint8)
+    return palette[rng.integers(0, len(palette), (30, 40))]
+
+
+def test_linear_table_matches_gamma_curve():
+    xsrgb = np.arange(256) / 255.0
+    expected = np.where(
+        xsrgb <= 0.04045, xsrgb / 12.92, ((xsrgb + 0.055) / 1.055) ** 2.4
+    )
+    assert SRGB_TO_LINEAR.shape == (256,)
+    assert np.allclose(SRGB_TO_LINEAR, expected)
+
+
+def test_rgb_to_lab_matches_skimage():
+    colors = np.random.default_rng(1).integers(0, 256, (500, 3), dtype=np.uint8)
+    expected = rgb2lab(colors[np.newaxis])[0]
+    assert np.allclose(rgb_to_lab(colors), expected, atol=1e-9)
+
+
+def test_unique_method_matches_full_method():
+    rgb = _sample_image()
+    unique = image_to_lab(rgb, method="unique")
+    full = image_to_lab(rgb, method="full")
+    assert unique.shape == rgb.shape
+    assert unique.dtype == full.dtype == np.float32
+    assert np.allclose(unique, full, atol=1e-9)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError, match="Unknown conversion method"):
+        image_to_lab(_sample_image(), method="per_pixel")
+
+
+def test_palette_to_lab_skips_pixel_grid():
+    rgb = _sample_image(seed=2)
+    histogram = palette_to_lab(rgb)
+    colors = histogram_colors(histogram)
+    assert int(histogram["count"].sum()) == 30 * 40
+    assert len(histogram) == len(np.unique(rgb.reshape(-1, 3), axis=0))
+    assert np.allclose(histogram["lab"], rgb_to_lab(colors), atol=1e-4)
+
+
+def test_convert_files(tmp_path):
+    rgb = _sample_image(seed=3)
+    image_path = tmp_path / "sample.png"
+    Image.fromarray(rgb).save(image_path)
+
+    lab_path = tmp_path / "intermediate" / "sample_lab.npy"
+    convert_to_lab(str(image_path), str(lab_path))
+    saved = np.load(lab_path)
+    assert saved.dtype == np.float32, "LAB intermediates should be float32."
+    assert np.allclose(saved, rgb2lab(rgb), atol=1e-4)
+
+    palette_path = tmp_path / "intermediate" / "sample_palette.npz"
+    convert_palette_to_lab(str(image_path), str(palette_path))
+    assert int(load_histogram(str(palette_path))["count"].sum()) == 30 * 40
+
+
+def test_streaming_conversion_matches_in_memory(tmp_path):
+    rgb = _sample_image(seed=4)
+    image_path = tmp_path / "sample.png"
+    Image.fromarray(rgb).save(image_path)
+    strip_budget = 40 * 48 * 7  # 7 rows of 40 pixels
+
+    lab_path = tmp_path / "lab.npy"
+    streamed_path = tmp_path / "lab_streamed.npy"
+    convert_to_lab(str(image_path), str(lab_path))
+    convert_to_lab(str(image_path), str(streamed_path), strip_budget=strip_budget)
+    assert np.array_equal(np.load(lab_path), np.load(streamed_path))
+
+    palette_path = tmp_path / "palette.npz"
+    streamed_palette_path = tmp_path / "palette_streamed.npz"
+    convert_palette_to_lab(str(image_path), str(palette_path))
+    convert_palette_to_lab(
+        str(image_path), str(streamed_palette_path), strip_budget=strip_budget
+    )
+    assert (
+        load_histogram(str(palette_path)) == load_histogram(str(streamed_palette_path))
+    ).all()
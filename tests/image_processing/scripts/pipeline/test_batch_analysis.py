@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+from image_processing.scripts.conversion.srgb_to_lab import rgb_to_lab
+from image_processing.scripts.pipeline import batch_analysis
+from image_processing.scripts.pipeline.batch_analysis import find_images, run_batch
+from image_processing.scripts.preprocessing.extract_pixels import count_colors
+from image_processing.utils.color_histogram import (
+    histogram_colors,
+    load_histogram,
+    merge_histograms,
+    make_histogram,
+)
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    images = []
+    for index in range(3):
+        rgb = (rng.integers(0, 4, (12, 9 + index, 3)) * 85).astype(np.uint8)
+        nested = tmp_path / ("nested" if index == 2 else "")
+        nested.mkdir(exist_ok=True)
+        Image.fromarray(rgb).save(nested / f"image_{index}.png")
+        images.append(rgb)
+    (tmp_path / "broken.png").write_bytes(b"not an image")
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path, images
+
+
+def test_find_images_walks_directory_and_globs(image_dir):
+    root, _ = image_dir
+    assert len(find_images(str(root))) == 4
+    assert len(find_images(str(root / "*.png"))) == 3
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_merges_histograms_and_isolates_failures(image_dir, workers):
+    root, images = image_dir
+    output_dir = root / "histograms"
+    report = run_batch(
+        find_images(str(root)), workers=workers, output_dir=str(output_dir)
+    )
+
+    expected = merge_histograms(make_histogram(*count_colors(rgb)) for rgb in images)
+    corpus = report["histogram"]
+    assert (corpus["rgb"] == expected["rgb"]).all()
+    assert (corpus["count"] == expected["count"]).all()
+    assert np.allclose(corpus["lab"], rgb_to_lab(histogram_colors(corpus)), atol=1e-4)
+
+    assert report["images"] == 3
+    assert list(report["failures"]) == [str(root / "broken.png")]
+    assert report["pixels"] == sum(rgb.shape[0] * rgb.shape[1] for rgb in images)
+    assert report["images_per_second"] > 0 and report["pixels_per_second"] > 0
+
+    saved = sorted(output_dir.iterdir())
+    assert len(saved) == 3
+    assert load_histogram(str(saved[0]))["count"].sum() > 0
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="Workers must inherit the patched process_image.",
+)
+def test_run_batch_survives_a_crashing_worker(image_dir, monkeypatch):
+    root, images = image_dir
+    process_image = batch_analysis.process_image
+
+    def crash_on_nested(image_path, *args):
+        if "nested" in image_path:
+            os._exit(1)
+        return process_image(image_path, *args)
+
+    monkeypatch.setattr(batch_analysis, "process_image", crash_on_nested)
+    report = run_batch(find_images(str(root)), workers=2)
+
+    crashed = str(root / "nested" / "image_2.png")
+    assert report["failures"][crashed] == "Worker process died."
+    assert str(root / "broken.png") in report["failures"]
+    assert report["images"] == 2
+    assert report["pixels"] == sum(rgb.shape[0] * rgb.shape[1] for rgb in images[:2])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_honors_alpha_mode(tmp_path, workers):
+    rgba = np.zeros((6, 8, 4), dtype=np.uint8)
+    rgba[:2] = (200, 40, 40, 255)
+    rgba[2:4] = (200, 40, 40, 51)
+    for index in range(2):
+        Image.fromarray(rgba).save(tmp_path / f"icon_{index}.png")
+    paths = find_images(str(tmp_path))
+
+    ignored = run_batch(paths, workers=workers, with_lab=False)["histogram"]
+    assert ignored["count"].tolist() == [32, 64], "Transparent pixels read as black"
+
+    skipped = run_batch(paths, workers=workers, with_lab=False, alpha_mode="skip")
+    assert skipped["histogram"]["count"].tolist() == [64]
+
+    weighted = run_batch(paths, workers=workers, alpha_mode="weighted")["histogram"]
+    assert weighted["count"].dtype == np.float64
+    assert weighted["count"].tolist() == pytest.approx([2 * (16 + 16 * 0.2)])
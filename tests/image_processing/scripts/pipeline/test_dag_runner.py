@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.scripts.conversion.srgb_to_lab import image_to_lab
+from image_processing.scripts.pipeline.dag_runner import (
+    Pipeline,
+    Stage,
+    build_pipeline,
+    save_output,
+)
+from image_processing.utils.color_histogram import load_histogram
+from image_processing.utils.result_cache import ResultCache
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    rng = np.random.default_rng(0)
+    rgb = (rng.integers(0, 3, (16, 12, 3)) * 120).astype(np.uint8)
+    path = tmp_path / "image.png"
+    Image.fromarray(rgb).save(path)
+    return str(path)
+
+
+def _counting_pipeline(calls, cache=None):
+    def source(path, scale=1):
+        calls.append("source")
+        return np.asarray(Image.open(path), dtype=np.float64) * scale
+
+    def left(array, offset=0):
+        calls.append("left")
+        return array + offset
+
+    def right(array):
+        calls.append("right")
+        return array.sum(axis=2)
+
+    def joined(left_array, right_array):
+        calls.append("joined")
+        return left_array[..., 0] + right_array
+
+    return Pipeline(
+        [
+            Stage("source", source, persist=False, version="1"),
+            Stage("left", left, deps=["source"], version="1"),
+            Stage("right", right, deps=["source"], version="1"),
+            Stage("joined", joined, deps=["left", "right"], version="1"),
+        ],
+        cache=cache,
+        max_workers=2,
+    )
+
+
+def test_rerun_recomputes_only_downstream_of_changed_params(image_path):
+    calls = []
+    pipeline = _counting_pipeline(calls)
+    first = pipeline.run(image_path)
+    assert sorted(calls) == ["joined", "left", "right", "source"]
+
+    calls.clear()
+    again = pipeline.run(image_path)
+    assert calls == [], "An unchanged run should recompute nothing"
+    assert again["computed"] == []
+    np.testing.assert_array_equal(
+        again["results"]["joined"], first["results"]["joined"]
+    )
+
+    calls.clear()
+    changed = pipeline.run(image_path, params={"left": {"offset": 5}})
+    assert sorted(calls) == ["joined", "left"], "Only left and its dependents rerun"
+    np.testing.assert_array_equal(
+        changed["results"]["joined"], first["results"]["joined"] + 5
+    )
+
+
+def test_changed_input_invalidates_everything(image_path):
+    calls = []
+    pipeline = _counting_pipeline(calls)
+    pipeline.run(image_path)
+    Image.fromarray(np.zeros((4, 4, 3), dtype=np.uint8)).save(image_path)
+
+    calls.clear()
+    report = pipeline.run(image_path)
+    assert sorted(calls) == ["joined", "left", "right", "source"]
+    assert report["results"]["joined"].shape == (4, 4)
+
+
+def test_disk_cache_is_shared_across_pipelines(image_path, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    _counting_pipeline([], cache=cache).run(image_path)
+
+    calls = []
+    report = _counting_pipeline(calls, cache=cache).run(image_path, targets=["joined"])
+    assert calls == [], "A cached target should not need its upstream stages"
+    assert report["reused"] == ["joined"]
+
+    calls.clear()
+    _counting_pipeline(calls, cache=cache).run(
+        image_path, params={"left": {"offset": 1}}
+    )
+    assert sorted(calls) == ["joined", "left", "source"]
+
+
+def test_entries_evicted_after_planning_are_recomputed(image_path, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    expected = _counting_pipeline([], cache=cache).run(image_path)["results"]
+
+    calls = []
+    pipeline = _counting_pipeline(calls, cache=cache)
+    plan = pipeline.plan
+
+    def plan_then_evict(*args, **kwargs):
+        planned = plan(*args, **kwargs)
+        cache.clear()
+        return planned
+
+    pipeline.plan = plan_then_evict
+    report = pipeline.run(image_path, targets=["joined"])
+    np.testing.assert_array_equal(report["results"]["joined"], expected["joined"])
+    assert sorted(calls) == ["joined", "left", "right", "source"]
+    assert report["computed"] == ["source", "left", "right", "joined"]
+    assert report["reused"] == []
+
+
+def test_memo_is_bounded(image_path):
+    calls = []
+    pipeline = _counting_pipeline(calls)
+    pipeline.memo_bytes = 16 * 12 * 8 * 2  # Room for two of the 2-D results
+    report = pipeline.run(image_path)
+    assert sum(array.nbytes for _, array in pipeline._memo.values()) <= (
+        pipeline.memo_bytes
+    )
+    assert len(pipeline._memo) == 2 and list(pipeline._memo)[-1] == "joined"
+    assert list(report["results"]) == ["source", "left", "right", "joined"]
+
+    calls.clear()
+    pipeline.run(image_path, targets=["joined"])
+    assert calls == []
+
+
+def test_invalid_graphs_are_rejected():
+    pipeline = Pipeline([Stage("a", np.asarray, version="1")])
+    with pytest.raises(ValueError):
+        pipeline.add(Stage("b", np.asarray, deps=["missing"], version="1"))
+    with pytest.raises(ValueError):
+        pipeline.add(Stage("a", np.asarray, version="1"))
+
+
+def test_standard_pipeline_runs_all_branches(image_path, tmp_path):
+    pipeline = build_pipeline(max_workers=2)
+    report = pipeline.run(
+        image_path, params={"clusters": {"eps": 1.0, "min_samples": 2}}
+    )
+    results = report["results"]
+
+    rgb = np.asarray(Image.open(image_path).convert("RGB"))
+    np.testing.assert_allclose(results["lab"], image_to_lab(rgb), atol=1e-5)
+    assert int(results["histogram"]["count"].sum()) == rgb.shape[0] * rgb.shape[1]
+    assert results["clusters"].shape == rgb.shape[:2]
+    assert bytes(results["cluster_chart"][:8]) == b"\x89PNG\r\n\x1a\n"
+
+    save_output(str(tmp_path / "out" / "histogram.npz"), results["histogram"])
+    loaded = load_histogram(str(tmp_path / "out" / "histogram.npz"))
+    np.testing.assert_array_equal(loaded, results["histogram"])
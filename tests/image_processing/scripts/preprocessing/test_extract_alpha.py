@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.scripts.preprocessing.extract_alpha import (
+    alpha_coverage,
+    alpha_histogram,
+    composite,
+    count_colors_rgba,
+    load_rgba,
+)
+from image_processing.scripts.preprocessing.extract_pixels import count_colors
+
+
+def _icon(seed=0):
+    """A mostly transparent RGBA image whose hidden pixels are black."""
+    rng = np.random.default_rng(seed)
+    rgba = np.zeros((20, 30, 4), dtype=np.uint8)
+    rgba[5:10, 5:20, :3] = rng.integers(0, 4, (5, 15, 3)) * 80
+    rgba[5:10, 5:20, 3] = rng.choice([128, 255], (5, 15))
+    return rgba
+
+
+def test_alpha_histogram_and_coverage():
+    rgba = _icon()
+    histogram = alpha_histogram(rgba)
+    assert histogram.sum() == 20 * 30
+    coverage = alpha_coverage(histogram)
+    assert coverage["transparent"] == pytest.approx(1 - 75 / 600)
+    assert coverage["partial"] + coverage["opaque"] == pytest.approx(75 / 600)
+    expected_opacity = rgba[..., 3].mean() / 255
+    assert coverage["opacity"] == pytest.approx(expected_opacity)
+
+
+def test_skip_mode_drops_transparent_pixels():
+    rgba = _icon()
+    colors, counts = count_colors_rgba(rgba, mode="skip")
+    expected_colors, expected_counts = count_colors(rgba[5:10, 5:20, :3])
+    np.testing.assert_array_equal(colors, expected_colors)
+    np.testing.assert_array_equal(counts, expected_counts)
+
+    ignored_colors, ignored_counts = count_colors_rgba(rgba, mode="ignore")
+    assert ignored_counts.sum() == 600, "Ignoring alpha counts every pixel"
+
+
+def test_weighted_mode_sums_opacity():
+    rgba = _icon()
+    colors, weights = count_colors_rgba(rgba, mode="weighted")
+    assert weights.sum() == pytest.approx(rgba[..., 3].sum() / 255)
+    for color, weight in zip(colors, weights):
+        mask = (rgba[..., :3] == color).all(axis=-1) & (rgba[..., 3] > 0)
+        assert weight == pytest.approx(rgba[..., 3][mask].sum() / 255)
+    with pytest.raises(ValueError):
+        count_colors_rgba(rgba, mode="bogus")
+
+
+def test_composite_matches_float_blend():
+    rng = np.random.default_rng(1)
+    rgba = rng.integers(0, 256, (50, 4), dtype=np.uint8)
+    for background in [(255, 255, 255), (0, 0, 0), (30, 60, 90)]:
+        alpha = rgba[:, 3:] / 255.0
+        expected = rgba[:, :3] * alpha + np.array(background) * (1 - alpha)
+        result = composite(rgba, background)
+        assert result.dtype == np.uint8
+        assert np.abs(result - expected).max() <= 0.5 + 1e-9
+
+
+def test_load_rgba_keeps_alpha(tmp_path):
+    rgba = _icon()
+    path = tmp_path / "icon.png"
+    Image.fromarray(rgba).save(path)
+    np.testing.assert_array_equal(load_rgba(str(path)), rgba)
+    Image.fromarray(rgba[..., :3]).save(tmp_path / "opaque.png")
+    assert (load_rgba(str(tmp_path / "opaque.png"))[..., 3] == 255).all()
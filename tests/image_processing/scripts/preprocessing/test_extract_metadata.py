@@ -0,0 +1,98 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.scripts.preprocessing.extract_metadata import (
+    extract_metadata,
+    read_metadata,
+)
+
+
+def _encode(mode, size=(37, 23), **save_args):
+    rng = np.random.default_rng(0)
+    channels = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4, "CMYK": 4}[mode]
+    pixels = rng.integers(0, 256, (size[1], size[0], channels), dtype=np.uint8)
+    img = Image.fromarray(pixels.squeeze()).convert(mode)
+    buffer = io.BytesIO()
+    img.save(buffer, **save_args)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "mode, color_type",
+    [("L", "grayscale"), ("LA", "grayscale_alpha"), ("RGB", "rgb"), ("RGBA", "rgba")],
+)
+def test_png_ihdr(mode, color_type):
+    meta = extract_metadata(_encode(mode, format="PNG", dpi=(72, 72)))
+    assert (meta["format"], meta["width"], meta["height"]) == ("png", 37, 23)
+    assert meta["bit_depth"] == 8
+    assert meta["color_type"] == color_type
+    assert meta["compression_method"] == "deflate"
+    assert meta["metadata"]["has_transparency"] == ("A" in mode)
+    assert "pHYs" in meta["metadata"]["chunks"]
+
+
+def test_png_palette_with_transparency():
+    img = Image.new("P", (5, 4))
+    img.info["transparency"] = 0
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", transparency=0)
+    meta = extract_metadata(buffer.getvalue())
+    assert meta["color_type"] == "indexed"
+    assert meta["metadata"]["has_transparency"]
+
+
+@pytest.mark.parametrize(
+    "mode, progressive, color_type, method",
+    [
+        ("RGB", False, "ycbcr", "baseline_dct"),
+        ("RGB", True, "ycbcr", "progressive_dct"),
+        ("L", False, "grayscale", "baseline_dct"),
+        ("CMYK", False, "cmyk", "baseline_dct"),
+    ],
+)
+def test_jpeg_start_of_frame(mode, progressive, color_type, method):
+    data = _encode(mode, format="JPEG", progressive=progressive)
+    meta = extract_metadata(data)
+    assert (meta["width"], meta["height"], meta["bit_depth"]) == (37, 23, 8)
+    assert meta["color_type"] == color_type
+    assert meta["compression_method"] == method
+    assert meta["metadata"]["progressive"] is progressive
+    assert any(s.startswith("APP0:JFIF") for s in meta["metadata"]["segments"]) or (
+        mode == "CMYK"
+    )
+
+
+def test_gif_logical_screen_descriptor(tmp_path):
+    path = tmp_path / "image.gif"
+    Image.new("P", (64, 33)).save(path)
+    meta = extract_metadata(str(path))
+    assert (meta["format"], meta["width"], meta["height"]) == ("gif", 64, 33)
+    assert meta["color_type"] == "indexed"
+    assert meta["compression_method"] == "lzw"
+    assert meta["metadata"]["global_color_table"]
+    assert meta["metadata"]["global_color_table_size"] == 2 ** meta["bit_depth"]
+
+
+def test_reads_only_the_header():
+    data = _encode("RGB", size=(1000, 800), format="PNG")
+
+    class CountingStream(io.BytesIO):
+        consumed = 0
+
+        def read(self, size=-1):
+            chunk = super().read(size)
+            CountingStream.consumed += len(chunk)
+            return chunk
+
+    read_metadata(CountingStream(data))
+    assert CountingStream.consumed < 200, "Pixel data should never be read"
+
+
+def test_rejects_unknown_and_truncated_files():
+    with pytest.raises(ValueError):
+        extract_metadata(b"BM not supported")
+    with pytest.raises(ValueError):
+        extract_metadata(_encode("RGB", format="PNG")[:20])
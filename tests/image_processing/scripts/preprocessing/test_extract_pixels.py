@@ -0,0 +1,187 @@
+import numpy as np
+import pytest
+from PIL import Image
+from image_processing.scripts.preprocessing import extract_pixels
+from image_processing.scripts.preprocessing.extract_pixels import (
+    color_count_dict,
+    count_colors,
+    count_colors_streaming,
+    count_colors_rgba,
+    count_packed,
+    image_shape,
+    iter_rgb_strips,
+    load_rgb,
+    pack_rgb,
+    process_image,
+    save_results,
+    strip_rows_for_budget,
+    unique_colors,
+    unpack_rgb,
+)
+
+
+def _legacy_count(rgb_array):
+    """Reference per-pixel count, as done by the obsolete image_color_counter."""
+    counts = {}
+    for pixel in map(tuple, rgb_array.reshape(-1, 3).tolist()):
+        counts[pixel] = counts.get(pixel, 0) + 1
+    return counts
+
+
+def _random_image(shape, seed=0, levels=8):
+    rng = np.random.default_rng(seed)
+    return (rng.integers(0, levels, shape + (3,)) * (255 // (levels - 1))).astype(
+        np.uint8
+    )
+
+
+def test_pack_unpack_round_trip():
+    rgb = np.array([[0, 0, 0], [255, 255, 255], [18, 52, 86]], dtype=np.uint8)
+    packed = pack_rgb(rgb)
+    assert packed.dtype == np.uint32
+    assert packed.tolist() == [0, 0xFFFFFF, 0x123456]
+    assert (unpack_rgb(packed) == rgb).all(), "Unpacking should restore RGB."
+
+
+def test_count_colors_matches_legacy_counter():
+    rgb = _random_image((40, 30))
+    colors, counts = count_colors(rgb)
+    expected = _legacy_count(rgb)
+    assert color_count_dict(colors, counts) == expected
+    assert [tuple(c) for c in colors.tolist()] == sorted(
+        expected
+    ), "Colors should be sorted like the legacy counter's output."
+
+
+def test_bincount_path_matches_unique_path(monkeypatch):
+    rgb = _random_image((64, 64), seed=1)
+    unique_colors, unique_counts = count_colors(rgb)
+
+    monkeypatch.setattr(extract_pixels, "BINCOUNT_MIN_PIXELS", 0)
+    monkeypatch.setattr(extract_pixels, "COUNT_BLOCK_PIXELS", 1000)
+    bin_colors, bin_counts = count_colors(rgb)
+    packed_colors, packed_counts = count_packed(pack_rgb(rgb))
+
+    assert (bin_colors == unique_colors).all()
+    assert (bin_counts == unique_counts).all()
+    assert (unpack_rgb(packed_colors) == unique_colors).all()
+    assert (packed_counts == unique_counts).all()
+    assert bin_counts.sum() == 64 * 64
+
+
+def test_process_image_and_save_results(tmp_path):
+    rgb = _random_image((20, 25), seed=2)
+    image_path = tmp_path / "sample.png"
+    Image.fromarray(rgb).save(image_path)
+
+    colors, counts = process_image(str(image_path))
+    output_path = tmp_path / "out" / "color_data.txt"
+    save_results(colors, counts, str(output_path))
+
+    lines = output_path.read_text().splitlines()
+    assert lines[0] == "sRGB Color (R, G, B), Count"
+    expected = sorted(_legacy_count(rgb).items())
+    assert lines[1:] == [f"{color}, {count}" for color, count in expected]
+
+
+def test_unique_colors_inverse_rebuilds_image(monkeypatch):
+    rgb = _random_image((16, 24), seed=3)
+    colors, counts, inverse = unique_colors(rgb)
+    assert inverse.shape == (16, 24)
+    assert inverse.dtype == np.int32
+    assert (colors[inverse] == rgb).all(), "Inverse should index back to pixels."
+    assert (np.bincount(inverse.ravel()) == counts).all()
+
+    monkeypatch.setattr(extract_pixels, "BINCOUNT_MIN_PIXELS", 0)
+    _, _, lookup_inverse = unique_colors(rgb)
+    assert (lookup_inverse == inverse).all()
+
+
+def test_streaming_count_matches_in_memory(tmp_path):
+    rgb = _random_image((37, 23), seed=4)
+    image_path = tmp_path / "sample.png"
+    Image.fromarray(rgb).save(image_path)
+    npy_path = tmp_path / "sample.npy"
+    np.save(npy_path, rgb)
+
+    colors, counts = count_colors(rgb)
+    strip_budget = 23 * extract_pixels.STRIP_BYTES_PER_PIXEL * 5  # 5 rows
+    for source in (rgb, str(image_path), str(npy_path)):
+        strip_colors, strip_counts = count_colors_streaming(source, strip_budget)
+        assert (strip_colors == colors).all()
+        assert (strip_counts == counts).all()
+
+    image_colors, _ = process_image(str(image_path), strip_budget=strip_budget)
+    assert (image_colors == colors).all()
+
+
+def test_streaming_count_merges_strips_in_batches(monkeypatch):
+    rgb = _random_image((200, 16), seed=5, levels=64)
+    merges = []
+    merge = extract_pixels.merge_packed_counts
+
+    def counting_merge(colors_list, counts_list):
+        merges.append(len(colors_list))
+        return merge(colors_list, counts_list)
+
+    monkeypatch.setattr(extract_pixels, "merge_packed_counts", counting_merge)
+    strip_budget = 16 * extract_pixels.STRIP_BYTES_PER_PIXEL  # 1 row
+    colors, counts = count_colors_streaming(rgb, strip_budget)
+
+    expected_colors, expected_counts = count_colors(rgb)
+    assert (colors == expected_colors).all()
+    assert (counts == expected_counts).all()
+    assert sum(merges) - len(merges) == 200, "Every strip is merged once"
+    assert len(merges) < 200 // extract_pixels.MERGE_MIN_STRIPS
+
+
+def test_iter_rgb_strips_covers_image():
+    rgb = _random_image((10, 4), seed=5)
+    strips = list(iter_rgb_strips(rgb, 3))
+    assert [row for row, _ in strips] == [0, 3, 6, 9]
+    assert (np.concatenate([strip for _, strip in strips]) == rgb).all()
+    assert image_shape(rgb) == (10, 4)
+    assert strip_rows_for_budget(100, 1) == 1
+
+
+def _transparent_image(seed=0):
+    rgba = np.zeros((30, 20, 4), dtype=np.uint8)
+    rgba[..., :3] = _random_image((30, 20), seed=seed, levels=4)
+    rgba[..., 3] = np.random.default_rng(seed).choice([0, 0, 85, 255], (30, 20))
+    return rgba
+
+
+def test_load_rgb_composites_onto_background(tmp_path):
+    rgba = _transparent_image()
+    path = tmp_path / "icon.png"
+    Image.fromarray(rgba).save(path)
+    np.testing.assert_array_equal(load_rgb(str(path)), rgba[..., :3])
+
+    white = load_rgb(str(path), background=(255, 255, 255))
+    transparent = rgba[..., 3] == 0
+    assert (white[transparent] == 255).all()
+    np.testing.assert_array_equal(
+        white[rgba[..., 3] == 255], rgba[rgba[..., 3] == 255][:, :3]
+    )
+
+
+@pytest.mark.parametrize("alpha_mode", ["skip", "weighted", "ignore"])
+def test_process_image_honors_alpha_mode(tmp_path, alpha_mode):
+    rgba = _transparent_image(seed=1)
+    path = str(tmp_path / "icon.png")
+    Image.fromarray(rgba).save(path)
+
+    expected_colors, expected_counts = count_colors_rgba(rgba, alpha_mode)
+    strip_budget = 20 * extract_pixels.STRIP_BYTES_PER_PIXEL * 3  # 3 rows
+    for budget in (None, strip_budget):
+        colors, counts = process_image(path, budget, alpha_mode)
+        np.testing.assert_array_equal(colors, expected_colors)
+        np.testing.assert_allclose(counts, expected_counts)
+        assert counts.dtype.kind == ("f" if alpha_mode == "weighted" else "i")
+
+    visible = (rgba[..., 3] > 0).sum()
+    expected_total = {"skip": visible, "ignore": rgba[..., 0].size}
+    expected_total["weighted"] = rgba[..., 3].sum() / 255
+    assert counts.sum() == pytest.approx(expected_total[alpha_mode])
+    with pytest.raises(ValueError):
+        process_image(path, alpha_mode="bogus")
@@ -0,0 +1,132 @@
+import hashlib
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.scripts.preprocessing.image_hash import (
+    HashIndex,
+    average_hash,
+    content_hash,
+    difference_hash,
+    hamming_distance,
+    image_hashes,
+)
+
+
+def _scene(seed=0, size=(320, 240)):
+    """A smooth random scene, so resampling keeps its structure."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize(size, Image.Resampling.BICUBIC)
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def _distance(first, second):
+    return max(
+        hamming_distance(int(first["ahash"], 16), int(second["ahash"], 16)),
+        hamming_distance(int(first["dhash"], 16), int(second["dhash"], 16)),
+    )
+
+
+def test_content_hash_of_bytes_and_path(tmp_path):
+    data = _encode(_scene(), "PNG")
+    path = tmp_path / "scene.png"
+    path.write_bytes(data)
+    assert content_hash(data) == hashlib.sha256(data).hexdigest()
+    assert content_hash(str(path)) == content_hash(data)
+    assert image_hashes(str(path)) == image_hashes(data)
+
+
+def test_hashes_are_64_bit_hex():
+    hashes = image_hashes(_encode(_scene(), "PNG"))
+    assert len(hashes["sha256"]) == 64
+    assert len(hashes["ahash"]) == len(hashes["dhash"]) == 16
+
+
+def test_reexports_are_near_duplicates():
+    scene = _scene()
+    original = image_hashes(_encode(scene, "PNG"))
+    variants = [
+        _encode(scene, "JPEG", quality=60),
+        _encode(scene.resize((160, 120)), "PNG"),
+        _encode(scene.convert("RGBA"), "PNG"),
+    ]
+    for data in variants:
+        hashes = image_hashes(data)
+        assert hashes["sha256"] != original["sha256"]
+        assert _distance(hashes, original) <= 4
+
+
+def test_different_images_are_far_apart():
+    hashes = [image_hashes(_encode(_scene(seed), "PNG")) for seed in range(6)]
+    distances = [
+        _distance(hashes[i], hashes[j])
+        for i in range(len(hashes))
+        for j in range(i + 1, len(hashes))
+    ]
+    assert min(distances) > 10
+
+
+def test_hash_bits():
+    gradient = Image.fromarray(np.tile(np.arange(64, dtype=np.uint8) * 4, (64, 1)))
+    # Left half darker than the mean, right half brighter.
+    assert average_hash(gradient) == int("0f" * 8, 16)
+    # Brightness rises to the right, so no left pixel is brighter.
+    assert difference_hash(gradient) == 0
+    assert difference_hash(gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)) == (
+        2**64 - 1
+    )
+
+
+def test_undecodable_images_raise():
+    with pytest.raises(OSError):
+        image_hashes(b"not an image")
+
+
+def test_max_pixels_skips_large_images():
+    data = _encode(_scene(), "PNG")
+    hashes = image_hashes(data, max_pixels=320 * 240 - 1)
+    assert hashes == {"sha256": content_hash(data), "ahash": None, "dhash": None}
+    assert image_hashes(data, max_pixels=320 * 240) == image_hashes(data)
+
+    # JPEGs are checked at their draft-scaled size.
+    large = _encode(_scene(size=(2048, 1536)), "JPEG")
+    assert image_hashes(large, max_pixels=320 * 240)["ahash"] is not None
+
+
+def test_hash_index_distances_match_hamming_distance():
+    rng = np.random.default_rng(0)
+    values = [int(value) for value in rng.integers(0, 2**63, 40, dtype=np.uint64)]
+    index = HashIndex()
+    index.add(range(20), values[:20], values[20:])
+    ids, distances = index.near(values[0], values[20], max_distance=64)
+    expected = [
+        max(hamming_distance(a, values[0]), hamming_distance(d, values[20]))
+        for a, d in zip(values[:20], values[20:])
+    ]
+    assert distances.tolist() == [expected[i] for i in ids]
+
+
+def test_hash_index_near():
+    index = HashIndex()
+    base = 0x0F0F0F0F0F0F0F0F
+    index.add([1, 2, 3], [base, base ^ 0b111, base ^ (2**40 - 1)], ["0" * 16] * 3)
+    index.add([4], [f"{base ^ 0b1:016x}"], [0])
+
+    ids, distances = index.near(base, 0, max_distance=3)
+    assert ids.tolist() == [1, 4, 2]
+    assert distances.tolist() == [0, 1, 3]
+
+    index.remove(4)
+    assert index.near(base, 0, max_distance=3)[0].tolist() == [1, 2]
+    # Both hashes must be close.
+    assert len(index.near(base, 2**64 - 1, max_distance=3)[0]) == 0
+    index.clear()
+    assert len(index) == 0
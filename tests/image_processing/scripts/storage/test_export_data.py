@@ -0,0 +1,142 @@
+import csv
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+from image_processing.scripts.clustering.group_colors import group_stats
+from image_processing.scripts.conversion.srgb_to_lab import palette_histogram
+from image_processing.scripts.storage import export_data
+from image_processing.scripts.storage.create_db import create_db
+from image_processing.scripts.storage.export_data import (
+    export_dataset,
+    infer_format,
+    iter_palettes,
+)
+from image_processing.scripts.storage.insert_data import insert_palette, rank_colors
+from image_processing.utils.color_histogram import histogram_colors, with_fields
+
+
+def _store(tmp_path, images=3, size=200):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    histograms = []
+    for seed in range(images):
+        rng = np.random.default_rng(seed)
+        colors = np.unique(rng.integers(0, 256, (size, 3), dtype=np.uint8), axis=0)
+        histogram = palette_histogram(colors, rng.integers(1, 100, len(colors)))
+        histogram = with_fields(histogram, labels=rng.integers(-1, 5, len(colors)))
+        insert_palette(conn, histogram, source=f"image_{seed}.png")
+        histograms.append(histogram)
+    return conn, histograms
+
+
+def test_infer_format():
+    assert infer_format("out/palettes.ndjson.gz") == ("ndjson", "gzip")
+    assert infer_format("clusters.CSV") == ("csv", None)
+    assert infer_format("zones.parquet.zst") == ("parquet", "zstd")
+    with pytest.raises(ValueError):
+        infer_format("palettes.txt")
+
+
+def test_palette_chunks_have_fixed_size(tmp_path):
+    conn, histograms = _store(tmp_path)
+    sizes = [len(rows) for rows in iter_palettes(conn, chunk_rows=64)]
+    assert sum(sizes) == sum(len(histogram) for histogram in histograms)
+    assert all(size == 64 for size in sizes[:-1])
+
+
+def test_export_palettes_ndjson_gzip(tmp_path):
+    conn, histograms = _store(tmp_path)
+    path = str(tmp_path / "palettes.ndjson.gz")
+    rows = export_dataset(conn, "palettes", path, chunk_rows=50)
+
+    with gzip.open(path, "rt") as stream:
+        records = [json.loads(line) for line in stream]
+    assert rows == len(records) == sum(len(h) for h in histograms)
+    # Palettes are exported most frequent color first.
+    first, histogram = records[0], rank_colors(histograms[0])
+    red, green, blue = histogram_colors(histogram)[0]
+    assert first["source"] == "image_0.png"
+    assert first["hex"] == f"#{red:02x}{green:02x}{blue:02x}"
+    assert first["count"] == histogram["count"][0]
+    assert first["cluster"] == histogram["label"][0]
+    assert np.isclose(first["L"], histogram["lab"][0, 0], atol=1e-4)
+
+
+def test_export_clusters_csv_matches_group_stats(tmp_path):
+    conn, histograms = _store(tmp_path, images=1)
+    path = str(tmp_path / "clusters.csv")
+    export_dataset(conn, "clusters", path)
+
+    with open(path, newline="") as stream:
+        records = list(csv.DictReader(stream))
+    histogram = histograms[0]
+    expected = group_stats(
+        histogram_colors(histogram),
+        histogram["count"],
+        histogram["label"],
+        histogram["lab"],
+    )
+    assert [int(record["cluster"]) for record in records] == expected["label"].tolist()
+    for record, group in zip(records, expected):
+        assert int(record["members"]) == group["members"]
+        assert int(record["count"]) == group["count"]
+        assert record["dominant_hex"] == f"#{group['rgb']:06x}"
+        assert np.isclose(float(record["L"]), group["lab_mean"][0], atol=1e-3)
+
+
+def test_export_weighted_palette_counts(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    colors = np.array([[200, 0, 0], [190, 0, 0]], dtype=np.uint8)
+    histogram = palette_histogram(colors, np.array([1.0, 5.88]))
+    insert_palette(conn, with_fields(histogram, labels=np.array([0, 0])))
+
+    path = str(tmp_path / "palettes.ndjson")
+    export_dataset(conn, "palettes", path)
+    with open(path) as stream:
+        records = [json.loads(line) for line in stream]
+    assert [record["count"] for record in records] == [5.88, 1.0]
+
+    path = str(tmp_path / "clusters.csv")
+    export_dataset(conn, "clusters", path)
+    with open(path, newline="") as stream:
+        (record,) = csv.DictReader(stream)
+    assert float(record["count"]) == pytest.approx(6.88)
+    assert record["dominant_hex"] == "#be0000"
+
+
+def test_export_weighted_palette_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    conn = create_db(str(tmp_path / "palettes.db"))
+    colors = np.array([[200, 0, 0], [190, 0, 0], [0, 0, 0]], dtype=np.uint8)
+    histogram = palette_histogram(colors, np.array([1.0, 5.88, 3.0]))
+    insert_palette(conn, with_fields(histogram, labels=np.array([0, 0, 1])))
+
+    path = str(tmp_path / "clusters.parquet")
+    export_dataset(conn, "clusters", path)
+    counts = pq.read_table(path).column("count").to_pylist()
+    assert counts == pytest.approx([6.88, 3.0])
+
+
+def test_export_luminosity_counts_every_pixel(tmp_path):
+    conn, histograms = _store(tmp_path)
+    path = str(tmp_path / "luminosity.ndjson")
+    export_dataset(conn, "luminosity", path, chunk_rows=7)
+
+    with open(path) as stream:
+        records = [json.loads(line) for line in stream]
+    for channel in ("L", "Y"):
+        total = sum(r["count"] for r in records if r["channel"] == channel)
+        assert total == sum(int(h["count"].sum()) for h in histograms)
+    assert all(r["lower"] < r["upper"] for r in records)
+
+
+def test_optional_backends_report_missing_packages(tmp_path, monkeypatch):
+    conn, _ = _store(tmp_path, images=1)
+    monkeypatch.setattr(export_data, "zstandard", None)
+    monkeypatch.setattr(export_data, "pa", None)
+    with pytest.raises(RuntimeError, match="zstandard"):
+        export_dataset(conn, "palettes", str(tmp_path / "palettes.csv.zst"))
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        export_dataset(conn, "palettes", str(tmp_path / "palettes.parquet"))
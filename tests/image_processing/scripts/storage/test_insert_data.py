@@ -0,0 +1,113 @@
+import sqlite3
+from itertools import islice
+
+import numpy as np
+import pytest
+
+from image_processing.scripts.conversion.srgb_to_lab import palette_histogram
+from image_processing.scripts.storage.create_db import SCHEMA_VERSION, create_db
+from image_processing.scripts.storage import insert_data
+from image_processing.scripts.storage.insert_data import (
+    _palette_rows,
+    cluster_ranks,
+    fetch_palette,
+    insert_palette,
+    rank_colors,
+)
+from image_processing.utils.color_histogram import make_histogram, with_fields
+
+
+def _labeled_histogram(size=500, seed=0):
+    rng = np.random.default_rng(seed)
+    colors = np.unique(rng.integers(0, 256, (size, 3), dtype=np.uint8), axis=0)
+    histogram = palette_histogram(colors, rng.integers(1, 1000, len(colors)))
+    return with_fields(histogram, labels=rng.integers(-1, 8, len(colors)))
+
+
+def test_create_db_uses_wal(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert {"images", "palette_colors"} <= tables
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_cluster_ranks():
+    labels = np.array([2, 0, 2, -1, 0, 2])
+    assert cluster_ranks(labels).tolist() == [0, 0, 1, 0, 1, 2]
+
+
+def test_insert_palette_round_trip(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    histogram = _labeled_histogram()
+    image_id = insert_palette(conn, histogram, source="a.png", chunk_rows=64)
+
+    stored = fetch_palette(conn, image_id)
+    assert np.array_equal(stored, histogram)
+    pixels, colors = conn.execute(
+        "SELECT pixels, colors FROM images WHERE id = ?", (image_id,)
+    ).fetchone()
+    assert pixels == histogram["count"].sum()
+    assert colors == len(histogram)
+    conn.close()
+
+
+def test_insert_palette_replaces_same_source(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    first = insert_palette(conn, _labeled_histogram(seed=1), source="a.png")
+    replacement = _labeled_histogram(size=50, seed=2)
+    second = insert_palette(conn, replacement, source="a.png")
+
+    assert first == second
+    assert np.array_equal(fetch_palette(conn, second), replacement)
+    (rows,) = conn.execute("SELECT COUNT(*) FROM palette_colors").fetchone()
+    assert rows == len(replacement)
+    conn.close()
+
+
+def test_insert_palette_without_lab_or_labels(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    histogram = make_histogram(np.array([[0, 0, 0], [255, 0, 0]]), np.array([3, 4]))
+    image_id = insert_palette(conn, histogram)
+
+    stored = fetch_palette(conn, image_id)
+    assert stored.dtype.names == histogram.dtype.names
+    assert np.array_equal(stored, histogram)
+    conn.close()
+
+
+def test_failed_insert_leaves_no_partial_palette(tmp_path, monkeypatch):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    histogram = _labeled_histogram()
+
+    def failing_rows(image_id, ranked, chunk_rows):
+        yield from islice(_palette_rows(image_id, ranked, chunk_rows), 1)
+        yield 1, [image_id, 0, 0, 1, None, None, None, None, None]  # Same rank
+
+    monkeypatch.setattr(insert_data, "_palette_rows", failing_rows)
+    with pytest.raises(sqlite3.IntegrityError):
+        insert_palette(conn, histogram, source="a.png", chunk_rows=64)
+    assert conn.execute("SELECT COUNT(*) FROM palette_colors").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 0
+    conn.close()
+
+
+def test_dominant_color_and_rank_order(tmp_path):
+    conn = create_db(str(tmp_path / "palettes.db"))
+    histogram = _labeled_histogram()
+    image_id = insert_palette(conn, histogram)
+
+    top = rank_colors(histogram)
+    assert np.all(np.diff(top["count"].astype(np.int64)) <= 0)
+    dominant_rgb, dominant_l = conn.execute(
+        "SELECT dominant_rgb, dominant_l FROM images WHERE id = ?", (image_id,)
+    ).fetchone()
+    assert dominant_rgb == top["rgb"][0]
+    assert np.isclose(dominant_l, top["lab"][0, 0])
+    stored = conn.execute(
+        "SELECT rgb FROM palette_colors WHERE image_id = ? ORDER BY rank LIMIT 5",
+        (image_id,),
+    ).fetchall()
+    assert [rgb for (rgb,) in stored] == top["rgb"][:5].tolist()
+    conn.close()
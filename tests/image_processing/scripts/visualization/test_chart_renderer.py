@@ -0,0 +1,64 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from image_processing.scripts.analysis.compute_histogram import LabHistogram
+from image_processing.scripts.preprocessing.extract_pixels import count_colors
+from image_processing.scripts.visualization import chart_renderer
+from image_processing.scripts.visualization.chart_renderer import ChartRenderer
+from image_processing.scripts.visualization.visualize_histogram import (
+    visualize_histogram,
+)
+from image_processing.utils.result_cache import ResultCache
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def histogram():
+    rgb = np.random.default_rng(0).integers(0, 256, (30, 20, 3), dtype=np.uint8)
+    return LabHistogram.from_palette(*count_colors(rgb))
+
+
+def test_charts_render_without_pyplot_figures(histogram):
+    renderer = ChartRenderer()
+    charts = [
+        renderer.histogram_chart(histogram.counts["L"], histogram.edges("L")),
+        renderer.luminosity_zone_chart(histogram.counts["Y"], histogram.edges("Y")),
+        renderer.cluster_chart(np.arange(20).reshape(4, 5) % 3),
+    ]
+    assert all(chart.startswith(PNG_SIGNATURE) for chart in charts)
+    assert plt.get_fignums() == [], "Charts must not register pyplot figures"
+
+
+def test_bars_are_one_artist_and_annotations_are_capped(histogram):
+    axes = chart_renderer.Figure().add_subplot()
+    ChartRenderer._draw_bars(
+        axes, histogram.counts["L"], histogram.edges("L"), 0.0, max_annotations=5
+    )
+    assert len(axes.patches) == 1, "Bars should be a single artist"
+    assert len(axes.texts) == 5
+
+
+def test_cache_returns_identical_png_without_rendering(
+    histogram, tmp_path, monkeypatch
+):
+    renderer = ChartRenderer(ResultCache(str(tmp_path / "cache")))
+    first = renderer.histogram_chart(histogram.counts["L"], histogram.edges("L"))
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("A cached chart should not be drawn again.")
+
+    monkeypatch.setattr(chart_renderer, "Figure", fail)
+    again = renderer.histogram_chart(histogram.counts["L"], histogram.edges("L"))
+    assert again == first
+    with pytest.raises(AssertionError):
+        renderer.histogram_chart(histogram.counts["L"] + 1, histogram.edges("L"))
+
+
+def test_visualize_histogram_writes_both_charts(histogram, tmp_path):
+    paths = visualize_histogram(histogram, str(tmp_path / "charts"), prefix="img_")
+    assert len(paths) == 2
+    for path in paths:
+        with open(path, "rb") as file:
+            assert file.read(8) == PNG_SIGNATURE
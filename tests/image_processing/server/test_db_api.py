@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from image_processing.scripts.conversion.srgb_to_lab import palette_histogram
+from image_processing.scripts.storage.create_db import create_db
+from image_processing.scripts.storage.insert_data import insert_palette, rank_colors
+from image_processing.server.db_api import (
+    CLUSTER_COLORS_QUERY,
+    IMAGES_BY_DOMINANT_L_QUERY,
+    TOP_COLORS_QUERY,
+    PaletteQueries,
+    create_app,
+)
+from image_processing.utils.color_histogram import with_fields
+
+
+def _histogram(seed, dominant=None):
+    rng = np.random.default_rng(seed)
+    colors = np.unique(rng.integers(0, 256, (300, 3), dtype=np.uint8), axis=0)
+    counts = rng.integers(1, 100, len(colors))
+    if dominant is not None:
+        colors[0] = dominant
+        counts[0] = 1000
+        colors, index = np.unique(colors, axis=0, return_index=True)
+        counts = counts[index]
+    histogram = palette_histogram(colors, counts)
+    return with_fields(histogram, labels=rng.integers(-1, 4, len(colors)))
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_path = str(tmp_path / "palettes.db")
+    conn = create_db(db_path)
+    histograms = {
+        "dark.png": _histogram(0, dominant=(20, 20, 20)),
+        "mid.png": _histogram(1, dominant=(120, 120, 120)),
+        "light.png": _histogram(2, dominant=(240, 240, 240)),
+    }
+    ids = {
+        source: insert_palette(conn, histogram, source=source)
+        for source, histogram in histograms.items()
+    }
+    yield db_path, conn, ids, histograms
+    conn.close()
+
+
+@pytest.fixture
+def queries(store):
+    queries = PaletteQueries(store[0])
+    yield queries
+    queries.close()
+
+
+def _hex(packed):
+    return f"#{int(packed):06x}"
+
+
+def test_top_colors(store, queries):
+    _, _, ids, histograms = store
+    ranked = rank_colors(histograms["mid.png"])
+    colors = queries.top_colors(ids["mid.png"], limit=5)
+    expected = [_hex(rgb) for rgb in ranked["rgb"][:5]]
+    assert [color["hex"] for color in colors] == expected
+    assert [color["count"] for color in colors] == ranked["count"][:5].tolist()
+    assert colors[0]["hex"] == "#787878"
+
+
+def test_cluster_colors(store, queries):
+    _, _, ids, histograms = store
+    ranked = rank_colors(histograms["dark.png"])
+    members = ranked[ranked["label"] == 2]
+    colors = queries.cluster_colors(ids["dark.png"], 2, limit=500)
+    assert [color["hex"] for color in colors] == [_hex(rgb) for rgb in members["rgb"]]
+    assert all(color["cluster"] == 2 for color in colors)
+
+
+def test_images_by_dominant_lightness(store, queries):
+    _, _, ids, _ = store
+    images = queries.images_by_dominant_lightness(40, 60)
+    assert [image["source"] for image in images] == ["mid.png"]
+    assert images[0]["dominant_hex"] == "#787878"
+    assert 40 <= images[0]["dominant_l"] <= 60
+    everything = queries.images_by_dominant_lightness(0, 100)
+    assert [image["image_id"] for image in everything] == [
+        ids["dark.png"],
+        ids["mid.png"],
+        ids["light.png"],
+    ]
+
+
+def test_cache_is_dropped_after_writes(store, queries):
+    _, conn, ids, _ = store
+    before = queries.top_colors(ids["mid.png"], limit=3)
+    assert queries.top_colors(ids["mid.png"], limit=3) is before
+
+    insert_palette(conn, _histogram(5, dominant=(0, 0, 255)), source="mid.png")
+    after = queries.top_colors(ids["mid.png"], limit=3)
+    assert after[0]["hex"] == "#0000ff"
+
+
+def test_queries_use_indexes(queries):
+    plans = {
+        sql: " ".join(
+            row["detail"]
+            for row in queries.conn.execute("EXPLAIN QUERY PLAN " + sql, params)
+        )
+        for sql, params in [
+            (TOP_COLORS_QUERY, (1, 20)),
+            (CLUSTER_COLORS_QUERY, (1, 2, 20)),
+            (IMAGES_BY_DOMINANT_L_QUERY, (40.0, 60.0, 20, 0)),
+        ]
+    }
+    for plan in plans.values():
+        assert "SCAN" not in plan and "TEMP B-TREE" not in plan
+    assert "palette_colors_cluster" in plans[CLUSTER_COLORS_QUERY]
+    assert "images_dominant_l" in plans[IMAGES_BY_DOMINANT_L_QUERY]
+
+
+def test_routes(store, queries):
+    _, _, ids, _ = store
+    client = create_app(queries).test_client()
+    image_id = ids["light.png"]
+
+    assert client.get(f"/palettes/images/{image_id}").get_json()["colors"] > 0
+    colors = client.get(f"/palettes/images/{image_id}/colors?limit=3").get_json()
+    assert len(colors) == 3
+    cluster = client.get(f"/palettes/images/{image_id}/colors?cluster=1").get_json()
+    assert all(color["cluster"] == 1 for color in cluster)
+    images = client.get("/palettes/images?l_min=90&l_max=100").get_json()
+    assert [image["source"] for image in images] == ["light.png"]
+
+    assert client.get("/palettes/images/999").status_code == 404
+    assert client.get("/palettes/images/999/colors").status_code == 404
+    assert client.get("/palettes/images?l_min=dark").status_code == 400
+    response = client.get(f"/palettes/images/{image_id}/colors?cluster=x")
+    assert response.status_code == 400
@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processing.server import image_api
+from image_processing.server.image_api import JobManager, UploadResolver, create_app
+from image_processing.utils.color_histogram import load_histogram
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    rgb = (rng.integers(0, 3, (16, 12, 3)) * 120).astype(np.uint8)
+    directory = tmp_path / "images"
+    directory.mkdir()
+    Image.fromarray(rgb).save(directory / "image.png")
+    return directory
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(
+        output_dir=str(tmp_path / "jobs"),
+        cache_dir=str(tmp_path / "cache"),
+        executor=ThreadPoolExecutor(max_workers=1),
+    )
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def client(manager, image_dir):
+    app = create_app(
+        manager,
+        image_dir=str(image_dir),
+        image_resolver={7: str(image_dir / "image.png")}.get,
+    )
+    return app.test_client()
+
+
+def _wait(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").get_json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("Job did not finish in time.")
+
+
+def test_submit_and_poll_job(client):
+    response = client.post(
+        "/jobs",
+        json={
+            "path": "image.png",
+            "targets": ["histogram", "clusters"],
+            "params": {"clusters": {"eps": 1.0, "min_samples": 2}},
+        },
+    )
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+
+    job = _wait(client, job_id)
+    assert job["status"] == "done", job.get("error")
+    assert set(job["result"]["outputs"]) == {"histogram", "clusters"}
+    assert "clusters" in job["result"]["computed"]
+    histogram = load_histogram(job["result"]["outputs"]["histogram"])
+    assert histogram["count"].sum() == 16 * 12
+
+    output = client.get(f"/jobs/{job_id}/outputs/clusters")
+    assert output.status_code == 200
+    assert [job["job_id"] for job in client.get("/jobs").get_json()] == [job_id]
+
+
+def test_resubmit_reuses_cached_stages(client):
+    first = client.post("/jobs", json={"image_id": 7, "targets": ["histogram"]})
+    _wait(client, first.get_json()["job_id"])
+    second = client.post("/jobs", json={"image_id": 7, "targets": ["histogram"]})
+    job = _wait(client, second.get_json()["job_id"])
+    assert job["result"]["computed"] == []
+    assert job["result"]["reused"] == ["histogram"]
+
+
+def test_submit_returns_before_the_job_runs(client, monkeypatch):
+    release = threading.Event()
+
+    def slow_job(*args):
+        release.wait(10)
+        return {"outputs": {}}
+
+    monkeypatch.setattr(image_api, "run_job", slow_job)
+    start = time.perf_counter()
+    response = client.post("/jobs", json={"path": "image.png"})
+    assert time.perf_counter() - start < 1
+    job_id = response.get_json()["job_id"]
+    assert client.get(f"/jobs/{job_id}").get_json()["status"] in ("queued", "running")
+    assert client.get(f"/jobs/{job_id}/outputs/histogram").status_code == 409
+    release.set()
+    assert _wait(client, job_id)["status"] == "done"
+
+
+def test_failed_job_reports_error(client, image_dir):
+    (image_dir / "broken.png").write_bytes(b"not an image")
+    response = client.post("/jobs", json={"path": "broken.png"})
+    job = _wait(client, response.get_json()["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"]
+
+
+@pytest.mark.parametrize(
+    "payload, status",
+    [
+        ({}, 400),
+        ({"path": "../outside.png"}, 400),
+        ({"path": "missing.png"}, 404),
+        ({"image_id": 8}, 400),
+        ({"path": "image.png", "targets": ["nope"]}, 400),
+        ({"path": "image.png", "params": {"clusters": {"radius": 2}}}, 400),
+    ],
+)
+def test_invalid_submissions(client, payload, status):
+    assert client.post("/jobs", json=payload).status_code == status
+
+
+def test_unknown_job(client):
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_finished_jobs_are_forgotten_oldest_first(manager, image_dir, monkeypatch):
+    monkeypatch.setattr(image_api, "run_job", lambda *args: {"outputs": {}})
+    manager.max_finished = 2
+    jobs = [manager.submit(str(image_dir / "image.png")) for _ in range(4)]
+    for job in jobs:
+        job.future.result()
+    manager.submit(str(image_dir / "image.png")).future.result()
+    remaining = [job.id for job in manager.jobs()]
+    assert jobs[0].id not in remaining
+    assert jobs[-1].id in remaining
+
+
+def test_upload_resolver_reads_backend_images(tmp_path):
+    db_path = str(tmp_path / "backend.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE images (id INTEGER, user_id INTEGER, filename)")
+        conn.execute("INSERT INTO images VALUES (3, 5, 'abc_photo.png')")
+    resolver = UploadResolver(db_path, str(tmp_path / "uploads"))
+
+    assert resolver(3) == str(tmp_path / "uploads" / "user_5" / "abc_photo.png")
+    assert resolver(4) is None
+    with pytest.raises(ValueError):
+        resolver("3")
+    with pytest.raises(ValueError):
+        UploadResolver(str(tmp_path / "missing.db"))(3)
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="Workers must inherit the patched build_pipeline.",
+)
+def test_broken_worker_pool_is_replaced(tmp_path, image_dir, monkeypatch):
+    manager = JobManager(
+        output_dir=str(tmp_path / "jobs"),
+        cache_dir=str(tmp_path / "cache"),
+        max_workers=1,
+    )
+    monkeypatch.setattr(image_api, "build_pipeline", lambda **kwargs: os._exit(1))
+    lost = manager.submit(str(image_dir / "image.png"), ["histogram"])
+    with pytest.raises(BrokenProcessPool):
+        lost.future.result(timeout=30)
+    assert lost.to_dict()["status"] == "failed"
+
+    monkeypatch.undo()
+    job = manager.submit(str(image_dir / "image.png"), ["histogram"])
+    assert "histogram" in job.future.result(timeout=60)["outputs"]
+    manager.shutdown()
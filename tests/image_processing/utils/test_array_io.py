@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from image_processing.utils.array_io import (
+    compact_labels,
+    load_array,
+    open_output_array,
+    save_array,
+    smallest_int_dtype,
+)
+
+
+@pytest.mark.parametrize(
+    "value_range, expected",
+    [
+        ((-1, 127), np.int8),
+        ((-1, 128), np.int16),
+        ((-1, 40000), np.int32),
+        ((0, 1 << 40), np.int64),
+    ],
+)
+def test_smallest_int_dtype(value_range, expected):
+    assert smallest_int_dtype(*value_range) == np.dtype(expected)
+
+
+def test_smallest_int_dtype_rejects_overflow():
+    with pytest.raises(ValueError, match="does not fit"):
+        smallest_int_dtype(0, 1 << 64)
+
+
+def test_compact_labels_preserves_values():
+    labels = np.array([-1, 0, 300], dtype=np.int64)
+    compact = compact_labels(labels)
+    assert compact.dtype == np.int16
+    assert compact.tolist() == labels.tolist()
+    assert compact_labels(np.array([], dtype=np.int64)).dtype == np.int8
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    path = tmp_path / "nested" / "lab.npy"
+    array = np.arange(12, dtype=np.float32).reshape(2, 2, 3)
+    save_array(str(path), array)
+
+    mapped = load_array(str(path))
+    assert isinstance(mapped, np.memmap), "Intermediates should be memory-mapped."
+    assert (mapped == array).all()
+    assert not isinstance(load_array(str(path), mmap=False), np.memmap)
+
+
+def test_open_output_array_writes_in_place(tmp_path):
+    path = tmp_path / "out" / "labels.npy"
+    output = open_output_array(str(path), (3, 4), np.int16)
+    output[1] = 7
+    output.flush()
+    del output
+    assert np.load(path)[1].tolist() == [7, 7, 7, 7]
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from image_processing.utils.color_histogram import (
+    FORMAT_VERSION,
+    histogram_colors,
+    load_histogram,
+    load_legacy_text,
+    make_histogram,
+    merge_histograms,
+    save_histogram,
+    with_fields,
+)
+
+COLORS = np.array([[0, 0, 0], [18, 52, 86], [255, 255, 255]], dtype=np.uint8)
+COUNTS = np.array([10, 3, 7])
+
+
+def test_make_histogram_packs_colors():
+    histogram = make_histogram(COLORS, COUNTS)
+    assert histogram.dtype.names == ("rgb", "count")
+    assert histogram["rgb"].tolist() == [0, 0x123456, 0xFFFFFF]
+    assert histogram["count"].dtype == np.uint32
+    assert (histogram_colors(histogram) == COLORS).all()
+
+
+def test_make_histogram_widens_overflowing_counts():
+    histogram = make_histogram(COLORS, np.array([1, 2, 1 << 33]))
+    assert histogram["count"].dtype == np.uint64
+    assert int(histogram["count"][2]) == 1 << 33
+
+
+def test_float_counts_are_kept_through_merge_and_round_trip(tmp_path):
+    weights = np.array([0.5, 2.25, 1.0])
+    histogram = make_histogram(COLORS, weights)
+    assert histogram["count"].dtype == np.float64
+    np.testing.assert_array_equal(histogram["count"], weights)
+
+    path = str(tmp_path / "weighted.npz")
+    save_histogram(path, histogram)
+    merged = merge_histograms([load_histogram(path), make_histogram(COLORS, COUNTS)])
+    np.testing.assert_array_equal(merged["count"], weights + COUNTS)
+
+
+def test_make_histogram_rejects_mismatched_lengths():
+    with pytest.raises(ValueError, match="same length"):
+        make_histogram(COLORS, COUNTS[:2])
+
+
+def test_round_trip_with_optional_fields(tmp_path):
+    lab = np.array([[0, 0, 0], [21.5, -1.25, -25.0], [100, 0, 0]], dtype=np.float32)
+    labels = np.array([0, -1, 1])
+    histogram = make_histogram(COLORS, COUNTS, lab=lab, labels=labels)
+
+    path = tmp_path / "nested" / "hist.npz"
+    save_histogram(str(path), histogram)
+    loaded = load_histogram(str(path))
+
+    assert loaded.dtype == histogram.dtype
+    assert (loaded == histogram).all(), "Round trip should be lossless."
+
+
+def test_with_fields_keeps_existing_columns():
+    lab = np.zeros((3, 3), dtype=np.float32)
+    histogram = with_fields(make_histogram(COLORS, COUNTS, lab=lab), labels=[1, 1, 2])
+    assert histogram.dtype.names == ("rgb", "count", "lab", "label")
+    assert histogram["label"].tolist() == [1, 1, 2]
+
+
+def test_load_histogram_rejects_unknown_version(tmp_path):
+    path = tmp_path / "future.npz"
+    np.savez(path, version=np.int32(FORMAT_VERSION + 1), histogram=np.zeros(1))
+    with pytest.raises(ValueError, match="Unsupported histogram format version"):
+        load_histogram(str(path))
+
+
+def test_load_legacy_text(tmp_path):
+    path = tmp_path / "clustered_lab_data.txt"
+    path.write_text(
+        "sRGB Color (R, G, B), Count, LAB Color (L, A, B), Group Number\n"
+        "(0, 0, 0), 10, (0.00, 0.00, 0.00), 0\n"
+        "(18, 52, 86), 3, (21.50, -1.25, -25.00), -1\n"
+    )
+    histogram = load_legacy_text(str(path))
+    assert histogram["rgb"].tolist() == [0, 0x123456]
+    assert histogram["count"].tolist() == [10, 3]
+    assert histogram["label"].tolist() == [0, -1]
+    assert np.allclose(histogram["lab"][1], [21.5, -1.25, -25.0])
+
+
+def test_merge_histograms_sums_counts_and_keeps_lab():
+    lab = np.arange(9, dtype=np.float32).reshape(3, 3)
+    first = make_histogram(COLORS, COUNTS, lab=lab)
+    second = make_histogram(COLORS[1:], np.array([5, 1]), lab=lab[1:])
+
+    merged = merge_histograms([first, second])
+    assert merged["rgb"].tolist() == [0, 0x123456, 0xFFFFFF]
+    assert merged["count"].tolist() == [10, 8, 8]
+    assert (merged["lab"] == lab).all()
+
+    without_lab = merge_histograms([make_histogram(COLORS, COUNTS), second])
+    assert without_lab.dtype.names == ("rgb", "count")
@@ -0,0 +1,133 @@
+import os
+import numpy as np
+from PIL import Image
+from image_processing.scripts.clustering import lab_clustering
+from image_processing.scripts.clustering.lab_clustering import cluster_lab
+from image_processing.scripts.conversion.srgb_to_lab import convert_to_lab
+from image_processing.utils.result_cache import (
+    ResultCache,
+    data_digest,
+    file_digest,
+    run_cached,
+    source_files,
+    source_version,
+)
+
+
+def test_make_key_depends_on_every_component():
+    base = ResultCache.make_key("stage", "abc", {"eps": 0.5}, "v1")
+    assert base == ResultCache.make_key("stage", "abc", {"eps": 0.5}, "v1")
+    assert base != ResultCache.make_key("other", "abc", {"eps": 0.5}, "v1")
+    assert base != ResultCache.make_key("stage", "abd", {"eps": 0.5}, "v1")
+    assert base != ResultCache.make_key("stage", "abc", {"eps": 0.6}, "v1")
+    assert base != ResultCache.make_key("stage", "abc", {"eps": 0.5}, "v2")
+
+
+def test_file_digest_tracks_content(tmp_path):
+    path = tmp_path / "input.bin"
+    path.write_bytes(b"first")
+    first = file_digest(str(path))
+    path.write_bytes(b"second version")
+    assert file_digest(str(path)) != first
+
+
+def test_source_version_covers_imported_modules(tmp_path):
+    package = tmp_path / "image_processing"
+    (package / "utils").mkdir(parents=True)
+    stage = package / "stage.py"
+    stage.write_text(
+        "import numpy\n"
+        "from image_processing import helper\n"
+        "from image_processing.utils.io import load\n"
+    )
+    (package / "helper.py").write_text("import image_processing.utils.io\n")
+    io_module = package / "utils" / "io.py"
+    io_module.write_text("def load(): pass\n")
+    (package / "unused.py").write_text("")
+
+    files = source_files(str(stage), root=str(tmp_path))
+    assert files == sorted(
+        str(path) for path in (stage, package / "helper.py", io_module)
+    )
+
+    version = source_version(str(stage), root=str(tmp_path))
+    io_module.write_text("def load(): return 1\n")
+    assert source_version(str(stage), root=str(tmp_path)) != version
+
+
+def test_arrays_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    assert cache.get_array("missing") is None
+    cache.put_array("key", np.arange(5, dtype=np.int16))
+    cached = cache.get_array("key")
+    assert cached.dtype == np.int16 and cached.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_bytes_round_trip_and_data_digest(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    assert cache.get_bytes("key", ".png") is None
+    cache.put_bytes("key", b"payload", ".png")
+    assert cache.get_bytes("key", ".png") == b"payload"
+
+    values = np.arange(6, dtype=np.int32)
+    assert data_digest(values) == data_digest(values.copy())
+    assert data_digest(values) != data_digest(values.astype(np.int64))
+    assert data_digest(values) != data_digest(values.reshape(2, 3))
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=3000)
+    payload = np.zeros(100, dtype=np.float64)  # ~900 bytes per entry on disk
+    for index, key in enumerate(["a", "b", "c"]):
+        cache.put_array(key, payload)
+        path = cache.lookup(key)
+        os.utime(path, ns=(index * 10**9, index * 10**9))
+
+    cache.lookup("a")  # Touch "a" so "b" becomes least recently used.
+    cache.put_array("d", payload)
+
+    assert cache.get_array("b") is None
+    assert cache.get_array("a") is not None and cache.get_array("d") is not None
+    assert cache.size_bytes() <= 3000
+
+
+def test_run_cached_skips_compute_on_hit(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("pixels")
+    output_path = tmp_path / "out" / "result.npy"
+    calls = []
+
+    def compute():
+        calls.append(1)
+        np.save(output_path, np.ones(3))
+
+    output_path.parent.mkdir()
+    args = (cache, "stage", str(input_path), {"k": 1}, str(output_path), compute)
+    assert run_cached(*args) is False
+    output_path.unlink()
+    assert run_cached(*args) is True
+    assert len(calls) == 1
+    assert np.load(output_path).tolist() == [1.0, 1.0, 1.0]
+    assert run_cached(None, *args[1:]) is False and len(calls) == 2
+
+
+def test_stages_reuse_cached_outputs(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    rgb = np.random.default_rng(0).integers(0, 3, (12, 10, 3)).astype(np.uint8) * 100
+    image_path = tmp_path / "image.png"
+    Image.fromarray(rgb).save(image_path)
+    lab_path = tmp_path / "intermediate" / "lab.npy"
+    labels_path = tmp_path / "results" / "labels.npy"
+
+    convert_to_lab(str(image_path), str(lab_path), cache=cache)
+    cluster_lab(str(lab_path), str(labels_path), eps=1.0, min_samples=2, cache=cache)
+    expected = np.load(labels_path)
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("Cached stage should not recompute.")
+
+    monkeypatch.setattr(lab_clustering, "label_lab_array", fail)
+    labels_path.unlink()
+    cluster_lab(str(lab_path), str(labels_path), eps=1.0, min_samples=2, cache=cache)
+    assert (np.load(labels_path) == expected).all()